@@ -2,9 +2,11 @@ from typing import Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import jwt, JWTError
-from app.db.session import get_db
+import jwt
+from app.db.session import get_db, get_read_db, recent_writes
+from app.db.sharding import shard_directory, bind_to_shard, sharding_enabled
 from app.core.config import settings
+from app.core.security import verified_tokens, verify_token
 from app.models.user import User
 from app.models.token_blacklist import TokenBlacklist
 from datetime import datetime
@@ -34,6 +36,7 @@ async def validate_token(token: str, db: Session) -> bool:
 
 
 async def get_current_user(
+        read_db: Session = Depends(get_read_db),
         db: Session = Depends(get_db),
         token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -41,12 +44,20 @@ async def get_current_user(
     Validate JWT token, check blacklist, and return the current user.
 
     This function performs several security checks:
-    1. Validates the token isn't blacklisted
-    2. Verifies the JWT signature and decoding
+    1. Verifies the JWT signature and decoding
+    2. Validates the token isn't blacklisted
     3. Ensures the user still exists in the database
 
+    The checks run on a read replica when one is configured. Users who wrote
+    in the last few seconds are pinned to the primary so they never read
+    stale data, and the request's primary session is tagged with the user so
+    its commits start that window. Both sessions are routed to the user's
+    shard before their first statement, and the read session's connection
+    is released as soon as the checks are done.
+
     Args:
-        db (Session): Database session dependency
+        read_db (Session): Read-only session for the token and user lookups
+        db (Session): Primary session shared with the endpoint
         token (str): JWT token from request header
 
     Returns:
@@ -62,33 +73,114 @@ async def get_current_user(
     )
 
     try:
-        # First check if token is blacklisted using our validate_token function
-        if not await validate_token(token, db):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has been invalidated. Please sign in again.",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        # If token is valid, decode and verify it
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        # Decode and verify the token first so we know whose request this is
+        payload = verify_token(token)
 
         # Extract user email from token
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
+        email = email.lower()
+
+        # Read-your-writes: recent writers read from the primary
+        db.info["user_key"] = email
+        if recent_writes.is_recent(email):
+            read_db.info["pin_primary"] = True
+
+        shard = shard_directory.shard_for_email(email)
+        bind_to_shard(shard, db, read_db)
+
+        # Check if token is blacklisted using our validate_token function
+        if not await validate_token(token, read_db):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been invalidated. Please sign in again.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
         # Get user from database
-        user = db.query(User).filter(User.email == email).first()
+        user = read_db.query(User).filter(User.email == email).first()
+        if user is None and sharding_enabled():
+            # The cached shard may be stale if the user was just moved
+            moved_to = shard_directory.shard_for_email(email, refresh=True)
+            if moved_to != shard:
+                bind_to_shard(moved_to, db, read_db)
+                if not await validate_token(token, read_db):
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail="Token has been invalidated. Please sign in again.",
+                        headers={"WWW-Authenticate": "Bearer"},
+                    )
+                user = read_db.query(User).filter(User.email == email).first()
         if user is None:
             raise credentials_exception
 
+        # Release the read session's connection now instead of at the end of the response.
+        # The user's columns stay loaded; endpoints that read again get a fresh connection.
+        if read_db is not db:
+            read_db.close()
+
         return user
 
-    except JWTError:
+    except jwt.PyJWTError:
         # Catches any JWT-specific errors (invalid signature, expired, etc.)
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+
+async def get_current_user_id(
+        read_db: Session = Depends(get_read_db),
+        db: Session = Depends(get_db),
+        token: str = Depends(oauth2_scheme)
+) -> int:
+    """
+    Authenticate the request and return just the user's id.
+
+    A token that passed get_current_user within the last
+    VERIFIED_TOKEN_CACHE_SECONDS is accepted without any query, so hot
+    read-only endpoints stay off the database. Otherwise this runs the full
+    get_current_user checks and remembers the result. See VerifiedTokens
+    for how sign-out reaches cached entries on every worker.
+
+    Args:
+        read_db (Session): Read-only session for the token and user lookups
+        db (Session): Primary session shared with the endpoint
+        token (str): JWT token from request header
+
+    Returns:
+        int: The authenticated user's id
+
+    Raises:
+        HTTPException: If any validation step fails
+    """
+    user_id = verified_tokens.get(token)
+    if user_id is not None:
+        return user_id
+
+    user = await get_current_user(read_db=read_db, db=db, token=token)
+    verified_tokens.remember(token, user.id, jwt.decode(token, options={"verify_signature": False}).get("exp"))
+    return user.id
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Require the current user to be an administrator (listed in ADMIN_EMAILS).
+
+    Args:
+        current_user (User): Currently authenticated user
+
+    Returns:
+        User: The authenticated administrator
+
+    Raises:
+        HTTPException: If the user isn't an administrator
+    """
+    if current_user.email not in {email.lower() for email in settings.ADMIN_EMAILS}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "status": "error",
+                "message": "Administrator access required",
+                "details": None
+            }
+        )
+    return current_user
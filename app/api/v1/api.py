@@ -1,6 +1,6 @@
 # app/api/v1/api.py
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, auth, creditcard
+from app.api.v1.endpoints import health, auth, creditcard, transactions, optimisation, catalog, admin
 
 # Create main v1 router
 router = APIRouter()
@@ -23,4 +23,28 @@ router.include_router(
     prefix="/creditcard",
     tags=["Credit Card"]
 )
+
+router.include_router(
+    transactions.router,
+    prefix="/transactions",
+    tags=["Transactions"]
+)
+
+router.include_router(
+    optimisation.router,
+    prefix="/optimisation",
+    tags=["Optimisation"]
+)
+
+router.include_router(
+    catalog.router,
+    prefix="/catalog",
+    tags=["Catalog"]
+)
+
+router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["Admin"]
+)
 # Add more routers as needed for your specific endpoints
\ No newline at end of file
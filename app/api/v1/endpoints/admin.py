@@ -0,0 +1,87 @@
+import json
+from typing import List, Tuple
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db.session import get_db, get_read_db
+from app.models.user import User
+from app.schemas.base import ErrorResponseSchema
+from app.api.deps import get_current_admin
+from app.core.config import settings
+from app.core.provisioning import ProvisioningSummary, aiter_record_lines, provision_batch
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post(
+    "/users/provision",
+    responses={
+        401: {"model": ErrorResponseSchema},
+        403: {"model": ErrorResponseSchema}
+    },
+    summary="Bulk Provision Users",
+    description="""
+    Create many user accounts in one request (administrators only).
+
+    The request body is NDJSON with one signup record per line:
+    `{"email": ..., "password": ..., "user_name": ...}`. The response is
+    NDJSON too, streamed as the records are processed: one result per input
+    record with its line number, email and status (created, exists,
+    duplicate, invalid or failed), then a final `{"summary": {...}}` line.
+    The response status is 200 even when some records fail; check each result.
+    """
+)
+async def provision_users(
+        request: Request,
+        admin: User = Depends(get_current_admin),
+        db: Session = Depends(get_db),
+        read_db: Session = Depends(get_read_db)
+) -> StreamingResponse:
+    """
+    Stream a bulk provisioning request through the provisioning pipeline.
+
+    The body is read and processed one batch (PROVISIONING_BATCH_SIZE
+    records) at a time, so memory use doesn't depend on the upload size.
+
+    Args:
+        request: Incoming request whose body is read as a stream
+        admin: Currently authenticated administrator (from JWT token)
+        db: Primary session used by authentication; released before streaming
+        read_db: Read session used by authentication; released before streaming
+
+    Returns:
+        StreamingResponse: application/x-ndjson of per-record results
+    """
+    # Provisioning uses its own short sessions per batch
+    db.close()
+    read_db.close()
+
+    async def stream():
+        summary = ProvisioningSummary()
+
+        async def run(batch: List[Tuple[int, object]]):
+            results = await run_in_threadpool(provision_batch, batch)
+            return b"".join(json.dumps(result).encode("utf-8") + b"\n" for result in results), results
+
+        batch: List[Tuple[int, object]] = []
+        async for record in aiter_record_lines(request.stream()):
+            batch.append(record)
+            if len(batch) >= settings.PROVISIONING_BATCH_SIZE:
+                body, results = await run(batch)
+                for result in results:
+                    summary.add(result)
+                batch = []
+                yield body
+        if batch:
+            body, results = await run(batch)
+            for result in results:
+                summary.add(result)
+            yield body
+
+        logger.info("Bulk provisioning by %s: %s", admin.email, summary.as_dict())
+        yield json.dumps({"summary": summary.as_dict()}).encode("utf-8") + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
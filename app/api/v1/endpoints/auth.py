@@ -1,11 +1,14 @@
-from typing import Dict, Optional
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app.db.session import get_db
+from sqlalchemy.dialects.postgresql import insert
+from app.db.session import get_db, get_read_db, recent_writes
+from app.db.sharding import shard_directory, bind_to_shard, sharding_enabled
 from app.models.user import User
 from app.models.token_blacklist import TokenBlacklist
+from app.models.refresh_token import RefreshToken
 from app.schemas.user import (
     UserSignInRequest,
     UserSignInResponse,
@@ -13,12 +16,22 @@ from app.schemas.user import (
     UserSignUpResponse,
     SignOutResponse,
     UserResponse,
-    Token
+    Token,
+    RefreshTokenRequest,
+    TokenRefreshResponse
 )
 from app.schemas.base import ErrorResponseSchema
-from app.core.security import create_access_token
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    verified_tokens,
+    verify_token
+)
 from fastapi.responses import JSONResponse
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+import uuid
 import jwt.exceptions  # Import specific exceptions from PyJWT
 from app.core.config import settings
 import logging
@@ -33,30 +46,38 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/signin")
 
 
-async def validate_user_data(db: Session, email: str, user_name: str) -> Dict[str, str]:
+def issue_refresh_token(db: Session, user_id: int, family_id: str) -> str:
     """
-    Validate user data to ensure no duplicate entries.
+    Create a refresh token in the given family and add its hash to the session.
+    The caller commits.
 
-    Args:
-        db: Database session
-        email: User's email to check
-        user_name: Username to check
+    The token is prefixed with the user id so /refresh can find the user's
+    shard before looking the token up.
 
     Returns:
-        Dict containing any validation errors found
+        str: The raw token to send to the client (never stored)
     """
-    errors: Dict[str, str] = {}
+    refresh_token = f"{user_id}.{create_refresh_token()}"
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=hash_refresh_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return refresh_token
 
-    try:
-        existing_email = db.query(User).filter(User.email == email).first()
-        if existing_email:
-            errors["email"] = "This email is already registered. Please login instead."
 
-    except Exception as e:
-        logger.error(f"Error during user validation: {str(e)}")
-        errors["database"] = "Error checking user existence"
+def revoke_refresh_family(db: Session, family_id: str) -> int:
+    """
+    Revoke every live refresh token in a family. The caller commits.
 
-    return errors
+    Returns:
+        int: Number of tokens revoked
+    """
+    return db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": datetime.utcnow()}, synchronize_session=False)
 
 
 @router.post(
@@ -73,43 +94,81 @@ async def signup(
         user_data: UserSignupRequest,
         db: Session = Depends(get_db)
 ) -> UserSignUpResponse:
-    """Handle user registration process"""
+    """
+    Handle user registration process.
+
+    The insert relies on the unique email index instead of a prior SELECT:
+    a duplicate email inserts nothing and returns no row, which becomes a 409.
+    This is one statement, and concurrent signups for the same email can't race.
+
+    With several shards the email is first reserved in the shard directory,
+    which also hands out the user's id and shard; the reservation is undone
+    if the user can't be created.
+    """
+    registered = None
     try:
-        # Validate user data
-        validation_errors = await validate_user_data(db, user_data.email, user_data.user_name)
-        if validation_errors:
+        # Hash the password on a transient user; it is never added to the session
+        new_user = User(email=user_data.email, user_name=user_data.user_name)
+        new_user.set_password(user_data.password)
+        values = {
+            "email": new_user.email,
+            "user_name": new_user.user_name,
+            "hashed_password": new_user.hashed_password,
+            "salt": new_user.salt
+        }
+
+        if sharding_enabled():
+            registered = shard_directory.register(new_user.email)
+            if registered is not None:
+                values["id"], shard = registered
+                bind_to_shard(shard, db)
+
+        db.info["user_key"] = new_user.email  # Pin the follow-up signin to the primary
+        created = None
+        if registered is not None or not sharding_enabled():
+            created = db.execute(
+                insert(User)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id, User.email, User.user_name, User.created_at, User.updated_at)
+            ).first()
+
+        if created is None:
+            db.rollback()
+            if registered is not None:
+                shard_directory.forget(registered[0], new_user.email)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
                     "status": "error",
                     "message": "Validation failed",
-                    "details": validation_errors
+                    "details": {
+                        "email": "This email is already registered. Please login instead."
+                    }
                 }
             )
 
-        # Create new user
-        new_user = User(email=user_data.email, user_name=user_data.user_name)
-        new_user.set_password(user_data.password)
-
-        db.add(new_user)
         db.commit()
-        db.refresh(new_user)
 
         return UserSignUpResponse(
             status="success",
             message="User registered successfully",
             data=UserResponse(
-                id=new_user.id,
-                email=new_user.email,
-                user_name=new_user.user_name,
-                created_at=new_user.created_at,
-                updated_at=new_user.updated_at
+                id=created.id,
+                email=created.email,
+                user_name=created.user_name,
+                created_at=created.created_at,
+                updated_at=created.updated_at
             )
         )
 
+    except HTTPException:
+        raise
     except IntegrityError as e:
         db.rollback()
-        logger.error(f"Database integrity error during signup: {str(e)}")
+        if registered is not None:
+            shard_directory.forget(registered[0], user_data.email)
+        logger.error("Database integrity error during signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -120,7 +179,9 @@ async def signup(
         )
     except Exception as e:
         db.rollback()
-        logger.error(f"Unexpected error during signup: {str(e)}")
+        if registered is not None:
+            shard_directory.forget(registered[0], user_data.email)
+        logger.error("Unexpected error during signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -143,12 +204,18 @@ async def signup(
 )
 async def signin(
         user_data: UserSignInRequest,
+        read_db: Session = Depends(get_read_db),
         db: Session = Depends(get_db)
 ) -> UserSignInResponse:
     """Handle user authentication and token generation"""
     try:
+        # A user who just signed up may not have reached the replicas yet
+        if recent_writes.is_recent(user_data.email):
+            read_db.info["pin_primary"] = True
+        bind_to_shard(shard_directory.shard_for_email(user_data.email, refresh=True), read_db, db)
+
         # Check if user exists
-        user = db.query(User).filter(User.email == user_data.email).first()
+        user = read_db.query(User).filter(User.email == user_data.email).first()
         if not user:
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -170,8 +237,13 @@ async def signin(
                 }
             )
 
+        # Start a new refresh family for this signin
+        family_id = uuid.uuid4().hex
+        refresh_token = issue_refresh_token(db, user.id, family_id)
+        db.commit()
+
         # Generate access token
-        access_token = create_access_token(data={"sub": user.email})
+        access_token = create_access_token(data={"sub": user.email, "fam": family_id})
 
         return UserSignInResponse(
             status="success",
@@ -179,12 +251,14 @@ async def signin(
             data=Token(
                 access_token=access_token,
                 token_type="Bearer",
-                username=user.user_name
+                username=user.user_name,
+                refresh_token=refresh_token
             )
         )
 
     except Exception as e:
-        logger.error(f"Error during signin: {str(e)}")
+        db.rollback()
+        logger.error("Error during signin: %s", e)
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
@@ -195,6 +269,118 @@ async def signin(
         )
 
 
+@router.post(
+    "/refresh",
+    response_model=TokenRefreshResponse,
+    responses={
+        401: {"model": ErrorResponseSchema},
+        400: {"model": ErrorResponseSchema}
+    },
+    summary="Refresh Access Token",
+    description="Exchange a refresh token for a new access token and a rotated refresh token"
+)
+async def refresh(
+        token_data: RefreshTokenRequest,
+        db: Session = Depends(get_db)
+) -> TokenRefreshResponse:
+    """
+    Rotate a refresh token without re-checking the password.
+
+    The presented token is revoked and a new one is issued in the same family.
+    A token that was already revoked is being replayed, so the whole family
+    is revoked and the client has to sign in again.
+    """
+    try:
+        # Tokens start with the user id, which picks the shard they are stored on
+        user_id, _, _ = token_data.refresh_token.partition(".")
+        if user_id.isdigit():
+            bind_to_shard(shard_directory.shard_for_user(int(user_id), refresh=True), db)
+
+        token_hash = hash_refresh_token(token_data.refresh_token)
+        now = datetime.utcnow()
+
+        # Revoke the presented token only if it is still live; one round-trip, race-free
+        rotated = db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now
+            )
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+        if rotated is None:
+            known = db.execute(
+                select(RefreshToken.family_id, RefreshToken.revoked_at)
+                .where(RefreshToken.token_hash == token_hash)
+            ).first()
+
+            if known is not None and known.revoked_at is not None:
+                revoked = revoke_refresh_family(db, known.family_id)
+                db.commit()
+                logger.warning(
+                    "Refresh token reuse detected, revoked %d tokens in family %s",
+                    revoked,
+                    known.family_id
+                )
+            else:
+                db.rollback()
+
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={
+                    "status": "error",
+                    "message": "Refresh token is invalid or has expired. Please sign in again.",
+                    "details": None
+                }
+            )
+
+        user = db.execute(
+            select(User.email, User.user_name).where(User.id == rotated.user_id)
+        ).first()
+        if user is None:
+            db.rollback()
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={
+                    "status": "error",
+                    "message": "Invalid token - user not found",
+                    "details": None
+                }
+            )
+
+        refresh_token = issue_refresh_token(db, rotated.user_id, rotated.family_id)
+        db.commit()
+
+        access_token = create_access_token(data={"sub": user.email, "fam": rotated.family_id})
+
+        return TokenRefreshResponse(
+            status="success",
+            message="Token refreshed successfully",
+            data=Token(
+                access_token=access_token,
+                token_type="Bearer",
+                username=user.user_name,
+                refresh_token=refresh_token
+            )
+        )
+
+    except Exception as e:
+        db.rollback()
+        logger.error("Error during token refresh: %s", e)
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "status": "error",
+                "message": "An unexpected error occurred during token refresh",
+                "details": str(e)
+            }
+        )
+
+
 @router.post(
     "/signout",
     response_model=SignOutResponse,
@@ -203,21 +389,19 @@ async def signin(
         400: {"model": ErrorResponseSchema}
     },
     summary="User Sign Out",
-    description="Invalidate the current user's JWT token"
+    description="Invalidate the current user's JWT token and revoke its refresh tokens"
 )
 async def signout(
         token: str = Depends(oauth2_scheme),
         db: Session = Depends(get_db)
 ) -> SignOutResponse:
-    """Handle user signout by blacklisting their token"""
+    """Handle user signout by blacklisting their token and revoking its refresh family"""
     try:
         # Decode and verify the token
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        user_email = payload.get("sub")
+        payload = verify_token(token)
+        user_email = (payload.get("sub") or "").lower()
+        db.info["user_key"] = user_email
+        bind_to_shard(shard_directory.shard_for_email(user_email, refresh=True), db)
 
         # Verify user exists
         user = db.query(User).filter(User.email == user_email).first()
@@ -246,7 +430,14 @@ async def signout(
         )
 
         db.add(blacklist_entry)
+
+        # Revoke every refresh token issued since the signin behind this token
+        family_id = payload.get("fam")
+        if family_id:
+            revoke_refresh_family(db, family_id)
+
         db.commit()
+        verified_tokens.forget(token)
 
         return SignOutResponse(
             status="success",
@@ -255,7 +446,7 @@ async def signout(
         )
 
     except jwt.exceptions.InvalidTokenError as e:
-        logger.error(f"Invalid token during signout: {str(e)}")
+        logger.error("Invalid token during signout: %s", e)
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
             content={
@@ -266,7 +457,7 @@ async def signout(
         )
     except Exception as e:
         db.rollback()
-        logger.error(f"Error during signout: {str(e)}")
+        logger.error("Error during signout: %s", e)
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
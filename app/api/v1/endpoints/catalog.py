@@ -0,0 +1,39 @@
+from typing import Optional
+from fastapi import APIRouter, Header, Response, status
+from app.schemas.catalog import CatalogResponse
+from app.core.catalog import get_catalog
+from app.core.config import settings
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    response_model=CatalogResponse,
+    summary="Card Product Catalog",
+    description="""
+    List every supported card product with its fees, grace period and reward rate.
+
+    The response changes only when a new catalog version is deployed, so it
+    carries long-lived cache headers and an ETag; send If-None-Match to get
+    a 304 when nothing changed.
+    """
+)
+async def read_catalog(if_none_match: Optional[str] = Header(None)) -> Response:
+    """
+    Serve the pre-encoded catalog from memory.
+
+    Args:
+        if_none_match: ETag the client already has
+
+    Returns:
+        Response: The catalog, or 304 Not Modified
+    """
+    catalog = get_catalog()
+    headers = {
+        "ETag": catalog.etag,
+        "Cache-Control": f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}"
+    }
+    if if_none_match and catalog.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
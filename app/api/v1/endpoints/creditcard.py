@@ -1,18 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from typing import Optional, List
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select, union_all, literal, null, or_, and_
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.credit_card import CreditCard
+from app.db.session import get_db, get_read_db, ReadSessionLocal
+from app.db.sharding import shard_directory
+from app.models.credit_card import CreditCard, CreditCardArchive
+from app.models.card_limit_snapshot import CardLimitSnapshot
 from app.models.user import User
-from app.schemas.creditcard import CreditCardCreate, CreditCardCreateResponse, CreditCardEdit, CreditCardResponse, CreditCardEditResponse
-from app.api.deps import get_current_user
+from app.schemas.creditcard import (
+    CreditCardCreate,
+    CreditCardCreateResponse,
+    CreditCardEdit,
+    CreditCardResponse,
+    CreditCardEditResponse,
+    CardLimitSnapshotResponse,
+    CardLimitHistoryResponse,
+    CreditCardHistoryEntry,
+    CreditCardHistoryResponse,
+    CreditCardBatchRequest,
+    CreditCardBatchResponse,
+    CreditCardOperationResult,
+    CreditCardPartialResponse,
+    CreditCardListResponse,
+    CreditCardDetailResponse,
+    CARD_FIELDS
+)
+from app.api.deps import get_current_user, get_current_user_id
 from app.schemas.base import ErrorResponseSchema
 from app.core.constants import CreditCardCompany
+from app.core.export import EXPORT_FORMATS, stream_card_export
+from app.core.config import settings
+from app.core.jobs import enqueue_after_commit
+from app.core.events import TooManySubscribers, event_broker, format_sse, publish_after_commit
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def announce_card_change(db: Session, user_id: int, card: CreditCard, action: str) -> None:
+    """
+    Queue the card_changed job and the card event for the user's open
+    event streams; both only happen if the transaction commits.
+    """
+    enqueue_after_commit(db, "card_changed", {"user_id": user_id, "card_id": card.id, "action": action})
+    publish_after_commit(db, user_id, f"card.{action}", {
+        "card_id": card.id,
+        "action": action,
+        "card": {
+            "id": card.id,
+            "card_name": card.card_name,
+            "credit_limit": card.credit_limit,
+            "billing_start_date": card.billing_start_date,
+            "billing_end_date": card.billing_end_date,
+            "status": card.status
+        }
+    })
+
+
 @router.post(
     "/add-credit-card",
     response_model=CreditCardCreateResponse,
@@ -108,8 +157,11 @@ async def add_credit_card(
             status=True
         )
 
-        # Add to database
+        # Add to database, recording the opening limit in the same transaction
         db.add(new_card)
+        db.flush()
+        db.add(CardLimitSnapshot.for_card(new_card, "created"))
+        announce_card_change(db, current_user.id, new_card, "add")
         db.commit()
         db.refresh(new_card)
 
@@ -133,7 +185,7 @@ async def add_credit_card(
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error adding credit card: {str(e)}")
+        logger.error("Error adding credit card: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -144,6 +196,31 @@ async def add_credit_card(
         )
 
 
+def parse_card_fields(fields: Optional[str]) -> List[str]:
+    """
+    Turn a `fields=` value ("id,card_name,...") into a list of card columns.
+    No value means every field.
+
+    Raises:
+        HTTPException: If an unknown field is requested
+    """
+    if not fields:
+        return list(CARD_FIELDS)
+
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in CARD_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": f"Unknown fields requested: {', '.join(unknown) or '(none)'}",
+                "details": {"allowed_fields": ", ".join(CARD_FIELDS)}
+            }
+        )
+    return requested
+
+
 def get_number_suffix(n: int) -> str:
     """
     Returns the appropriate suffix for a number (1st, 2nd, 3rd, 4th, etc.)
@@ -244,15 +321,17 @@ async def edit_credit_card(
                 }
             )
 
-        # Update provided fields
-        if card_data.credit_limit:
+        # Update provided fields; limit changes are appended to the history
+        if card_data.credit_limit and card_data.credit_limit != card.credit_limit:
             card.credit_limit = card_data.credit_limit
+            db.add(CardLimitSnapshot.for_card(card, "updated"))
 
         if card_data.billing_start_date and card_data.billing_end_date:
             card.billing_start_date = card_data.billing_start_date
             card.billing_end_date = card_data.billing_end_date
 
         # Commit changes to database
+        announce_card_change(db, current_user.id, card, "edit")
         db.commit()
         db.refresh(card)
 
@@ -365,6 +444,7 @@ async def delete_credit_card(
         card.status = False
 
         # Commit changes to database
+        announce_card_change(db, current_user.id, card, "delete")
         db.commit()
         db.refresh(card)
 
@@ -396,4 +476,689 @@ async def delete_credit_card(
                 "message": "Failed to delete credit card",
                 "details": str(e)
             }
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/limit-history",
+    response_model=CardLimitHistoryResponse,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema}
+    },
+    summary="Credit Limit History",
+    description="""
+    List the credit-limit history of the authenticated user's cards, oldest first.
+
+    Defaults to the last 365 days. Narrow the window with `start`/`end`
+    and to one card with `card_id`.
+    """
+)
+async def get_limit_history(
+        start: Optional[datetime] = Query(None, description="Inclusive lower bound (default: 365 days ago)"),
+        end: Optional[datetime] = Query(None, description="Exclusive upper bound (default: now)"),
+        card_id: Optional[int] = Query(None, description="Only this card"),
+        limit: int = Query(500, ge=1, le=5000, description="Maximum entries to return"),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+) -> CardLimitHistoryResponse:
+    """
+    Return credit-limit snapshots in a time window.
+
+    The time bounds are applied to created_at, which the BRIN index covers,
+    so only the block ranges inside the window are read.
+
+    Args:
+        start: Start of the window
+        end: End of the window
+        card_id: Optional card filter
+        limit: Maximum number of entries
+        current_user: Currently authenticated user (from JWT token)
+        db: Read-only database session
+
+    Returns:
+        CardLimitHistoryResponse: Matching snapshots, oldest first
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=365)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": "start must be before end",
+                "details": None
+            }
+        )
+
+    query = db.query(CardLimitSnapshot).filter(
+        CardLimitSnapshot.user_id == current_user.id,
+        CardLimitSnapshot.created_at >= start,
+        CardLimitSnapshot.created_at < end
+    )
+    if card_id is not None:
+        query = query.filter(CardLimitSnapshot.card_id == card_id)
+
+    snapshots = query.order_by(CardLimitSnapshot.created_at).limit(limit).all()
+
+    return CardLimitHistoryResponse(
+        status="success",
+        message=f"Found {len(snapshots)} limit changes",
+        data=[CardLimitSnapshotResponse.model_validate(snapshot) for snapshot in snapshots]
+    )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in EXPORT_FORMATS.values()},
+            "description": "Card export, streamed as it is read"
+        },
+        401: {"model": ErrorResponseSchema},
+        422: {"model": ErrorResponseSchema}
+    },
+    summary="Export Credit Cards",
+    description="""
+    Download all of the authenticated user's credit cards (active and deleted)
+    as CSV or NDJSON. Optionally include the matching optimisation ranges.
+
+    The file is streamed from a server-side cursor, so exports of any size
+    use the same amount of server memory.
+    """
+)
+async def export_credit_cards(
+        format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+        include_optimisations: bool = Query(False, description="Join each card to its optimisation ranges"),
+        current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Stream the user's cards as CSV or NDJSON.
+
+    Args:
+        format: Output format
+        include_optimisations: Whether to add optimisation columns
+        current_user: Currently authenticated user (from JWT token)
+
+    Returns:
+        StreamingResponse: The encoded export
+    """
+    extension = "csv" if format == "csv" else "ndjson"
+    shard = shard_directory.shard_for_email(current_user.email)
+    return StreamingResponse(
+        stream_card_export(
+            lambda: ReadSessionLocal(info={"shard": shard}),
+            format,
+            current_user.id,
+            include_optimisations
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="credit_cards.{extension}"'}
+    )
+
+
+@router.put(
+    "/restore-credit-card/{card_id}",
+    response_model=CreditCardEditResponse,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema},
+        403: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema}
+    },
+    summary="Restore Archived Credit Card",
+    description="""
+    Bring back a card that was deleted long enough ago to be archived.
+    The card returns to your active cards with its original id and details.
+    """
+)
+async def restore_credit_card(
+        card_id: int,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+) -> CreditCardEditResponse:
+    """
+    Move a card from credit_cards_archive back into credit_cards and reactivate it.
+
+    Args:
+        card_id: ID of the archived card
+        current_user: Currently authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        CreditCardEditResponse: The restored, active card
+
+    Raises:
+        HTTPException: If the card isn't archived, isn't the user's, or duplicates an active card
+    """
+    try:
+        archived = db.query(CreditCardArchive).filter(CreditCardArchive.id == card_id).first()
+
+        if not archived:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "status": "error",
+                    "message": "Archived credit card not found in our records.",
+                    "details": None
+                }
+            )
+
+        if archived.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail={
+                    "status": "error",
+                    "message": "You don't have permission to restore this credit card",
+                    "details": None
+                }
+            )
+
+        # Same exact-duplicate rule as adding a card
+        duplicate = db.query(CreditCard.id).filter(
+            CreditCard.user_id == current_user.id,
+            CreditCard.card_name == archived.card_name,
+            CreditCard.credit_limit == archived.credit_limit,
+            CreditCard.billing_start_date == archived.billing_start_date,
+            CreditCard.billing_end_date == archived.billing_end_date,
+            CreditCard.status == True
+        ).first()
+        if duplicate:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "status": "error",
+                    "message": f"You already have an identical active {archived.card_name} card.",
+                    "details": {"card_id": duplicate.id}
+                }
+            )
+
+        card = CreditCard(
+            id=archived.id,
+            user_id=archived.user_id,
+            card_name=archived.card_name,
+            credit_limit=archived.credit_limit,
+            billing_start_date=archived.billing_start_date,
+            billing_end_date=archived.billing_end_date,
+            status=True,
+            created_at=archived.created_at
+        )
+        db.delete(archived)
+        db.add(card)
+        announce_card_change(db, current_user.id, card, "restore")
+        db.commit()
+        db.refresh(card)
+
+        return CreditCardEditResponse(
+            status="success",
+            message=f"Welcome back! {card.card_name} is active again. 💳",
+            data=CreditCardResponse.model_validate(card)
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": "Failed to restore credit card",
+                "details": str(e)
+            }
+        )
+
+
+@router.get(
+    "/history",
+    response_model=CreditCardHistoryResponse,
+    responses={
+        401: {"model": ErrorResponseSchema}
+    },
+    summary="Credit Card History",
+    description="""
+    List every card the authenticated user has ever added: active cards,
+    deleted cards and cards that have been archived, newest first.
+    """
+)
+async def get_card_history(
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+) -> CreditCardHistoryResponse:
+    """
+    Read the user's cards from both credit_cards and credit_cards_archive.
+
+    Args:
+        current_user: Currently authenticated user (from JWT token)
+        db: Read-only database session
+
+    Returns:
+        CreditCardHistoryResponse: All of the user's cards
+    """
+    def card_columns(model):
+        return (
+            model.id, model.user_id, model.card_name, model.credit_limit,
+            model.billing_start_date, model.billing_end_date, model.status,
+            model.created_at, model.updated_at
+        )
+
+    live = select(
+        *card_columns(CreditCard),
+        literal(False).label("archived"),
+        null().label("archived_at")
+    ).where(CreditCard.user_id == current_user.id)
+
+    archived = select(
+        *card_columns(CreditCardArchive),
+        literal(True).label("archived"),
+        CreditCardArchive.archived_at
+    ).where(CreditCardArchive.user_id == current_user.id)
+
+    history = union_all(live, archived).subquery()
+    rows = db.execute(select(history).order_by(history.c.created_at.desc())).all()
+
+    return CreditCardHistoryResponse(
+        status="success",
+        message=f"Found {len(rows)} cards",
+        data=[CreditCardHistoryEntry.model_validate(row._mapping) for row in rows]
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=CreditCardBatchResponse,
+    responses={
+        400: {
+            "model": ErrorResponseSchema,
+            "description": "At least one operation failed; nothing was saved"
+        },
+        401: {"model": ErrorResponseSchema},
+        422: {"model": ErrorResponseSchema}
+    },
+    summary="Batch Card Changes",
+    description="""
+    Apply an ordered list of add, edit and delete operations in one request.
+
+    Every operation follows the same rules as its single-card endpoint.
+    The batch runs in one transaction: if any operation fails, nothing is
+    saved and the response lists which operations failed and why.
+    """
+)
+async def batch_credit_cards(
+        batch: CreditCardBatchRequest,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+) -> CreditCardBatchResponse:
+    """
+    Validate and apply several card changes with one authentication and one transaction.
+
+    All cards the batch needs (referenced cards plus the user's active cards
+    for duplicate checks) are loaded with a single locking SELECT. Operations
+    are then applied in order in memory, and a single flush writes them:
+    one multi-row INSERT for new cards, batched UPDATEs for edits and deletes,
+    and one INSERT for the limit snapshots.
+
+    Args:
+        batch: Ordered operations
+        current_user: Currently authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        CreditCardBatchResponse: One result per operation
+
+    Raises:
+        HTTPException: 400 with per-operation results if any operation fails
+    """
+    try:
+        referenced_ids = {op.card_id for op in batch.operations if op.op != "add"}
+        loaded = db.query(CreditCard).filter(
+            or_(
+                CreditCard.id.in_(referenced_ids),
+                and_(CreditCard.user_id == current_user.id, CreditCard.status == True)
+            )
+        ).with_for_update().all()
+
+        cards_by_id = {card.id: card for card in loaded}
+        active_cards = [card for card in loaded if card.user_id == current_user.id and card.status]
+
+        results = []
+        new_cards = []
+        changed_limits = []
+        touched = []  # (result, card) pairs to serialise once saved
+
+        for index, operation in enumerate(batch.operations):
+            result = CreditCardOperationResult(
+                index=index,
+                op=operation.op,
+                status="success",
+                message="",
+                card_id=getattr(operation, "card_id", None)
+            )
+            results.append(result)
+
+            if operation.op == "add":
+                card_data = operation.data
+                duplicate = any(
+                    card.card_name == card_data.card_name.value
+                    and card.credit_limit == card_data.credit_limit
+                    and card.billing_start_date == card_data.billing_start_date
+                    and card.billing_end_date == card_data.billing_end_date
+                    for card in active_cards
+                )
+                if duplicate:
+                    result.status = "error"
+                    result.message = f"You already have an identical {card_data.card_name.value} card."
+                    continue
+
+                card = CreditCard(
+                    user_id=current_user.id,
+                    card_name=card_data.card_name.value,
+                    credit_limit=card_data.credit_limit,
+                    billing_start_date=card_data.billing_start_date,
+                    billing_end_date=card_data.billing_end_date,
+                    status=True
+                )
+                new_cards.append(card)
+                touched.append((result, card))
+                active_cards.append(card)
+                result.message = "Credit card added"
+                continue
+
+            card = cards_by_id.get(operation.card_id)
+            if not card or not card.status:
+                result.status = "error"
+                result.message = "Credit card not found or is already deleted"
+                continue
+            if card.user_id != current_user.id:
+                result.status = "error"
+                result.message = f"You don't have permission to {operation.op} this credit card"
+                continue
+
+            if operation.op == "edit":
+                card_data = operation.data
+                if not any([card_data.credit_limit, card_data.billing_start_date, card_data.billing_end_date]):
+                    result.status = "error"
+                    result.message = "No fields provided for update"
+                    continue
+
+                if card_data.credit_limit and card_data.credit_limit != card.credit_limit:
+                    card.credit_limit = card_data.credit_limit
+                    changed_limits.append(card)
+                if card_data.billing_start_date and card_data.billing_end_date:
+                    card.billing_start_date = card_data.billing_start_date
+                    card.billing_end_date = card_data.billing_end_date
+                result.message = "Credit card updated"
+            else:
+                card.status = False
+                active_cards.remove(card)
+                result.message = "Credit card deleted"
+
+            touched.append((result, card))
+
+        failed = [result for result in results if result.status == "error"]
+        if failed:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "status": "error",
+                    "message": (
+                        f"{len(failed)} of {len(results)} operations failed. "
+                        "No changes were saved."
+                    ),
+                    "details": {"results": [result.model_dump() for result in results]}
+                }
+            )
+
+        # One flush writes the new cards (multi-row INSERT ... RETURNING) and all updates
+        db.add_all(new_cards)
+        db.flush()
+
+        db.add_all(
+            [CardLimitSnapshot.for_card(card, "created") for card in new_cards]
+            + [CardLimitSnapshot.for_card(card, "updated") for card in changed_limits]
+        )
+        saved_ids = {card.id for _, card in touched}
+        for result, card in touched:
+            announce_card_change(db, current_user.id, card, result.op)
+        db.commit()
+
+        # Reload every saved card (timestamps are set by the database) in one SELECT
+        db.query(CreditCard).filter(CreditCard.id.in_(saved_ids)).all()
+        for result, card in touched:
+            result.card_id = card.id
+            result.data = CreditCardResponse.model_validate(card)
+
+        return CreditCardBatchResponse(
+            status="success",
+            message=f"Applied {len(results)} card changes 💳",
+            data=results
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except Exception as e:
+        db.rollback()
+        logger.error("Error applying credit card batch: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": "Failed to apply credit card changes",
+                "details": str(e)
+            }
+        )
+
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return, e.g. id,card_name,billing_start_date,billing_end_date. "
+    "Only these columns are read from the database. Default: all fields."
+)
+
+
+@router.get(
+    "/cards",
+    response_model=CreditCardListResponse,
+    response_model_exclude_unset=True,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema}
+    },
+    summary="List Credit Cards",
+    description="""
+    List the authenticated user's credit cards (active only by default).
+
+    Use `fields=` to receive only the fields a screen needs; the database
+    query then selects only those columns.
+    """
+)
+async def list_credit_cards(
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        include_inactive: bool = Query(False, description="Also return deleted cards"),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+) -> CreditCardListResponse:
+    """
+    List cards, selecting only the requested columns.
+
+    Args:
+        fields: Sparse fieldset
+        include_inactive: Whether to include soft-deleted cards
+        current_user: Currently authenticated user (from JWT token)
+        db: Read-only database session
+
+    Returns:
+        CreditCardListResponse: The user's cards, limited to the requested fields
+    """
+    columns = [getattr(CreditCard, name) for name in parse_card_fields(fields)]
+
+    query = select(*columns).where(CreditCard.user_id == current_user.id)
+    if not include_inactive:
+        query = query.where(CreditCard.status == True)
+    rows = db.execute(query.order_by(CreditCard.id)).all()
+
+    return CreditCardListResponse(
+        status="success",
+        message=f"Found {len(rows)} credit cards",
+        data=[CreditCardPartialResponse(**row._mapping) for row in rows]
+    )
+
+
+@router.get(
+    "/cards/{card_id}",
+    response_model=CreditCardDetailResponse,
+    response_model_exclude_unset=True,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema}
+    },
+    summary="Get Credit Card",
+    description="Get one of the authenticated user's credit cards, optionally limited with `fields=`."
+)
+async def get_credit_card(
+        card_id: int,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+) -> CreditCardDetailResponse:
+    """
+    Fetch one card, selecting only the requested columns.
+
+    Args:
+        card_id: ID of the credit card
+        fields: Sparse fieldset
+        current_user: Currently authenticated user (from JWT token)
+        db: Read-only database session
+
+    Returns:
+        CreditCardDetailResponse: The card, limited to the requested fields
+
+    Raises:
+        HTTPException: If the card doesn't exist or belongs to someone else
+    """
+    columns = [getattr(CreditCard, name) for name in parse_card_fields(fields)]
+
+    row = db.execute(
+        select(*columns).where(
+            CreditCard.id == card_id,
+            CreditCard.user_id == current_user.id
+        )
+    ).first()
+
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "status": "error",
+                "message": "Credit card not found in our records.",
+                "details": None
+            }
+        )
+
+    return CreditCardDetailResponse(
+        status="success",
+        message="Credit card found",
+        data=CreditCardPartialResponse(**row._mapping)
+    )
+
+
+@router.get(
+    "/events",
+    responses={
+        401: {"model": ErrorResponseSchema},
+        503: {"model": ErrorResponseSchema}
+    },
+    summary="Stream Card Changes",
+    description="""
+    Server-sent events stream of the authenticated user's card changes
+    (`card.add`, `card.edit`, `card.delete`, `card.restore`), so other
+    devices stay in sync without polling.
+
+    Each event's data holds the card as saved. Reconnect with the
+    `Last-Event-ID` header to receive the events missed in between; a
+    `reset` event means too much was missed and the card list should be
+    fetched again. A comment line is sent every few seconds as a heartbeat.
+    """
+)
+async def stream_card_events(
+        last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+        user_id: int = Depends(get_current_user_id),
+        db: Session = Depends(get_db),
+        read_db: Session = Depends(get_read_db)
+) -> StreamingResponse:
+    """
+    Open an event stream of the user's card changes.
+
+    Args:
+        last_event_id: Id of the last event the client received, to resume from
+        user_id: Currently authenticated user's id (from JWT token)
+        db: Primary session used by authentication; released before streaming
+        read_db: Read session used by authentication; released before streaming
+
+    Returns:
+        StreamingResponse: text/event-stream of card events
+
+    Raises:
+        HTTPException: If this worker already holds EVENTS_MAX_CONNECTIONS streams
+    """
+    # The stream can stay open for hours; don't hold database connections for it
+    db.close()
+    read_db.close()
+
+    # Subscribe before responding, so a worker at its cap answers 503 rather than an empty stream
+    try:
+        subscription = event_broker.subscribe(user_id)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "status": "error",
+                "message": "Too many open event streams; retry shortly",
+                "details": None
+            },
+            headers={"Retry-After": str(max(1, settings.EVENTS_RETRY_MILLISECONDS // 1000))}
+        )
+
+    async def stream():
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MILLISECONDS}\n\n".encode("utf-8")
+
+            # Subscribed first, so nothing published from here on slips between replay and stream
+            missed = event_broker.replay_after(user_id, last_event_id) if last_event_id else []
+            if missed is None:
+                yield b"event: reset\ndata: {}\n\n"
+            replayed = set()
+            for item in missed or ():
+                replayed.add(item["id"])
+                yield format_sse(item)
+
+            while not subscription.overflowed and not subscription.closed:
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if item is None:
+                    break
+                if item["id"] not in replayed:
+                    yield format_sse(item)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    async def release():
+        # Async so it runs on the event loop, like every other EventBroker call
+        event_broker.unsubscribe(subscription)
+
+    # unsubscribe() is idempotent; the background task covers a stream that never started
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release)
+    )
@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.db.session import get_db, get_read_db
+from app.db.sharding import bind_to_shard, shard_directory
+from app.models.credit_card import CreditCard
+from app.models.user import User
+from app.schemas.optimisation import (
+    SimulationRequest,
+    SimulationResponse,
+    SimulationResult,
+    PortfolioScore,
+    VariantScore,
+    TodayRecommendation,
+    TodayResponse
+)
+from app.schemas.base import ErrorResponseSchema
+from app.api.deps import get_current_user, get_current_user_id
+from app.core.config import settings
+from app.core.optimisation import simulate_portfolios
+from app.core.catalog import get_catalog
+from app.core.day_index import CYCLE_DAYS, day_index, load_day_slots
+import logging
+import pytz
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post(
+    "/simulate",
+    response_model=SimulationResponse,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema},
+        422: {"model": ErrorResponseSchema}
+    },
+    summary="Simulate Card Portfolio Changes",
+    description="""
+    Score hypothetical changes to your cards before making them.
+
+    Each variant either adds a card or changes the billing dates and limit
+    of one of your active cards. Every variant is scored against your
+    current active cards by interest-free days across the month, and the
+    variants are returned best first. Nothing is saved.
+    """
+)
+async def simulate_optimisation(
+        request: SimulationRequest,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+) -> SimulationResponse:
+    """
+    Rank what-if variants of the user's card portfolio.
+
+    Args:
+        request: Candidate variants
+        current_user: Currently authenticated user (from JWT token)
+        db: Read-only database session
+
+    Returns:
+        SimulationResponse: Current score and ranked variant scores
+
+    Raises:
+        HTTPException: If there are too many variants or a variant names a card the user doesn't have
+    """
+    variants = request.variants
+    if len(variants) > settings.OPTIMISATION_MAX_VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": f"A simulation can score at most {settings.OPTIMISATION_MAX_VARIANTS} variants",
+                "details": {"received": len(variants)}
+            }
+        )
+
+    cards = db.query(
+        CreditCard.id,
+        CreditCard.card_name,
+        CreditCard.billing_end_date,
+        CreditCard.credit_limit
+    ).filter(
+        CreditCard.user_id == current_user.id,
+        CreditCard.status == True
+    ).order_by(CreditCard.id).all()
+    db.close()  # Scoring doesn't need the connection
+
+    positions = {card.id: index for index, card in enumerate(cards)}
+    unknown = sorted({v.card_id for v in variants if v.card_id is not None and v.card_id not in positions})
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "status": "error",
+                "message": "Some variants refer to cards that aren't among your active cards",
+                "details": {"card_ids": unknown}
+            }
+        )
+
+    # Grace periods come from the product catalog; a changed card keeps its product
+    catalog = get_catalog()
+    scores = simulate_portfolios(
+        current_end_dates=[card.billing_end_date for card in cards],
+        current_limits=[card.credit_limit for card in cards],
+        candidate_end_dates=[v.billing_end_date for v in variants],
+        candidate_limits=[v.credit_limit for v in variants],
+        replaces=[positions[v.card_id] if v.card_id is not None else -1 for v in variants],
+        current_grace_days=[catalog.grace_period_days(card.card_name) for card in cards],
+        candidate_grace_days=[
+            catalog.grace_period_days(
+                v.card_name or (cards[positions[v.card_id]].card_name if v.card_id is not None else None)
+            )
+            for v in variants
+        ]
+    )
+
+    baseline = scores["baseline"]
+    ranked = []
+    for rank, index in enumerate(scores["order"].tolist(), start=1):
+        variant = variants[index]
+        mean_days = float(scores["mean_days"][index])
+        ranked.append(VariantScore(
+            index=index,
+            rank=rank,
+            label=variant.label,
+            card_id=variant.card_id,
+            mean_interest_free_days=round(mean_days, 2),
+            min_interest_free_days=int(scores["min_days"][index]),
+            total_credit_limit=int(scores["total_limit"][index]),
+            change_in_mean_days=round(mean_days - baseline["mean_days"], 2),
+            days_as_best_card=int(scores["days_as_best"][index])
+        ))
+
+    return SimulationResponse(
+        status="success",
+        message=f"Scored {len(variants)} variant(s) against {len(cards)} active card(s).",
+        data=SimulationResult(
+            grace_period_days=settings.CARD_GRACE_PERIOD_DAYS,
+            current=PortfolioScore(
+                mean_interest_free_days=round(baseline["mean_days"], 2),
+                min_interest_free_days=baseline["min_days"],
+                total_credit_limit=baseline["total_limit"]
+            ),
+            variants=ranked
+        )
+    )
+
+
+@router.get(
+    "/today",
+    response_model=TodayResponse,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema}
+    },
+    summary="Best Card for Today",
+    description="""
+    Return the card to use today according to your saved optimisation ranges.
+
+    "Today" is the current date in the given IANA time zone (default UTC).
+    Answers come from a cached per-user day index that is rebuilt whenever
+    your ranges or cards change.
+    """
+)
+async def best_card_today(
+        timezone: str = Query("UTC", description="IANA time zone name, e.g. America/Toronto"),
+        user_id: int = Depends(get_current_user_id),
+        db: Session = Depends(get_db)
+) -> TodayResponse:
+    """
+    Look up today's card in the user's day index.
+
+    Args:
+        timezone: IANA time zone the user's day is counted in
+        user_id: Currently authenticated user's id (from JWT token)
+        db: Primary session, only used to rebuild a missing index
+
+    Returns:
+        TodayResponse: Today's date, day of the cycle and card
+
+    Raises:
+        HTTPException: If the time zone is unknown
+    """
+    try:
+        zone = pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": "Unknown time zone",
+                "details": {"timezone": timezone}
+            }
+        )
+    today = datetime.now(zone).date()
+
+    slots = day_index.get(user_id)
+    if slots is None:
+        # Built from the primary, so a lagging replica can't put stale ranges in the cache
+        bind_to_shard(shard_directory.shard_for_user(user_id), db)
+        slots = load_day_slots(db, user_id)
+        db.close()
+        day_index.put(user_id, slots)
+
+    card_name = slots[today.day - 1]
+    best_until = None
+    if card_name is not None:
+        best_until = today
+        for _ in range(CYCLE_DAYS - 1):
+            following = best_until + timedelta(days=1)
+            if slots[following.day - 1] != card_name:
+                break
+            best_until = following
+
+    return TodayResponse(
+        status="success",
+        message=f"Use your {card_name} today." if card_name else "No saved range covers today.",
+        data=TodayRecommendation(
+            date=today,
+            day=today.day,
+            timezone=zone.zone,
+            card_name=card_name,
+            best_until=best_until
+        )
+    )
@@ -0,0 +1,118 @@
+import io
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.models.credit_card import CreditCard
+from app.models.user import User
+from app.schemas.transaction import StatementIngestResponse, StatementIngestResult
+from app.schemas.base import ErrorResponseSchema
+from app.api.deps import get_current_user
+from app.core.ledger import ingest_statement, detect_format, StatementRowError
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post(
+    "/{card_id}/ingest",
+    response_model=StatementIngestResponse,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        401: {"model": ErrorResponseSchema},
+        403: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema}
+    },
+    summary="Import Card Statement",
+    description="""
+    Import a statement batch for one of your credit cards.
+
+    Accepts CSV (header: posted_on, amount, description, reference[, currency])
+    or NDJSON with the same keys. Transactions already imported for the card
+    (same posting date and reference) are skipped, so re-uploading a
+    statement is safe. Invalid rows are skipped and reported.
+    """
+)
+async def ingest_card_statement(
+        card_id: int,
+        file: UploadFile = File(..., description="CSV or NDJSON statement"),
+        format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name if omitted"),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+) -> StatementIngestResponse:
+    """
+    Stream a statement upload into the card transaction ledger.
+
+    Args:
+        card_id: Card the statement belongs to
+        file: Uploaded statement (spooled to disk by the server, never held in memory)
+        format: Optional explicit statement format
+        current_user: Currently authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        StatementIngestResponse: Counts of inserted, duplicate and rejected rows
+
+    Raises:
+        HTTPException: If the card isn't the user's or the format is unsupported
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+    except StatementRowError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": str(e), "details": None}
+        )
+
+    card = db.query(CreditCard.user_id).filter(CreditCard.id == card_id).first()
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "status": "error",
+                "message": "Credit card not found in our records.",
+                "details": None
+            }
+        )
+    if card.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "status": "error",
+                "message": "You don't have permission to import transactions for this credit card",
+                "details": None
+            }
+        )
+
+    engine = db.get_bind()
+    db.close()  # Release the session's connection; the import uses its own
+
+    try:
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        result = await run_in_threadpool(ingest_statement, engine, card_id, stream, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "Statement must be UTF-8 encoded", "details": None}
+        )
+    except Exception as e:
+        logger.error("Error importing statement for card %s: %s", card_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "status": "error",
+                "message": "Failed to import statement",
+                "details": str(e)
+            }
+        )
+
+    return StatementIngestResponse(
+        status="success",
+        message=(
+            f"Statement imported: {result.inserted:,} new transactions, "
+            f"{result.duplicates:,} duplicates skipped."
+        ),
+        data=StatementIngestResult(card_id=card_id, format=fmt, **result.as_dict())
+    )
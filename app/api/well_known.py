@@ -0,0 +1,49 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from app.core.config import settings
+from app.core.signing_keys import get_signing_keys, uses_asymmetric_keys
+
+router = APIRouter()
+
+
+@router.get(
+    "/.well-known/jwks.json",
+    summary="JSON Web Key Set",
+    description="""
+    Public keys that verify our access tokens, matched by the token's `kid`
+    header. Services can cache this document and verify tokens locally.
+
+    Send If-None-Match with the ETag to get a 304 when the keys haven't changed.
+    """
+)
+async def read_jwks(if_none_match: Optional[str] = Header(None)) -> Response:
+    """
+    Serve the pre-encoded JWKS document from memory.
+
+    Args:
+        if_none_match: ETag the client already has
+
+    Returns:
+        Response: The key set, or 304 Not Modified
+
+    Raises:
+        HTTPException: If tokens are signed with a shared secret (nothing to publish)
+    """
+    if not uses_asymmetric_keys():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "status": "error",
+                "message": "Tokens are not signed with public-key cryptography",
+                "details": {"algorithm": settings.ALGORITHM}
+            }
+        )
+
+    keys = get_signing_keys()
+    headers = {
+        "ETag": keys.etag,
+        "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"
+    }
+    if if_none_match and keys.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=keys.jwks_body, media_type="application/jwk-set+json", headers=headers)
@@ -0,0 +1,150 @@
+# app/core/arrow_export.py
+"""
+Columnar (Arrow IPC / Parquet) exports of the core tables for analytics.
+
+pyarrow is only needed by this module, so it is imported lazily and the
+rest of the app runs without it.
+"""
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, Table
+from sqlalchemy import types as sqltypes
+from sqlalchemy.orm import Session
+
+from app.core.export import iter_row_batches
+from app.models.user import User
+from app.models.credit_card import CreditCard
+from app.models.optimisation import Optimisation
+
+ANALYTICS_FORMATS = ("parquet", "arrow")
+
+ANALYTICS_TABLES: Dict[str, Table] = {
+    "users": User.__table__,
+    "credit_cards": CreditCard.__table__,
+    "optimisations": Optimisation.__table__
+}
+
+# Columns that must never leave the database
+EXCLUDED_COLUMNS = {
+    "users": {"hashed_password", "salt"}
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Analytics exports need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def arrow_type(column_type: sqltypes.TypeEngine):
+    """
+    Map a SQLAlchemy column type to the matching Arrow type.
+
+    Raises:
+        TypeError: For column types with no mapping
+    """
+    pa = _pyarrow()
+    if isinstance(column_type, sqltypes.SmallInteger):
+        return pa.int16()
+    if isinstance(column_type, sqltypes.BigInteger):
+        return pa.int64()
+    if isinstance(column_type, sqltypes.Integer):
+        return pa.int32()
+    if isinstance(column_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sqltypes.DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, sqltypes.Date):
+        return pa.date32()
+    if isinstance(column_type, sqltypes.Numeric):
+        return pa.float64()
+    if isinstance(column_type, sqltypes.String):
+        return pa.string()
+    raise TypeError(f"No Arrow type for column type {column_type!r}")
+
+
+def export_table(
+        db: Session,
+        name: str,
+        path: str,
+        fmt: str,
+        batch_size: Optional[int] = None
+) -> int:
+    """
+    Write one table to an Arrow IPC or Parquet file, one record batch per
+    server-side cursor fetch.
+
+    Args:
+        db: Session to read from
+        name: Key of ANALYTICS_TABLES
+        path: Output file
+        fmt: "parquet" or "arrow"
+        batch_size: Rows per record batch
+
+    Returns:
+        int: Number of rows written
+    """
+    pa = _pyarrow()
+    table = ANALYTICS_TABLES[name]
+    columns = [c for c in table.columns if c.name not in EXCLUDED_COLUMNS.get(name, set())]
+    schema = pa.schema([
+        pa.field(c.name, arrow_type(c.type), nullable=c.nullable) for c in columns
+    ])
+
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_file(path, schema)
+        write = writer.write_batch
+
+    rows = 0
+    try:
+        query = select(*columns).order_by(table.c.id)
+        for batch in iter_row_batches(db, query, batch_size):
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*batch), schema)
+            ]
+            write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(batch)
+    finally:
+        writer.close()
+    return rows
+
+
+def export_tables(
+        session_factory: Callable[[], Session],
+        output_dir: str,
+        fmt: str,
+        tables: Optional[Iterable[str]] = None,
+        batch_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Export several tables into `output_dir` as <table>.parquet or <table>.arrow.
+
+    Returns:
+        Dict mapping table name to rows written
+    """
+    if fmt not in ANALYTICS_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(ANALYTICS_FORMATS)}")
+    names: List[str] = list(tables or ANALYTICS_TABLES)
+    unknown = [name for name in names if name not in ANALYTICS_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(unknown)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    db = session_factory()
+    try:
+        for name in names:
+            path = os.path.join(output_dir, f"{name}.{fmt}")
+            written[name] = export_table(db, name, path, fmt, batch_size)
+    finally:
+        db.close()
+    return written
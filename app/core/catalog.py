@@ -0,0 +1,187 @@
+# app/core/catalog.py
+"""
+In-memory catalog of card products (fees, grace periods, reward rates).
+
+The catalog is read once at startup from a versioned JSON file
+(CATALOG_PATH) into immutable records indexed by CreditCardCompany, so
+optimisation and validation code can look products up without a query.
+Editing the file is picked up without a restart: get_catalog() checks the
+file's modification time at most every CATALOG_RELOAD_CHECK_SECONDS and
+swaps in the new catalog if it loads cleanly.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Union
+
+from app.core.config import settings
+from app.core.constants import CreditCardCompany
+from app.core.startup import register_warmup
+
+logger = logging.getLogger(__name__)
+
+
+class CardProduct:
+    """
+    Metadata for one card product. Instances are read-only.
+    """
+    __slots__ = (
+        "card_name", "issuer", "network", "annual_fee",
+        "grace_period_days", "reward_rate", "foreign_transaction_fee"
+    )
+
+    def __init__(
+            self,
+            card_name: CreditCardCompany,
+            issuer: str,
+            network: str,
+            annual_fee: float,
+            grace_period_days: int,
+            reward_rate: float,
+            foreign_transaction_fee: float
+    ):
+        for name, value in (
+                ("card_name", card_name),
+                ("issuer", issuer),
+                ("network", network),
+                ("annual_fee", float(annual_fee)),
+                ("grace_period_days", int(grace_period_days)),
+                ("reward_rate", float(reward_rate)),
+                ("foreign_transaction_fee", float(foreign_transaction_fee))
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CardProduct is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("CardProduct is read-only")
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            name: (value.value if isinstance(value, CreditCardCompany) else value)
+            for name, value in ((name, getattr(self, name)) for name in self.__slots__)
+        }
+
+    def __repr__(self):
+        return f"<CardProduct {self.card_name.value}>"
+
+
+class Catalog:
+    """
+    One loaded version of the catalog.
+
+    `etag` is derived from the file contents and `body` is the catalog
+    already encoded as the GET /catalog response, so serving it is free.
+    """
+
+    def __init__(self, version: str, products: Mapping[CreditCardCompany, CardProduct], digest: str, mtime: float):
+        self.version = version
+        self.products = MappingProxyType(dict(products))
+        self.etag = f'"{version}-{digest[:16]}"'
+        self.mtime = mtime
+        self.body = json.dumps({
+            "status": "success",
+            "message": f"Card catalog version {version}",
+            "data": {
+                "version": version,
+                "products": [product.as_dict() for product in self.products.values()]
+            }
+        }).encode("utf-8")
+
+    def get(self, card_name: Union[CreditCardCompany, str]) -> Optional[CardProduct]:
+        """Look a product up by enum member or by its display name."""
+        try:
+            return self.products.get(CreditCardCompany(card_name))
+        except ValueError:
+            return None
+
+    def grace_period_days(self, card_name: Union[CreditCardCompany, str, None]) -> int:
+        """Grace period for a product, or CARD_GRACE_PERIOD_DAYS when it isn't known."""
+        product = self.get(card_name) if card_name is not None else None
+        return product.grace_period_days if product else settings.CARD_GRACE_PERIOD_DAYS
+
+
+def load_catalog(path: str) -> Catalog:
+    """
+    Read and validate a catalog file.
+
+    Raises:
+        ValueError: If the file is malformed, names an unknown card, or
+            misses a CreditCardCompany member
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    mtime = os.path.getmtime(path)
+
+    try:
+        document = json.loads(raw)
+        version = str(document["version"])
+        entries = document["products"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid catalog file {path}: {e}")
+
+    products = {}
+    for name, fields in entries.items():
+        try:
+            card_name = CreditCardCompany(name)
+        except ValueError:
+            raise ValueError(f"Catalog lists unknown card '{name}'")
+        try:
+            products[card_name] = CardProduct(card_name=card_name, **fields)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid catalog entry for '{name}': {e}")
+
+    missing = [member.value for member in CreditCardCompany if member not in products]
+    if missing:
+        raise ValueError(f"Catalog is missing: {', '.join(missing)}")
+
+    # Keep the enum's order so responses are stable
+    ordered = {member: products[member] for member in CreditCardCompany}
+    return Catalog(version, ordered, hashlib.sha256(raw).hexdigest(), mtime)
+
+
+_catalog: Optional[Catalog] = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def reload_catalog() -> Catalog:
+    """
+    Load CATALOG_PATH and make it the current catalog.
+    A file that fails validation raises and leaves the current catalog in place.
+    """
+    global _catalog
+    catalog = load_catalog(settings.CATALOG_PATH)
+    with _lock:
+        _catalog = catalog
+    logger.info("Loaded card catalog version %s (%d products)", catalog.version, len(catalog.products))
+    return catalog
+
+
+def get_catalog() -> Catalog:
+    """Return the current catalog, reloading it if the file has changed."""
+    global _next_check
+    catalog = _catalog
+    if catalog is None:
+        return reload_catalog()
+
+    interval = settings.CATALOG_RELOAD_CHECK_SECONDS
+    now = time.monotonic()
+    if interval > 0 and now >= _next_check:
+        _next_check = now + interval
+        try:
+            if os.path.getmtime(settings.CATALOG_PATH) != catalog.mtime:
+                catalog = reload_catalog()
+        except (OSError, ValueError) as e:
+            logger.error("Keeping card catalog %s; reload failed: %s", catalog.version, e)
+    return catalog
+
+
+@register_warmup("catalog")
+def _warm_catalog() -> None:
+    reload_catalog()
@@ -22,6 +22,117 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = 5       # Connections each worker keeps open per database
+    DB_MAX_OVERFLOW: int = 10   # Extra connections allowed when busy
+    DB_POOL_WARMUP: bool = True  # Open DB_POOL_SIZE connections before serving
+
+    # Read replicas (JSON list, e.g. '["postgresql://...", "postgresql://..."]')
+    DATABASE_REPLICA_URLS: List[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # Pin a user's reads to the primary after a write
+    READ_YOUR_WRITES_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared)
+
+    # Extra databases users are spread across (JSON list). Shard 0 is DATABASE_URL,
+    # which also holds the user_shards directory; leave empty for a single database.
+    DATABASE_SHARD_URLS: List[str] = []
+    SHARD_DIRECTORY_CACHE_SECONDS: float = 60.0  # How long a user's shard is cached per worker
+    SHARD_DIRECTORY_CACHE_SIZE: int = 100000
+
+    # Max connections the whole worker fleet may hold on one Postgres server
+    DB_CONNECTION_BUDGET: int = 90
+
+    # Card transaction ledger
+    LEDGER_COPY_CHUNK_ROWS: int = 50000  # Rows per COPY + deduplicating insert transaction
+
+    # Bulk user provisioning
+    ADMIN_EMAILS: List[str] = []  # Users allowed to call the /admin endpoints
+    PROVISIONING_BATCH_SIZE: int = 1000  # Users validated, hashed and inserted together
+    PROVISIONING_MAX_LINE_BYTES: int = 8192  # Longer input lines are rejected without being buffered
+
+    # Background jobs
+    JOB_QUEUE_MAX_SIZE: int = 1000  # Jobs buffered per worker process
+    JOB_QUEUE_WORKERS: int = 4  # Concurrent job runners per worker process
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BACKOFF_SECONDS: float = 1.0  # Doubles after every failed attempt
+    JOB_QUEUE_DURABLE: bool = False  # Also persist jobs in background_jobs (at-least-once)
+    JOB_QUEUE_POLL_SECONDS: float = 5.0  # How often the durable queue is polled
+    JOB_LEASE_SECONDS: int = 300  # A claimed durable job is retried after this long
+
+    # Idempotency-Key support for POST requests
+    IDEMPOTENCY_BACKEND: str = "memory"  # "memory" (per worker LRU) or "redis" (shared)
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # How long a stored response can be replayed
+    IDEMPOTENCY_CACHE_SIZE: int = 10000  # Max keys kept by the memory backend
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # An in-flight key is released after this long
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # How long a concurrent retry waits for the first result
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 65536  # Larger (or non-JSON) request bodies skip idempotency handling
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = 262144  # Larger responses are sent; retries get a 409 instead of a replay
+
+    # Optimisation
+    CARD_GRACE_PERIOD_DAYS: int = 21  # Days between statement date and payment due date
+    OPTIMISATION_MAX_VARIANTS: int = 500  # Candidate portfolios per what-if simulation
+
+    # Card change event streams (server-sent events)
+    EVENTS_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (pub/sub across workers)
+    EVENTS_MAX_CONNECTIONS: int = 5000  # Open streams per worker
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0  # Comment line sent on idle streams
+    EVENTS_QUEUE_SIZE: int = 100  # Undelivered events per stream before it is dropped
+    EVENTS_REPLAY_SIZE: int = 50  # Recent events kept per user for Last-Event-ID
+    EVENTS_REPLAY_USERS: int = 10000  # Users whose recent events are kept per worker
+    EVENTS_RETRY_MILLISECONDS: int = 3000  # Reconnect delay suggested to clients
+
+    # "Best card today" day index
+    DAY_INDEX_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared, invalidated everywhere)
+    DAY_INDEX_TTL_SECONDS: float = 300.0  # Rebuilt from the database at least this often
+    DAY_INDEX_CACHE_SIZE: int = 100000  # Users kept by the memory backend
+    VERIFIED_TOKEN_CACHE_SECONDS: float = 15.0  # Skip the blacklist query for a token checked this recently; 0 = off
+    VERIFIED_TOKEN_BACKEND: str = "redis"  # "redis" (sign-out reaches every worker) or "memory" (per worker)
+    VERIFIED_TOKEN_CACHE_SIZE: int = 100000
+
+    # Card product catalog
+    CATALOG_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "card_catalog.json")
+    CATALOG_RELOAD_CHECK_SECONDS: float = 30.0  # How often the file is checked for edits (0 disables)
+    CATALOG_CACHE_MAX_AGE: int = 86400  # Cache-Control max-age for GET /catalog
+
+    # Card archival
+    CARD_ARCHIVE_AFTER_DAYS: int = 180  # Inactive this long before moving to credit_cards_archive
+    CARD_ARCHIVE_BATCH_SIZE: int = 1000  # Cards moved per transaction
+    CARD_ARCHIVE_BATCH_PAUSE_SECONDS: float = 0.1  # Pause between batches to spare live traffic
+
+    # Online migrations
+    MIGRATION_LOCK_TIMEOUT_SECONDS: float = 2.0  # Give up waiting for a table lock after this long
+    MIGRATION_STATEMENT_TIMEOUT_SECONDS: float = 30.0  # Max runtime of one DDL or backfill statement
+    MIGRATION_LOCK_RETRIES: int = 10  # Attempts after a lock timeout before failing
+    MIGRATION_RETRY_BACKOFF_SECONDS: float = 1.0  # Doubles after every lock timeout (with jitter)
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000  # Primary key range updated per transaction
+    MIGRATION_BACKFILL_PAUSE_SECONDS: float = 0.1  # Pause between batches to spare live traffic
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
+    LOG_QUEUE_SIZE: int = 10000  # Records buffered for the writer thread; more are dropped
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Fraction of low-level records kept
+    LOG_SAMPLE_MAX_LEVEL: str = "DEBUG"  # Highest level the sample rate applies to
+
+    # Request profiling
+    PROFILING_ENABLED: bool = False  # Install the profiling middleware
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled without a signed header
+    PROFILING_INTERVAL_SECONDS: float = 0.005  # Stack sampling interval
+    PROFILING_DIR: str = "profiles"  # Where folded-stack files are written
+    PROFILING_MAX_CONCURRENT: int = 2  # Profiled requests at once per worker
+    PROFILING_SECRET: str = os.getenv("PROFILING_SECRET", "")  # Signs X-Profile headers (default SECRET_KEY)
+    PROFILING_TOKEN_TTL_SECONDS: int = 600  # Lifetime of a signed X-Profile header
+
+    # Exports
+    EXPORT_BATCH_ROWS: int = 5000  # Rows fetched per server-side cursor round-trip
+
+    # Server
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one worker per CPU
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds to drain in-flight requests on shutdown/reload
+
+    # Startup
+    STARTUP_TIME_BUDGET_SECONDS: float = 5.0  # Import + lifespan warm-up budget
+    STARTUP_TIME_BUDGET_STRICT: bool = False  # Refuse to start when over budget
 
     # Redis Configuration
     REDIS_HOST: str = os.getenv("REDIS_HOST", "10.183.88.243")  # Your GCP Redis instance host
@@ -39,8 +150,14 @@ class Settings(BaseSettings):
     REDIS_RETRY_TIMES: int = 3
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # "EdDSA" or "RS256" sign with the keys in JWT_KEYS_DIR instead
+    JWT_KEYS_DIR: str = os.getenv("JWT_KEYS_DIR", "keys")  # <kid>.pem private keys
+    JWT_ACTIVE_KID: str = ""  # Key new tokens are signed with (default: first kid in sort order)
+    JWT_KEYS_RELOAD_CHECK_SECONDS: float = 30.0  # How often JWT_KEYS_DIR is checked for added/removed keys (0 disables)
+    JWT_ACCEPT_HS256_TOKENS: bool = False  # Accept SECRET_KEY tokens issued before switching; turn on for ACCESS_TOKEN_EXPIRE_MINUTES after the switch only
+    JWKS_CACHE_MAX_AGE: int = 3600  # Cache-Control max-age for /.well-known/jwks.json
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
 
     class Config:
         case_sensitive = True
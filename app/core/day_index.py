@@ -0,0 +1,166 @@
+# app/core/day_index.py
+"""
+Per-user day index for "which card should I use today?".
+
+A user's optimisation ranges (value_start..value_end, wrapping past 31)
+are flattened into a 31-slot list where slot d - 1 holds the card to use
+on day d of the month, so answering for any day is a list index. Only
+ranges whose card is still active are indexed.
+
+Indexes are cached per worker ("memory") or in Redis ("redis", shared by
+all workers). An index is dropped when a committed transaction touched
+the user's optimisation rows or cards, and is rebuilt on the next lookup.
+Dropping is per worker with the memory backend, so other workers may
+serve the old index for up to DAY_INDEX_TTL_SECONDS; use "redis" when
+running several workers.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, exists, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.jobs import register_job
+from app.models.credit_card import CreditCard
+from app.models.optimisation import Optimisation
+
+logger = logging.getLogger(__name__)
+
+CYCLE_DAYS = 31
+
+DaySlots = List[Optional[str]]
+
+
+def build_day_slots(ranges: Iterable[Tuple[str, int, int]]) -> DaySlots:
+    """
+    Flatten optimisation ranges into one card per day.
+
+    Args:
+        ranges: (card_name, value_start, value_end) in priority order; a
+            later range wins where two overlap
+
+    Returns:
+        List of 31 card names (None for days no range covers)
+    """
+    slots: DaySlots = [None] * CYCLE_DAYS
+    for card_name, start, end in ranges:
+        days = range(start, end + 1) if start <= end else [*range(start, CYCLE_DAYS + 1), *range(1, end + 1)]
+        for day in days:
+            if 1 <= day <= CYCLE_DAYS:
+                slots[day - 1] = card_name
+    return slots
+
+
+def load_day_slots(db: Session, user_id: int) -> DaySlots:
+    """Build a user's index from their optimisation rows and active cards."""
+    active_card = exists().where(
+        CreditCard.user_id == Optimisation.user_id,
+        CreditCard.card_name == Optimisation.card_name,
+        CreditCard.status == True
+    )
+    rows = db.execute(
+        select(Optimisation.card_name, Optimisation.value_start, Optimisation.value_end)
+        .where(Optimisation.user_id == user_id, active_card)
+        .order_by(Optimisation.id)
+    ).all()
+    return build_day_slots(rows)
+
+
+class DayIndexCache:
+    """
+    TTL cache of day indexes keyed by user id.
+
+    The "memory" backend is an LRU per worker process; "redis" shares the
+    indexes (and their invalidation) across workers.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, backend: str = "memory"):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: "OrderedDict[int, Tuple[float, DaySlots]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[DaySlots]:
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            raw = get_redis().get(f"dayidx:{user_id}")
+            return json.loads(raw) if raw else None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: int, slots: DaySlots) -> None:
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            get_redis().set(f"dayidx:{user_id}", json.dumps(slots), ex=int(self.ttl_seconds))
+            return
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, slots)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int) -> None:
+        if not user_ids:
+            return
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            get_redis().delete(*(f"dayidx:{user_id}" for user_id in user_ids))
+            return
+
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+
+day_index = DayIndexCache(
+    settings.DAY_INDEX_TTL_SECONDS,
+    settings.DAY_INDEX_CACHE_SIZE,
+    settings.DAY_INDEX_BACKEND
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_optimisations(session, flush_context):
+    changed = {
+        instance.user_id
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, Optimisation) and instance.user_id is not None
+    }
+    if changed:
+        session.info.setdefault("day_index_users", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    user_ids = session.info.pop("day_index_users", None)
+    if user_ids:
+        try:
+            day_index.invalidate(*user_ids)
+        except Exception as e:
+            logger.error("Could not invalidate day index for users %s: %s", sorted(user_ids), e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop("day_index_users", None)
+
+
+@register_job("card_changed")
+def _invalidate_on_card_change(payload: Dict[str, Any]) -> None:
+    # Adding, editing or deactivating a card changes which ranges are indexed
+    day_index.invalidate(payload["user_id"])
@@ -0,0 +1,226 @@
+# app/core/events.py
+"""
+Per-user card change events for the GET /creditcard/events stream.
+
+Endpoints call publish_after_commit(db, user_id, event, data); once the
+transaction commits the event gets an id and is fanned out to that user's
+open streams. With EVENTS_BACKEND = "redis" events go through a Redis
+pub/sub channel, so a change made on one worker reaches streams held by
+every worker; "memory" only reaches streams on the same worker.
+
+Every worker keeps the last EVENTS_REPLAY_SIZE events per user, so a
+client that reconnects with Last-Event-ID gets what it missed. A
+subscriber is just a small bounded queue; one that falls too far behind is
+disconnected and catches up by reconnecting.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "card-events"
+
+
+class TooManySubscribers(Exception):
+    """Raised when this worker already holds EVENTS_MAX_CONNECTIONS streams."""
+
+
+class Subscription:
+    """One open stream: a bounded queue of events for a single user."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.closed = False
+
+    def offer(self, item: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Too far behind; the stream closes and the client resumes from its last id
+            self.overflowed = True
+
+
+class EventBroker:
+    """
+    In-process fan-out of user events, optionally fed by Redis pub/sub.
+
+    All methods except publish() must be called on the event loop.
+    """
+
+    def __init__(self, backend: str = "memory"):
+        self.backend = backend
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._recent: "OrderedDict[int, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.connections = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.backend == "redis":
+            self._listener = asyncio.create_task(self._listen_redis(), name="event-listener")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        # Wake every open stream so it can finish
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.closed = True
+                try:
+                    subscription.queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    pass
+        self._loop = None
+
+    def publish(self, user_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        Send an event to a user's streams. Safe to call from any thread.
+        """
+        item = {
+            "id": f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}",
+            "user_id": user_id,
+            "event": event_type,
+            "data": data
+        }
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            get_redis().publish(CHANNEL, json.dumps(item, default=str))
+            return
+
+        if self._loop is None:
+            return
+        if self._on_loop():
+            self._deliver(item)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, item)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Open a stream for a user.
+
+        Raises:
+            TooManySubscribers: If the worker is at EVENTS_MAX_CONNECTIONS
+        """
+        if self.connections >= settings.EVENTS_MAX_CONNECTIONS:
+            raise TooManySubscribers()
+        subscription = Subscription(user_id, settings.EVENTS_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+        self.connections -= 1
+
+    def replay_after(self, user_id: int, last_event_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events for a user newer than `last_event_id`.
+
+        Returns:
+            The missed events (possibly none), or None if that id is no
+            longer buffered and the client has to refetch everything
+        """
+        recent = list(self._recent.get(user_id, ()))
+        for index, item in enumerate(recent):
+            if item["id"] == last_event_id:
+                return recent[index + 1:]
+        return None
+
+    def _deliver(self, item: Dict[str, Any]) -> None:
+        user_id = item["user_id"]
+        recent = self._recent.get(user_id)
+        if recent is None:
+            recent = self._recent[user_id] = deque(maxlen=settings.EVENTS_REPLAY_SIZE)
+            while len(self._recent) > settings.EVENTS_REPLAY_USERS:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(user_id)
+        recent.append(item)
+
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.offer(item)
+
+    async def _listen_redis(self) -> None:
+        from app.core.redis import get_async_redis
+
+        delay = 1.0
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    try:
+                        self._deliver(json.loads(message["data"]))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning("Ignoring malformed card event: %s", e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Card event listener lost Redis; reconnecting in %.0fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+
+def publish_after_commit(db: Session, user_id: int, event_type: str, data: Dict[str, Any]) -> None:
+    """Publish an event to the user's streams once the session's transaction commits."""
+    db.info.setdefault("pending_events", []).append((user_id, event_type, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session):
+    pending = session.info.pop("pending_events", None)
+    if pending:
+        for user_id, event_type, data in pending:
+            try:
+                event_broker.publish(user_id, event_type, data)
+            except Exception as e:
+                logger.error("Could not publish %s for user %s: %s", event_type, user_id, e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session):
+    session.info.pop("pending_events", None)
+
+
+def format_sse(item: Dict[str, Any]) -> bytes:
+    """Encode an event as a server-sent events frame."""
+    return (
+        f"id: {item['id']}\n"
+        f"event: {item['event']}\n"
+        f"data: {json.dumps(item['data'], default=str)}\n\n"
+    ).encode("utf-8")
+
+
+event_broker = EventBroker(settings.EVENTS_BACKEND)
@@ -0,0 +1,135 @@
+# app/core/export.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import select, and_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.models.credit_card import CreditCard
+from app.models.optimisation import Optimisation
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+CARD_COLUMNS = (
+    CreditCard.id,
+    CreditCard.user_id,
+    CreditCard.card_name,
+    CreditCard.credit_limit,
+    CreditCard.billing_start_date,
+    CreditCard.billing_end_date,
+    CreditCard.status,
+    CreditCard.created_at,
+    CreditCard.updated_at
+)
+
+OPTIMISATION_COLUMNS = (
+    Optimisation.id.label("optimisation_id"),
+    Optimisation.value_start.label("optimisation_value_start"),
+    Optimisation.value_end.label("optimisation_value_end")
+)
+
+
+def card_export_query(user_id: Optional[int] = None, include_optimisations: bool = False) -> Select:
+    """
+    Build the SELECT for a card export.
+
+    Plain columns are selected (not ORM entities) so rows are never added to
+    the session's identity map. Optimisations are linked to cards by user
+    and card name, so a card can appear once per optimisation range.
+    """
+    columns = CARD_COLUMNS + (OPTIMISATION_COLUMNS if include_optimisations else ())
+    query = select(*columns)
+    if include_optimisations:
+        query = query.outerjoin(
+            Optimisation,
+            and_(
+                Optimisation.user_id == CreditCard.user_id,
+                Optimisation.card_name == CreditCard.card_name
+            )
+        )
+    if user_id is not None:
+        query = query.where(CreditCard.user_id == user_id)
+    return query.order_by(CreditCard.id)
+
+
+def iter_row_batches(db: Session, query: Select, batch_size: Optional[int] = None) -> Iterator[Sequence[Any]]:
+    """
+    Run a query on a server-side cursor and yield its rows in batches.
+    Only one batch is held in memory at a time.
+    """
+    result = db.execute(query.execution_options(yield_per=batch_size or settings.EXPORT_BATCH_ROWS))
+    try:
+        for batch in result.partitions():
+            yield batch
+    finally:
+        result.close()
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def encode_csv(columns: Sequence[str], batches: Iterator[Sequence[Any]]) -> Iterator[str]:
+    """Encode row batches as CSV text, one chunk per batch, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def encode_ndjson(columns: Sequence[str], batches: Iterator[Sequence[Any]]) -> Iterator[str]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+            for row in batch
+        )
+
+
+def stream_card_export(
+        session_factory: Callable[[], Session],
+        fmt: str,
+        user_id: Optional[int] = None,
+        include_optimisations: bool = False
+) -> Iterator[bytes]:
+    """
+    Produce an encoded card export chunk by chunk.
+
+    The generator opens its own session because it outlives the request's
+    dependencies when used with StreamingResponse.
+
+    Args:
+        session_factory: Callable returning a new session
+        fmt: "csv" or "ndjson"
+        user_id: Restrict to one user's cards, or None for every card
+        include_optimisations: Join each card to the user's optimisation ranges
+
+    Yields:
+        bytes: UTF-8 encoded chunks
+    """
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    query = card_export_query(user_id, include_optimisations)
+    columns = [column.name for column in query.selected_columns]
+
+    db = session_factory()
+    try:
+        for chunk in encode(columns, iter_row_batches(db, query)):
+            yield chunk.encode("utf-8")
+    finally:
+        db.close()
@@ -0,0 +1,402 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key support for POST requests.
+
+A client sends the same Idempotency-Key header on every retry of one
+logical request. The first request runs normally and its response is
+stored; retries get that response replayed without reaching the endpoint
+(or the database). A retry that arrives while the first request is still
+running waits for its result instead of running in parallel.
+
+Keys are scoped to the caller's Authorization header and the request path,
+and a key reused with a different body is rejected.
+
+Only JSON requests up to IDEMPOTENCY_MAX_BODY_BYTES are handled, and only
+responses up to IDEMPOTENCY_MAX_RESPONSE_BYTES are stored for replay. Uploads and
+streamed responses (statement ingest, bulk provisioning, exports) pass
+through with the key ignored, so they keep their constant memory use.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+# Response headers that describe the original connection, not the response
+_UNSTORED_HEADERS = {b"date", b"server", b"set-cookie"}
+
+
+class IdempotencyStore:
+    """
+    TTL store for in-flight and completed idempotent requests.
+
+    Each entry is a dict with "state" ("pending" or "done"), the request
+    "fingerprint" and, once done, the stored "response". The "memory"
+    backend is an LRU per worker process; use "redis" when running several
+    workers so retries landing on another worker are still replayed.
+    """
+
+    def __init__(self, backend: str = "memory", max_entries: int = 10000):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._waiters: Dict[str, asyncio.Event] = {}
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Claim `key` for a new request.
+
+        Returns:
+            None if the caller now owns the key, otherwise the existing entry
+        """
+        entry = {"state": "pending", "fingerprint": fingerprint}
+        if self.backend == "redis":
+            claimed = await asyncio.to_thread(
+                _redis().set, _redis_key(key), json.dumps(entry),
+                nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS
+            )
+            return None if claimed else await self.get(key)
+
+        existing = self._get_memory(key)
+        if existing is not None:
+            return existing
+        self._set_memory(key, entry, settings.IDEMPOTENCY_LOCK_SECONDS)
+        self._waiters[key] = asyncio.Event()
+        return None
+
+    async def get(self, key: str) -> Optional[Dict]:
+        if self.backend == "redis":
+            raw = await asyncio.to_thread(_redis().get, _redis_key(key))
+            return json.loads(raw) if raw else None
+        return self._get_memory(key)
+
+    async def complete(self, key: str, fingerprint: str, response: Dict) -> None:
+        """Store the finished response and wake anyone waiting on the key."""
+        entry = {"state": "done", "fingerprint": fingerprint, "response": response}
+        if self.backend == "redis":
+            await asyncio.to_thread(
+                _redis().set, _redis_key(key), json.dumps(entry), ex=settings.IDEMPOTENCY_TTL_SECONDS
+            )
+        else:
+            self._set_memory(key, entry, settings.IDEMPOTENCY_TTL_SECONDS)
+        self._notify(key)
+
+    async def release(self, key: str) -> None:
+        """Forget a key whose request failed, so the next retry runs again."""
+        if self.backend == "redis":
+            await asyncio.to_thread(_redis().delete, _redis_key(key))
+        else:
+            self._entries.pop(key, None)
+        self._notify(key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        """
+        Wait for an in-flight request to finish.
+
+        Returns:
+            The completed entry, None if the key was released, or the
+            pending entry if `timeout` ran out first
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = await self.get(key)
+            if entry is None or entry["state"] == "done":
+                return entry
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return entry
+
+            waiter = self._waiters.get(key)
+            if self.backend == "redis" or waiter is None:
+                # Another worker owns the key; poll until it finishes
+                await asyncio.sleep(min(0.05, remaining))
+                continue
+            try:
+                await asyncio.wait_for(waiter.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _notify(self, key: str) -> None:
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_memory(self, key: str, entry: Dict, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _redis():
+    from app.core.redis import get_redis
+    return get_redis()
+
+
+def _redis_key(key: str) -> str:
+    return f"idem:{key}"
+
+
+def _error_body(message: str, details: str) -> bytes:
+    return json.dumps({
+        "detail": {"status": "error", "message": message, "details": details}
+    }).encode("utf-8")
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that makes POST requests carrying an Idempotency-Key
+    header safe to retry. Requests without the header pass straight through.
+
+    Responses with a status below 500 are stored for IDEMPOTENCY_TTL_SECONDS
+    and replayed with an Idempotent-Replayed: true header; one too large to
+    store is replaced by a 409 saying so. Server errors (and exceptions)
+    release the key so the client can retry for real.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or IdempotencyStore(
+            settings.IDEMPOTENCY_BACKEND, settings.IDEMPOTENCY_CACHE_SIZE
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, _error_body(
+                "Invalid Idempotency-Key",
+                f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+            ))
+            return
+
+        if not _is_json(headers) or _declared_length(headers) > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            await self.app(scope, receive, send)
+            return
+
+        messages, within_limit = await _read_body(receive, settings.IDEMPOTENCY_MAX_BODY_BYTES)
+        if not within_limit:
+            # Too large to buffer: hand over what was read and let the rest stream through
+            logger.info("Ignoring Idempotency-Key on %s: body over %d bytes", scope["path"], settings.IDEMPOTENCY_MAX_BODY_BYTES)
+            await self.app(scope, _prepend_messages(messages, receive), send)
+            return
+
+        body = b"".join(message.get("body", b"") for message in messages)
+        key = hashlib.sha256(b"\0".join([
+            headers.get(b"authorization", b""),
+            scope["path"].encode("utf-8"),
+            raw_key
+        ])).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        try:
+            existing = await self.store.reserve(key, fingerprint)
+        except Exception as e:
+            # Without the store the request still runs, just without replay
+            logger.error("Idempotency store unavailable: %s", e)
+            await self.app(scope, _replay_body(body), send)
+            return
+
+        if (
+            existing is not None
+            and existing["state"] == "pending"
+            and existing["fingerprint"] == fingerprint
+        ):
+            existing = await self.store.wait(key, settings.IDEMPOTENCY_WAIT_SECONDS)
+            if existing is None:
+                # The first request failed and released the key; try to run this one
+                existing = await self.store.reserve(key, fingerprint)
+
+        if existing is not None:
+            await self._answer_from_store(existing, fingerprint, send)
+            return
+
+        await self._run_and_store(scope, body, send, key, fingerprint)
+
+    async def _answer_from_store(self, entry: Dict, fingerprint: str, send) -> None:
+        if entry["fingerprint"] != fingerprint:
+            await _send_json(send, 422, _error_body(
+                "Idempotency-Key reused",
+                "This Idempotency-Key was already used with a different request body"
+            ))
+            return
+        if entry["state"] != "done":
+            await _send_json(send, 409, _error_body(
+                "Request in progress",
+                "A request with this Idempotency-Key is still being processed; retry shortly"
+            ))
+            return
+
+        response = entry["response"]
+        await send({
+            "type": "http.response.start",
+            "status": response["status"],
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in response["headers"]
+            ] + [(REPLAYED_HEADER, b"true")]
+        })
+        await send({"type": "http.response.body", "body": base64.b64decode(response["body"])})
+
+    async def _run_and_store(self, scope, body: bytes, send, key: str, fingerprint: str) -> None:
+        status = 500
+        response_headers: List[Tuple[str, str]] = []
+        chunks: List[bytes] = []
+        size = 0
+        too_large = False
+
+        async def capture_send(message):
+            nonlocal status, response_headers, size, too_large
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in _UNSTORED_HEADERS
+                ]
+            elif message["type"] == "http.response.body" and not too_large:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                    too_large = True
+                    chunks.clear()
+                else:
+                    chunks.append(chunk)
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body), capture_send)
+        except BaseException:
+            await self.store.release(key)
+            raise
+
+        if status >= 500:
+            await self.store.release(key)
+            return
+        if too_large:
+            # The request did take effect, so keep the key: retries get a small
+            # conflict answer instead of running the request again
+            logger.info(
+                "Storing a placeholder for the idempotent response to %s: over %d bytes",
+                scope["path"], settings.IDEMPOTENCY_MAX_RESPONSE_BYTES
+            )
+            placeholder = _error_body(
+                "Response not replayable",
+                f"The original request completed with status {status}, but its response "
+                f"was too large to store for replay"
+            )
+            status = 409
+            response_headers = [("content-type", "application/json"), ("content-length", str(len(placeholder)))]
+            chunks = [placeholder]
+
+        try:
+            await self.store.complete(key, fingerprint, {
+                "status": status,
+                "headers": response_headers,
+                "body": base64.b64encode(b"".join(chunks)).decode("ascii")
+            })
+        except Exception as e:
+            # The response already went out; the key frees itself after IDEMPOTENCY_LOCK_SECONDS
+            logger.error("Error storing idempotent response: %s", e)
+
+
+def _is_json(headers: Dict[bytes, bytes]) -> bool:
+    content_type = headers.get(b"content-type", b"application/json").split(b";")[0].strip().lower()
+    return content_type == b"application/json" or content_type.endswith(b"+json")
+
+
+def _declared_length(headers: Dict[bytes, bytes]) -> int:
+    try:
+        return int(headers.get(b"content-length", b"0"))
+    except ValueError:
+        return 0
+
+
+async def _read_body(receive, limit: int) -> Tuple[List[Dict], bool]:
+    """
+    Read request body messages, stopping once the body grows past `limit` bytes.
+
+    Returns:
+        Tuple of (messages read, whether they hold the whole body within `limit`)
+    """
+    messages = []
+    size = 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, True
+        size += len(message.get("body", b""))
+        if size > limit:
+            return messages, False
+        if not message.get("more_body", False):
+            return messages, True
+
+
+def _prepend_messages(messages: List[Dict], receive):
+    """Build a receive callable that replays already-read messages, then reads on."""
+    pending = list(messages)
+
+    async def prepended_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+
+    return prepended_receive
+
+
+def _replay_body(body: bytes):
+    """Build a receive callable that hands the app an already-read body."""
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Nothing more to read; wait like a real connection would
+        await asyncio.Event().wait()
+
+    return receive
+
+
+async def _send_json(send, status: int, body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
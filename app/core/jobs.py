@@ -0,0 +1,282 @@
+# app/core/jobs.py
+"""
+Lightweight in-process job queue for work that should happen after a
+database change commits (recomputations, audit writes, cache invalidation).
+
+Endpoints call enqueue_after_commit(db, name, payload); nothing runs unless
+the transaction commits, and the request doesn't wait for the job. With
+JOB_QUEUE_DURABLE the job is also written to background_jobs in the same
+transaction, so it survives a crash and is delivered at least once. That
+row lands on whichever shard the request session is bound to, so every
+shard's background_jobs table is polled, and each job is acknowledged on
+the shard it came from.
+"""
+import asyncio
+import inspect
+import logging
+import random
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, shard_engines
+from app.models.background_job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+# (shard, background_jobs.id) of a durable job
+DurableJobRef = Tuple[int, int]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_job(name: str):
+    """
+    Register the handler for a job name.
+    Handlers receive the payload dict and may be sync (run in a thread) or async.
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue_after_commit(db: Session, name: str, payload: Dict[str, Any]) -> None:
+    """
+    Schedule a job to run once the session's current transaction commits.
+
+    Jobs with no registered handler are ignored, so callers can announce
+    events before anything consumes them.
+    """
+    if name not in _handlers:
+        return
+    if settings.JOB_QUEUE_DURABLE:
+        db.add(BackgroundJob(name=name, payload=payload))
+        db.info["wake_job_queue"] = True
+    else:
+        db.info.setdefault("pending_jobs", []).append((name, payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_jobs(session):
+    pending = session.info.pop("pending_jobs", None)
+    if pending:
+        for name, payload in pending:
+            job_queue.submit(name, payload)
+    if session.info.pop("wake_job_queue", False):
+        job_queue.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_jobs(session):
+    session.info.pop("pending_jobs", None)
+    session.info.pop("wake_job_queue", None)
+
+
+_CLAIM_DURABLE_JOBS = text("""
+    UPDATE background_jobs
+    SET status = 'running', attempts = attempts + 1,
+        run_after = now() + make_interval(secs => :lease)
+    WHERE id IN (
+        SELECT id FROM background_jobs
+        WHERE status != 'failed' AND run_after <= now()
+        ORDER BY run_after
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, name, payload, attempts
+""")
+
+
+class JobQueue:
+    """
+    Bounded asyncio queue with a fixed pool of runner tasks.
+
+    Failed jobs are retried with exponential backoff (plus jitter) up to
+    JOB_MAX_ATTEMPTS. When the queue is full new in-memory jobs are dropped
+    with a warning; durable jobs stay in the table and are picked up later.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._next_shard = 0
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.JOB_QUEUE_MAX_SIZE)
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run_jobs(), name=f"job-runner-{i}")
+            for i in range(settings.JOB_QUEUE_WORKERS)
+        ]
+        if settings.JOB_QUEUE_DURABLE:
+            self._tasks.append(asyncio.create_task(self._poll_durable_jobs(), name="job-poller"))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let queued jobs finish (up to `timeout` seconds), then stop the runners."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping job queue with %d jobs still queued", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+        self._tasks = []
+
+    def submit(self, name: str, payload: Dict[str, Any], attempt: int = 1, job_id: Optional[DurableJobRef] = None) -> bool:
+        """
+        Queue a job. Safe to call from the event loop or from worker threads.
+
+        Returns:
+            bool: False if the queue isn't running or is full
+        """
+        if not self.running:
+            logger.warning("Job queue is not running; dropping job %s", name)
+            return False
+        job = (name, payload, attempt, job_id)
+        if _on_loop(self._loop):
+            return self._put(job)
+        self._loop.call_soon_threadsafe(self._put, job)
+        return True
+
+    def wake(self) -> None:
+        """Ask the durable poller to look for new jobs now instead of at the next poll."""
+        if self.running and self._wake is not None:
+            if _on_loop(self._loop):
+                self._wake.set()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _put(self, job: Tuple) -> bool:
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Job queue full (%d); dropping job %s", self._queue.maxsize, job[0])
+            return False
+
+    async def _run_jobs(self) -> None:
+        while True:
+            name, payload, attempt, job_id = await self._queue.get()
+            try:
+                await self._execute(name, payload, attempt, job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, name: str, payload: Dict[str, Any], attempt: int, job_id: Optional[DurableJobRef]) -> None:
+        handler = _handlers.get(name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job {name}")
+            if inspect.iscoroutinefunction(handler):
+                await handler(payload)
+            else:
+                await asyncio.to_thread(handler, payload)
+        except Exception as e:
+            delay = _backoff(attempt)
+            final = attempt >= settings.JOB_MAX_ATTEMPTS
+            if final:
+                logger.error("Job %s failed on attempt %d: %s", name, attempt, e)
+            else:
+                logger.error("Job %s failed on attempt %d: %s; retrying in %.1fs", name, attempt, e, delay)
+            if job_id is not None:
+                await asyncio.to_thread(_record_durable_failure, job_id, str(e), final, delay)
+            elif not final:
+                self._loop.call_later(delay, self.submit, name, payload, attempt + 1)
+            return
+
+        if job_id is not None:
+            await asyncio.to_thread(_delete_durable_job, job_id)
+
+    async def _poll_durable_jobs(self) -> None:
+        while True:
+            try:
+                free = self._queue.maxsize - self._queue.qsize()
+                # Start at a different shard each poll so a busy shard can't starve the rest
+                shards = list(range(len(shard_engines)))
+                self._next_shard = (self._next_shard + 1) % len(shards)
+                for shard in shards[self._next_shard:] + shards[:self._next_shard]:
+                    if free <= 0:
+                        break
+                    try:
+                        claimed = await asyncio.to_thread(_claim_durable_jobs, shard, free)
+                    except Exception as e:
+                        logger.error("Error polling background_jobs on shard %d: %s", shard, e)
+                        continue
+                    for job_id, name, payload, attempts in claimed:
+                        self._put((name, payload, attempts, (shard, job_id)))
+                    free -= len(claimed)
+            except Exception as e:
+                logger.error("Error polling background_jobs: %s", e)
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.JOB_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _on_loop(loop: Optional[asyncio.AbstractEventLoop]) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def _backoff(attempt: int) -> float:
+    base = settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+    return base + random.uniform(0, base / 2)
+
+
+def _claim_durable_jobs(shard: int, limit: int):
+    db = SessionLocal(info={"shard": shard})
+    try:
+        rows = db.execute(
+            _CLAIM_DURABLE_JOBS, {"limit": limit, "lease": settings.JOB_LEASE_SECONDS}
+        ).all()
+        db.commit()
+        return rows
+    finally:
+        db.close()
+
+
+def _delete_durable_job(job_id: DurableJobRef) -> None:
+    shard, job_id = job_id
+    db = SessionLocal(info={"shard": shard})
+    try:
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _record_durable_failure(job_id: DurableJobRef, error: str, final: bool, delay: float) -> None:
+    shard, job_id = job_id
+    db = SessionLocal(info={"shard": shard})
+    try:
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update({
+            "status": "failed" if final else "queued",
+            "last_error": error[:2000],
+            "run_after": func.now() + timedelta(seconds=delay)
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,266 @@
+# app/core/ledger.py
+import csv
+import json
+import logging
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.copy import chunked, copy_rows
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_FORMATS = ("csv", "ndjson")
+
+# Per-connection staging table; COPY lands here before the deduplicating insert
+STAGING_TABLE = "card_transactions_staging"
+STAGING_COLUMNS = ("posted_on", "amount_cents", "currency", "description", "reference")
+
+_CREATE_STAGING = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+        posted_on date NOT NULL,
+        amount_cents bigint NOT NULL,
+        currency varchar(3) NOT NULL,
+        description varchar(255) NOT NULL,
+        reference varchar(64) NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+_INSERT_FROM_STAGING = f"""
+    INSERT INTO card_transactions (card_id, {', '.join(STAGING_COLUMNS)})
+    SELECT %(card_id)s, {', '.join(STAGING_COLUMNS)} FROM {STAGING_TABLE}
+    ON CONFLICT (card_id, posted_on, reference) DO NOTHING
+"""
+
+# (database, month) pairs whose partition this process has already created or seen
+_known_partitions = set()
+
+MAX_REPORTED_ERRORS = 20
+
+
+class StatementRowError(ValueError):
+    """Raised when a statement row can't be turned into a transaction."""
+
+
+class IngestResult:
+    """
+    Counters for one statement import.
+    Only the first few rejected rows are kept so memory stays bounded.
+    """
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, object]] = []
+
+    def reject(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "errors": self.errors
+        }
+
+
+def detect_format(filename: Optional[str], declared: Optional[str] = None) -> str:
+    """
+    Work out the statement format from an explicit value or the file extension.
+
+    Raises:
+        StatementRowError: If the format is unknown
+    """
+    fmt = (declared or "").lower()
+    if not fmt and filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        fmt = {"jsonl": "ndjson", "json": "ndjson"}.get(extension, extension)
+    if fmt not in STATEMENT_FORMATS:
+        raise StatementRowError(
+            f"Unsupported statement format '{fmt or filename}'. Use one of: {', '.join(STATEMENT_FORMATS)}"
+        )
+    return fmt
+
+
+def iter_statement_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (line number, record) pairs from a CSV or NDJSON statement, one at a time.
+    CSV files need a header row with posted_on, amount, description, reference
+    and optionally currency; NDJSON objects use the same keys.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, StatementRowError(f"Invalid JSON: {e.msg}")
+
+
+def parse_statement_row(record: Dict[str, object]) -> Tuple[date, int, str, str, str]:
+    """
+    Validate one statement record and convert it to a staging row.
+
+    Returns:
+        Tuple of (posted_on, amount_cents, currency, description, reference)
+
+    Raises:
+        StatementRowError: If a field is missing or malformed
+    """
+    if not isinstance(record, dict):
+        raise StatementRowError("Each record must be an object")
+
+    try:
+        posted_on = date.fromisoformat(str(record["posted_on"]).strip())
+    except KeyError:
+        raise StatementRowError("posted_on is required")
+    except ValueError:
+        raise StatementRowError("posted_on must be an ISO date (YYYY-MM-DD)")
+
+    try:
+        amount = Decimal(str(record["amount"]).strip())
+    except KeyError:
+        raise StatementRowError("amount is required")
+    except InvalidOperation:
+        raise StatementRowError("amount must be a number")
+    if not amount.is_finite() or amount.as_tuple().exponent < -2:
+        raise StatementRowError("amount must have at most two decimal places")
+
+    reference = str(record.get("reference") or "").strip()
+    if not reference or len(reference) > 64:
+        raise StatementRowError("reference is required and must be at most 64 characters")
+
+    currency = str(record.get("currency") or "CAD").strip().upper()
+    if len(currency) != 3:
+        raise StatementRowError("currency must be a 3-letter code")
+
+    description = str(record.get("description") or "").strip()[:255]
+
+    return posted_on, int(amount * 100), currency, description, reference
+
+
+def _valid_rows(records: Iterator[Tuple[int, object]], result: IngestResult):
+    """Parse records lazily, counting and skipping the ones that don't validate."""
+    for line_number, record in records:
+        result.received += 1
+        if isinstance(record, StatementRowError):
+            result.reject(line_number, str(record))
+            continue
+        try:
+            yield parse_statement_row(record)
+        except StatementRowError as e:
+            result.reject(line_number, str(e))
+
+
+def _ensure_partitions(cursor) -> List[Tuple[str, date]]:
+    """
+    Create the monthly partitions needed by the rows currently staged.
+
+    Returns:
+        List of (database, month) pairs checked in this transaction; the
+        caller records them as known once the transaction commits
+    """
+    cursor.execute(f"SELECT DISTINCT date_trunc('month', posted_on)::date FROM {STAGING_TABLE}")
+    return ensure_month_partitions(cursor, [month for (month,) in cursor.fetchall()])
+
+
+def ensure_month_partitions(cursor, months: Iterable[date]) -> List[Tuple[str, date]]:
+    """
+    Create the card_transactions partitions for the given months if they
+    don't exist yet on the cursor's database. The caller commits.
+
+    Returns:
+        List of (database, month) pairs to add to _known_partitions after commit
+    """
+    database = cursor.connection.dsn
+    missing = [(database, month) for month in months if (database, month) not in _known_partitions]
+    if not missing:
+        return missing
+
+    # Serialise partition creation between concurrent imports
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('card_transactions_partitions'))")
+    for _, month in missing:
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS card_transactions_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF card_transactions FOR VALUES FROM (%s) TO (%s)",
+            (month, next_month)
+        )
+    return missing
+
+
+def ingest_statement(
+        engine: Engine,
+        card_id: int,
+        stream: TextIO,
+        fmt: str,
+        chunk_size: Optional[int] = None
+) -> IngestResult:
+    """
+    Load a statement for one card into card_transactions.
+
+    Rows are parsed one at a time and streamed with COPY into a temporary
+    staging table, then moved with a single INSERT ... SELECT ... ON CONFLICT
+    DO NOTHING, so rows already imported are skipped. Each chunk commits on
+    its own, so memory and transaction size stay constant however long the
+    statement is.
+
+    Args:
+        engine: Engine for the database that holds the card
+        card_id: Card the statement belongs to (ownership checked by the caller)
+        stream: Text stream of the statement
+        fmt: "csv" or "ndjson"
+        chunk_size: Rows per COPY/insert transaction
+
+    Returns:
+        IngestResult: Counts of received, inserted, duplicate and rejected rows
+    """
+    result = IngestResult()
+    rows = _valid_rows(iter_statement_records(stream, fmt), result)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(_CREATE_STAGING)
+
+        for chunk in chunked(rows, chunk_size or settings.LEDGER_COPY_CHUNK_ROWS):
+            copied = copy_rows(cursor, STAGING_TABLE, STAGING_COLUMNS, chunk)
+            months = _ensure_partitions(cursor)
+            cursor.execute(_INSERT_FROM_STAGING, {"card_id": card_id})
+            inserted = cursor.rowcount
+            connection.commit()
+            _known_partitions.update(months)
+
+            result.inserted += inserted
+            result.duplicates += copied - inserted
+
+        connection.commit()  # Commit the staging table when the statement had no valid rows
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    logger.info(
+        "Ingested statement for card %s: %d inserted, %d duplicates, %d rejected",
+        card_id,
+        result.inserted,
+        result.duplicates,
+        result.rejected
+    )
+    return result
@@ -1,31 +1,126 @@
 # app/core/maintenance.py
 
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import SessionLocal, shard_engines
 from app.models.token_blacklist import TokenBlacklist
-from datetime import datetime
+from app.models.refresh_token import RefreshToken
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import text
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
 def cleanup_expired_tokens():
     """
-    Remove expired tokens from the blacklist table.
+    Remove expired tokens from the blacklist table on every shard.
     Can be run as a scheduled task (e.g., daily cron job).
     """
-    db = SessionLocal()
+    for shard in range(len(shard_engines)):
+        _cleanup_expired_tokens(shard)
+
+
+def _cleanup_expired_tokens(shard: int):
+    db = SessionLocal(info={"shard": shard})
     try:
         # Delete all expired tokens
         deleted = db.query(TokenBlacklist).filter(
             TokenBlacklist.expires_at < datetime.utcnow()
         ).delete()
 
+        # Expired refresh tokens can no longer be used or replayed
+        deleted_refresh = db.query(RefreshToken).filter(
+            RefreshToken.expires_at < datetime.utcnow()
+        ).delete()
+
         db.commit()
-        logger.info(f"Cleaned up {deleted} expired tokens from blacklist")
+        logger.info("Cleaned up %d expired tokens from blacklist on shard %d", deleted, shard)
+        logger.info("Cleaned up %d expired refresh tokens on shard %d", deleted_refresh, shard)
 
     except Exception as e:
-        logger.error(f"Error during token cleanup: {str(e)}")
+        logger.error("Error during token cleanup: %s", e)
         db.rollback()
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+CARD_COLUMNS = (
+    "id, user_id, card_name, credit_limit, billing_start_date, "
+    "billing_end_date, status, created_at, updated_at"
+)
+
+# Move one batch in a single statement: the DELETE ... RETURNING feeds the INSERT.
+# Cards with ledger rows stay put because card_transactions references credit_cards.
+_ARCHIVE_BATCH = text(f"""
+    WITH moved AS (
+        DELETE FROM credit_cards
+        WHERE id IN (
+            SELECT c.id FROM credit_cards c
+            WHERE c.status = false
+              AND c.updated_at < :cutoff
+              AND NOT EXISTS (SELECT 1 FROM card_transactions t WHERE t.card_id = c.id)
+            ORDER BY c.id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING {CARD_COLUMNS}
+    )
+    INSERT INTO credit_cards_archive ({CARD_COLUMNS})
+    SELECT {CARD_COLUMNS} FROM moved
+""")
+
+
+def archive_inactive_cards(
+        older_than_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None
+) -> int:
+    """
+    Move cards that have been inactive for longer than the configured period
+    from credit_cards into credit_cards_archive.
+
+    Each batch is its own short transaction with row locks taken via
+    SKIP LOCKED, so the job never blocks card requests. Batches pause briefly
+    in between to spread out the write load. Shards are archived one after
+    another, each with its own max_batches allowance.
+    Can be run as a scheduled task (e.g., nightly cron job).
+
+    Returns:
+        int: Number of cards archived
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days or settings.CARD_ARCHIVE_AFTER_DAYS)
+    batch_size = batch_size or settings.CARD_ARCHIVE_BATCH_SIZE
+    return sum(
+        _archive_shard(shard, cutoff, batch_size, max_batches)
+        for shard in range(len(shard_engines))
+    )
+
+
+def _archive_shard(shard: int, cutoff: datetime, batch_size: int, max_batches: Optional[int]) -> int:
+    archived = 0
+    batches = 0
+    db = SessionLocal(info={"shard": shard})
+    try:
+        while max_batches is None or batches < max_batches:
+            moved = db.execute(_ARCHIVE_BATCH, {"cutoff": cutoff, "batch_size": batch_size}).rowcount
+            db.commit()
+            archived += moved
+            batches += 1
+            if moved < batch_size:
+                break
+            time.sleep(settings.CARD_ARCHIVE_BATCH_PAUSE_SECONDS)
+
+        logger.info("Archived %d inactive credit cards in %d batches on shard %d", archived, batches, shard)
+
+    except Exception as e:
+        logger.error("Error during card archival: %s", e)
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+    return archived
@@ -0,0 +1,121 @@
+# app/core/optimisation.py
+"""
+Interest-free day scoring for card portfolios.
+
+Billing cycles follow the same 1-31 day calendar the card schemas use
+(1 follows 31). A purchase on day `d` on a card whose cycle ends on day
+`e` stays interest free until the statement closes, (e - d) mod 31 days
+later, plus the grace period until the payment is due. On any given day a
+user pays with whichever card gives the most interest-free days, so a
+portfolio is scored by that best value across the month.
+"""
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+
+CYCLE_DAYS = 31
+DAYS = np.arange(1, CYCLE_DAYS + 1, dtype=np.int16)
+
+
+def interest_free_days(
+        billing_end_dates: Sequence[int],
+        grace_days: Union[int, Sequence[int], None] = None
+) -> np.ndarray:
+    """
+    Build the day x card matrix of interest-free days.
+
+    Args:
+        billing_end_dates: Cycle end day (1-31) of each card
+        grace_days: Days from statement to due date, for all cards or per card;
+            defaults to CARD_GRACE_PERIOD_DAYS
+
+    Returns:
+        np.ndarray: int16 array of shape (31, len(billing_end_dates))
+    """
+    grace = np.asarray(settings.CARD_GRACE_PERIOD_DAYS if grace_days is None else grace_days, dtype=np.int16)
+    ends = np.asarray(billing_end_dates, dtype=np.int16)
+    return (ends[np.newaxis, :] - DAYS[:, np.newaxis]) % CYCLE_DAYS + grace
+
+
+def simulate_portfolios(
+        current_end_dates: Sequence[int],
+        current_limits: Sequence[int],
+        candidate_end_dates: Sequence[int],
+        candidate_limits: Sequence[int],
+        replaces: Sequence[int],
+        current_grace_days: Optional[Sequence[int]] = None,
+        candidate_grace_days: Optional[Sequence[int]] = None
+) -> Dict[str, object]:
+    """
+    Score every candidate variant of the current portfolio in one pass.
+
+    Each candidate is one card: either added to the current cards
+    (replaces == -1) or standing in for the current card at that index
+    (a change of billing dates or limit). Only the best and second-best
+    current card per day are needed to know what's left when one card is
+    replaced, so the work is a handful of (31 x variants) array operations.
+
+    Args:
+        current_end_dates: Cycle end day of each current card
+        current_limits: Credit limit of each current card
+        candidate_end_dates: Cycle end day of each candidate card
+        candidate_limits: Credit limit of each candidate card
+        replaces: Index into the current cards each candidate replaces, or -1
+        current_grace_days: Grace period of each current card
+        candidate_grace_days: Grace period of each candidate card
+
+    Returns:
+        Dict with the "baseline" scores and per-variant arrays "mean_days",
+        "min_days", "days_as_best", "total_limit" and "order" (variant
+        indexes, best first)
+    """
+    current = interest_free_days(current_end_dates, current_grace_days)
+    candidates = interest_free_days(candidate_end_dates, candidate_grace_days)
+    replaces = np.asarray(replaces, dtype=np.int64)
+    limits = np.asarray(current_limits, dtype=np.int64)
+
+    if current.shape[1] == 0:
+        best = np.zeros(CYCLE_DAYS, dtype=np.int16)
+        best_card = np.full(CYCLE_DAYS, -1)
+        runner_up = best
+    elif current.shape[1] == 1:
+        best = current[:, 0]
+        best_card = np.zeros(CYCLE_DAYS, dtype=np.int64)
+        runner_up = np.zeros(CYCLE_DAYS, dtype=np.int16)
+    else:
+        top_two = np.sort(current, axis=1)[:, -2:]
+        best = top_two[:, 1]
+        runner_up = top_two[:, 0]
+        best_card = np.argmax(current, axis=1)
+
+    # Best current card per day once the replaced card (if any) is gone
+    others = np.where(
+        best_card[:, np.newaxis] == replaces[np.newaxis, :],
+        runner_up[:, np.newaxis],
+        best[:, np.newaxis]
+    )
+    portfolio = np.maximum(others, candidates)
+
+    mean_days = portfolio.mean(axis=0)
+    min_days = portfolio.min(axis=0)
+    days_as_best = (candidates > others).sum(axis=0)
+    replaced_limits = np.where(replaces >= 0, limits[np.clip(replaces, 0, None)] if limits.size else 0, 0)
+    total_limit = limits.sum() - replaced_limits + np.asarray(candidate_limits, dtype=np.int64)
+
+    # Rank by average days, then the worst day, then total credit available
+    order = np.lexsort((-total_limit, -min_days, -mean_days))
+
+    return {
+        "baseline": {
+            "mean_days": float(best.mean()) if current.shape[1] else 0.0,
+            "min_days": int(best.min()) if current.shape[1] else 0,
+            "total_limit": int(limits.sum())
+        },
+        "mean_days": mean_days,
+        "min_days": min_days,
+        "days_as_best": days_as_best,
+        "total_limit": total_limit,
+        "order": order
+    }
@@ -0,0 +1,202 @@
+# app/core/profiling.py
+"""
+On-demand statistical profiling of single requests.
+
+A request is profiled when it carries a valid signed X-Profile header
+(see sign_profile_token / `python scripts/db.py profile-token`) or is
+picked by PROFILING_SAMPLE_RATE. For those requests a sampler thread reads
+the event loop thread's stack every PROFILING_INTERVAL_SECONDS while the
+request's task is the one running. It also samples busy threadpool
+threads, where sync dependencies run. The stacks are written to
+PROFILING_DIR in folded format (one "frame;frame;frame count" line per
+stack), which flamegraph.pl and speedscope read directly.
+
+Every other request only pays for a header lookup and one random() call.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Frames of idle threadpool workers; their samples are noise
+_IDLE_FUNCTIONS = {"wait", "get", "_wait_for_tstate_lock", "select", "poll"}
+
+
+def _signature(expires: int) -> str:
+    key = (settings.PROFILING_SECRET or settings.SECRET_KEY).encode("utf-8")
+    return hmac.new(key, f"profile:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def sign_profile_token(ttl_seconds: Optional[int] = None) -> str:
+    """
+    Create a value for the X-Profile header.
+
+    Args:
+        ttl_seconds: How long the token works (default PROFILING_TOKEN_TTL_SECONDS)
+
+    Returns:
+        str: "<expiry unix time>.<hmac>"
+    """
+    expires = int(time.time()) + (ttl_seconds or settings.PROFILING_TOKEN_TTL_SECONDS)
+    return f"{expires}.{_signature(expires)}"
+
+
+def verify_profile_token(token: str) -> bool:
+    """Whether an X-Profile header value is correctly signed and not expired."""
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    # ";" separates frames in the folded format
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}".replace(";", ":")
+
+
+def _folded_stack(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class RequestProfiler:
+    """
+    Samples the stacks that belong to one request from a background thread.
+
+    Samples of the event loop thread are kept only while `task` is the task
+    running on `loop`. Threadpool samples can't be tied to a task, so they
+    are kept under a "threadpool" root and may include work for concurrent
+    requests.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task, interval: float):
+        self.loop = loop
+        self.task = task
+        self.interval = interval
+        self.loop_thread = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                if thread_id == self.loop_thread:
+                    if asyncio.current_task(self.loop) is not self.task:
+                        continue
+                    self.stacks["request;" + _folded_stack(frame)] += 1
+                elif frame.f_code.co_name not in _IDLE_FUNCTIONS and thread_id in names:
+                    if names[thread_id].startswith("request-profiler"):
+                        continue
+                    self.stacks["threadpool;" + _folded_stack(frame)] += 1
+            self.samples += 1
+
+    def write(self, path: str) -> None:
+        """Write the collected stacks in folded format."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests.
+
+    Profiled responses carry an X-Profile-Id header naming the file written
+    under PROFILING_DIR. At most PROFILING_MAX_CONCURRENT requests are
+    profiled at once per worker; requests beyond that run unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self._active = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+        if self._active >= settings.PROFILING_MAX_CONCURRENT:
+            logger.info("Skipping profile of %s: %d profiles already running", scope["path"], self._active)
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug}-{uuid.uuid4().hex[:8]}"
+        status_code: Dict[str, int] = {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status_code["value"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER, profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = RequestProfiler(asyncio.get_running_loop(), asyncio.current_task(), settings.PROFILING_INTERVAL_SECONDS)
+        self._active += 1
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            self._active -= 1
+            path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.folded")
+            try:
+                await asyncio.to_thread(profiler.write, path)
+                logger.info(
+                    "Profiled %s %s (%s) in %.1fms, %d samples -> %s",
+                    scope["method"],
+                    scope["path"],
+                    status_code.get("value"),
+                    profiler.duration * 1000,
+                    profiler.samples,
+                    path
+                )
+            except OSError as e:
+                logger.error("Could not write profile %s: %s", path, e)
+
+    def _selected(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if verify_profile_token(value.decode("latin-1")):
+                    return True
+                logger.warning("Ignoring invalid X-Profile header on %s", scope["path"])
+                break
+        return self.sample_rate > 0 and random.random() < self.sample_rate
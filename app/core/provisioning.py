@@ -0,0 +1,253 @@
+# app/core/provisioning.py
+"""
+Bulk user provisioning for onboarding many accounts at once.
+
+Input is NDJSON, one UserSignupRequest object per line. Records are handled
+in batches of PROVISIONING_BATCH_SIZE: each batch is validated, its
+passwords are hashed, and its users are created with one multi-row
+INSERT ... ON CONFLICT (email) DO NOTHING per shard.
+Every record gets a result, in input order, so callers can stream them
+back while the next batch is read. Only one batch is held in memory at a
+time, whatever the size of the input.
+"""
+import json
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.db.copy import chunked
+from app.db.session import SessionLocal
+from app.db.sharding import shard_directory, sharding_enabled
+from app.models.user import User, hash_password
+from app.schemas.user import UserSignupRequest
+
+logger = logging.getLogger(__name__)
+
+PROVISION_STATUSES = ("created", "exists", "duplicate", "invalid", "failed")
+
+
+class ProvisioningRecordError(ValueError):
+    """Raised for an input line that isn't a JSON object."""
+
+
+class ProvisioningSummary:
+    """Counts of results by status for one provisioning run."""
+
+    def __init__(self):
+        self.counts = {status: 0 for status in PROVISION_STATUSES}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.counts[result["status"]] += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"received": sum(self.counts.values()), **self.counts}
+
+
+def parse_record_line(line: bytes) -> Optional[object]:
+    """
+    Decode one NDJSON line.
+
+    Returns:
+        The record, a ProvisioningRecordError for a bad line, or None for a blank one
+    """
+    if len(line) > settings.PROVISIONING_MAX_LINE_BYTES:
+        return ProvisioningRecordError(f"Line longer than {settings.PROVISIONING_MAX_LINE_BYTES} bytes")
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return ProvisioningRecordError(f"Invalid JSON: {getattr(e, 'msg', e)}")
+    if not isinstance(record, dict):
+        return ProvisioningRecordError("Each line must be a JSON object")
+    return record
+
+
+def iter_record_lines(stream: TextIO) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, record) pairs from an NDJSON file, one at a time."""
+    for line_number, line in enumerate(stream, start=1):
+        record = parse_record_line(line.encode("utf-8"))
+        if record is not None:
+            yield line_number, record
+
+
+async def aiter_record_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (line number, record) pairs from an NDJSON byte stream such as a
+    request body. At most PROVISIONING_MAX_LINE_BYTES of a line is buffered;
+    longer lines are reported as errors.
+    """
+    buffer = b""
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, ProvisioningRecordError(
+                    f"Line longer than {settings.PROVISIONING_MAX_LINE_BYTES} bytes"
+                )
+                continue
+            record = parse_record_line(line)
+            if record is not None:
+                yield line_number, record
+        if len(buffer) > settings.PROVISIONING_MAX_LINE_BYTES:
+            oversized = True
+            buffer = b""
+
+    line_number += 1
+    if oversized:
+        yield line_number, ProvisioningRecordError(f"Line longer than {settings.PROVISIONING_MAX_LINE_BYTES} bytes")
+    else:
+        record = parse_record_line(buffer)
+        if record is not None:
+            yield line_number, record
+
+
+def _validation_errors(error: ValidationError) -> Dict[str, str]:
+    # Only field names and messages: the input itself may contain a password
+    return {".".join(str(part) for part in e["loc"]) or "record": e["msg"] for e in error.errors()}
+
+
+def _insert_users(rows: List[Dict[str, Any]], shard: int = 0) -> Dict[str, int]:
+    """
+    Create users with one multi-row insert on a shard.
+
+    Returns:
+        Dict mapping the email of each created user to their id; emails
+        that already existed are left out
+    """
+    db = SessionLocal(info={"shard": shard})
+    try:
+        created = db.execute(
+            insert(User)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id, User.email)
+        ).all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {row.email: row.id for row in created}
+
+
+def _create_users(rows: List[Dict[str, Any]]) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Create a batch of users, going through the shard directory when sharded.
+
+    Returns:
+        Tuple of (created email -> id, failed email -> error)
+    """
+    if not sharding_enabled():
+        try:
+            return _insert_users(rows), {}
+        except SQLAlchemyError as e:
+            logger.error("Could not provision %d users: %s", len(rows), e)
+            return {}, {row["email"]: "Database error" for row in rows}
+
+    # Emails the directory already knows belong to existing users
+    try:
+        registered = shard_directory.register_many([row["email"] for row in rows])
+    except SQLAlchemyError as e:
+        logger.error("Could not reserve %d users in the shard directory: %s", len(rows), e)
+        return {}, {row["email"]: "Database error" for row in rows}
+    by_shard: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        if row["email"] in registered:
+            user_id, shard = registered[row["email"]]
+            by_shard[shard].append({**row, "id": user_id})
+
+    created: Dict[str, int] = {}
+    failed: Dict[str, str] = {}
+    for shard, shard_rows in by_shard.items():
+        try:
+            created.update(_insert_users(shard_rows, shard))
+        except SQLAlchemyError as e:
+            logger.error("Could not provision %d users on shard %d: %s", len(shard_rows), shard, e)
+            failed.update((row["email"], "Database error") for row in shard_rows)
+
+    # Undo reservations whose user wasn't created
+    unused = [(user_id, email) for email, (user_id, _) in registered.items() if email not in created]
+    try:
+        shard_directory.forget_many(unused)
+    except SQLAlchemyError as e:
+        # Results are still reported; a leftover entry makes its email look taken until it is removed
+        logger.error("Could not remove unused shard directory entries %s: %s", unused, e)
+    return created, failed
+
+
+def provision_batch(records: Iterable[Tuple[int, object]]) -> List[Dict[str, Any]]:
+    """
+    Validate, hash and create one batch of users.
+
+    Args:
+        records: (line number, record) pairs; a record may be an exception
+            describing why its line couldn't be read
+
+    Returns:
+        One result per record, in order: {"line", "email", "status"} plus
+        "id" for created users and "errors" for rejected records
+    """
+    results: List[Dict[str, Any]] = []
+    accepted: List[Tuple[Dict[str, Any], UserSignupRequest]] = []
+    seen = set()
+    for line_number, record in records:
+        if isinstance(record, Exception):
+            results.append({"line": line_number, "email": None, "status": "invalid", "errors": {"record": str(record)}})
+            continue
+        try:
+            user = UserSignupRequest.model_validate(record)
+        except ValidationError as e:
+            email = record.get("email") if isinstance(record, dict) else None
+            email = email if isinstance(email, str) else None
+            results.append({"line": line_number, "email": email, "status": "invalid", "errors": _validation_errors(e)})
+            continue
+        result = {"line": line_number, "email": user.email, "status": None}
+        results.append(result)
+        if user.email in seen:
+            # Only within the batch; repeats in later batches come back as "exists"
+            result["status"] = "duplicate"
+            continue
+        seen.add(user.email)
+        accepted.append((result, user))
+
+    if not accepted:
+        return results
+
+    # One salted SHA-256 per user costs microseconds; hashing inline beats any worker round-trip
+    rows = []
+    for _, user in accepted:
+        salt, hashed = hash_password(user.password)
+        rows.append({"email": user.email, "user_name": user.user_name, "salt": salt, "hashed_password": hashed})
+
+    created, failed = _create_users(rows)
+    for result, user in accepted:
+        if user.email in created:
+            result.update(status="created", id=created[user.email])
+        elif user.email in failed:
+            result.update(status="failed", errors={"record": failed[user.email]})
+        else:
+            result["status"] = "exists"
+    return results
+
+
+def provision_users(
+        records: Iterable[Tuple[int, object]],
+        batch_size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Provision users from a stream of records, yielding each result as its
+    batch completes.
+    """
+    for batch in chunked(records, batch_size or settings.PROVISIONING_BATCH_SIZE):
+        yield from provision_batch(batch)
@@ -0,0 +1,40 @@
+# app/core/redis.py
+from functools import lru_cache
+import redis
+from app.core.config import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """
+    Return the shared Redis client for this process.
+
+    The client owns a connection pool, so it is created once and reused.
+    Nothing connects until the first command is sent.
+    """
+    return redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_AUTH_STRING if settings.REDIS_AUTH_ENABLED else None,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_TIMEOUT,
+        retry_on_timeout=settings.REDIS_RETRY_TIMES > 0
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_redis():
+    """
+    Return the shared asyncio Redis client for this process (for pub/sub
+    listeners that run on the event loop).
+    """
+    from redis import asyncio as aioredis
+    return aioredis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_AUTH_STRING if settings.REDIS_AUTH_ENABLED else None,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=settings.REDIS_TIMEOUT,
+        retry_on_timeout=settings.REDIS_RETRY_TIMES > 0
+    )
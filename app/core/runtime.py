@@ -0,0 +1,105 @@
+# app/core/runtime.py
+import importlib.util
+import os
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy.engine import make_url
+
+
+class WorkerPlan:
+    """
+    How many server processes to run and how large each one's DB pool may be.
+
+    Every engine gets its own pool, so a worker whose engines share a
+    Postgres server holds `engines_per_server` pools there.
+    """
+
+    def __init__(self, workers: int, pool_size: int, max_overflow: int, engines_per_server: int = 1):
+        self.workers = workers
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.engines_per_server = engines_per_server
+
+    @property
+    def connections_per_worker(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    @property
+    def total_connections(self) -> int:
+        """Most connections the fleet can hold on its busiest Postgres server."""
+        return self.workers * self.engines_per_server * self.connections_per_worker
+
+    def __repr__(self):
+        return (
+            f"<WorkerPlan workers={self.workers} pool_size={self.pool_size} "
+            f"max_overflow={self.max_overflow} engines_per_server={self.engines_per_server} "
+            f"total={self.total_connections}>"
+        )
+
+
+def engines_per_server(urls: Iterable[str]) -> int:
+    """
+    Count how many of the given database URLs point at the busiest Postgres
+    server (same host and port), e.g. shards kept as databases on one server.
+    """
+    servers = Counter((url.host, url.port) for url in map(make_url, filter(None, urls)))
+    return max(servers.values(), default=1)
+
+
+def plan_workers(
+        connection_budget: int,
+        pool_size: int,
+        max_overflow: int,
+        workers: Optional[int] = None,
+        engines_per_server: int = 1
+) -> WorkerPlan:
+    """
+    Size the worker fleet so it never opens more than `connection_budget`
+    connections against any one Postgres server.
+
+    Workers default to the CPU count. When the configured pools would overrun
+    the budget, each pool is shrunk (overflow first); if even one connection
+    per pool doesn't fit, the number of workers is reduced.
+
+    Args:
+        connection_budget: Max connections the whole fleet may hold on one server
+        pool_size: Configured DB_POOL_SIZE
+        max_overflow: Configured DB_MAX_OVERFLOW
+        workers: Explicit worker count, or None to use the CPU count
+        engines_per_server: Engines each worker opens against the busiest
+            server (see engines_per_server())
+
+    Returns:
+        WorkerPlan: Worker count and per-worker pool settings
+
+    Raises:
+        ValueError: If the budget can't fit a single connection
+    """
+    engines_per_server = max(1, engines_per_server)
+    if connection_budget < engines_per_server:
+        raise ValueError(
+            f"Connection budget must allow at least one connection for each of {engines_per_server} engines"
+        )
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    workers = min(workers, connection_budget // engines_per_server)
+
+    # Connections each pool may hold
+    per_pool = connection_budget // (workers * engines_per_server)
+    if pool_size + max_overflow <= per_pool:
+        return WorkerPlan(workers, pool_size, max_overflow, engines_per_server)
+
+    pool_size = max(1, min(pool_size, per_pool))
+    max_overflow = max(0, min(max_overflow, per_pool - pool_size))
+    return WorkerPlan(workers, pool_size, max_overflow, engines_per_server)
+
+
+def best_loop() -> str:
+    """Use uvloop when it's installed, else the standard asyncio loop."""
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def best_http() -> str:
+    """Use the httptools parser when it's installed, else h11."""
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
@@ -1,7 +1,18 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import secrets
+import threading
+import time
 import jwt
 from app.core.config import settings
+from app.core.signing_keys import get_signing_keys, uses_asymmetric_keys
+
+logger = logging.getLogger(__name__)
+
+# The SECRET_KEY default; anyone can sign HS256 tokens with it
+_PLACEHOLDER_SECRET_KEY = "your-secret-key-here"
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -29,6 +40,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     # Add expiration time to token payload
     to_encode.update({"exp": expire})
 
+    # Asymmetric algorithms sign with the active private key and name it in the header
+    if uses_asymmetric_keys():
+        kid, private_key = get_signing_keys().active
+        return jwt.encode(
+            to_encode,
+            private_key,
+            algorithm=settings.ALGORITHM,
+            headers={"kid": kid}
+        )
+
     # Create JWT token using your secret key and algorithm
     encoded_jwt = jwt.encode(
         to_encode,
@@ -43,6 +64,12 @@ def verify_token(token: str) -> dict:
     """
     Verify and decode a JWT token.
 
+    With an asymmetric ALGORITHM the token's kid picks the public key.
+    Tokens without a kid were signed with SECRET_KEY before the switch and
+    are accepted (as HS256 only) while JWT_ACCEPT_HS256_TOKENS is on, which
+    should be only until they have all expired. They are never accepted
+    while SECRET_KEY is still the placeholder default.
+
     Args:
         token (str): JWT token to verify
 
@@ -52,9 +79,137 @@ def verify_token(token: str) -> dict:
     Raises:
         jwt.PyJWTError: If token is invalid
     """
+    if not uses_asymmetric_keys():
+        return jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM]
+        )
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    if kid is None and settings.JWT_ACCEPT_HS256_TOKENS and settings.SECRET_KEY != _PLACEHOLDER_SECRET_KEY:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+
+    public_key = get_signing_keys().public_key(kid)
+    if public_key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {kid}")
     decoded_token = jwt.decode(
         token,
-        settings.SECRET_KEY,
+        public_key,
         algorithms=[settings.ALGORITHM]
     )
-    return decoded_token
\ No newline at end of file
+    return decoded_token
+
+
+def create_refresh_token() -> str:
+    """
+    Create an opaque refresh token.
+
+    Returns:
+        str: 256-bit random URL-safe token to hand to the client
+    """
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash a refresh token for storage and lookup.
+
+    Refresh tokens are already high-entropy random values, so a single
+    SHA-256 is enough; no salt or slow hash is needed.
+
+    Args:
+        token (str): Refresh token as sent by the client
+
+    Returns:
+        str: Hex digest stored in refresh_tokens.token_hash
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokens:
+    """
+    Short-lived memory of access tokens that passed every check (signature,
+    expiry, blacklist, user exists), so hot read endpoints can skip the
+    database on repeat calls. Set VERIFIED_TOKEN_CACHE_SECONDS to 0 to turn it off.
+
+    An entry lives for at most `ttl_seconds` and never past the token's own
+    expiry. With the "redis" backend entries are shared, so signing out
+    forgets the token on every worker at once. With "memory" each worker
+    keeps its own entries, and other workers may still accept a signed-out
+    token until their entry expires; only use it with a single worker or a
+    TTL you can accept as the revocation delay.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, backend: str = "memory"):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[int]:
+        """Return the user id for a recently verified token, or None."""
+        if self.ttl_seconds <= 0:
+            return None
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            try:
+                raw = get_redis().get(f"vtok:{_token_key(token)}")
+            except Exception as e:
+                logger.warning("Verified token cache unavailable: %s", e)
+                return None
+            return int(raw) if raw else None
+
+        entry = self._entries.get(_token_key(token))
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def remember(self, token: str, user_id: int, expires_at: Optional[float] = None) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        deadline = time.time() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            ttl_ms = int((deadline - time.time()) * 1000)
+            if ttl_ms > 0:
+                try:
+                    get_redis().set(f"vtok:{_token_key(token)}", user_id, px=ttl_ms)
+                except Exception as e:
+                    logger.warning("Verified token cache unavailable: %s", e)
+            return
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.time()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[_token_key(token)] = (deadline, user_id)
+
+    def forget(self, token: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            try:
+                get_redis().delete(f"vtok:{_token_key(token)}")
+            except Exception as e:
+                logger.error("Could not drop signed-out token from the verified token cache: %s", e)
+            return
+        with self._lock:
+            self._entries.pop(_token_key(token), None)
+
+
+verified_tokens = VerifiedTokens(
+    settings.VERIFIED_TOKEN_CACHE_SECONDS,
+    settings.VERIFIED_TOKEN_CACHE_SIZE,
+    settings.VERIFIED_TOKEN_BACKEND
+)
@@ -0,0 +1,185 @@
+# app/core/signing_keys.py
+"""
+Asymmetric access token signing keys and the JWKS document.
+
+With ALGORITHM set to "EdDSA" (Ed25519) or "RS256", access tokens are
+signed with a private key instead of SECRET_KEY. Other services then
+verify them locally with the public keys published at
+/.well-known/jwks.json and never need the secret or a call back to us.
+
+Keys are PEM files in JWT_KEYS_DIR; each file name (without .pem) is the
+key id ("kid") written into the token header. Tokens are signed with
+JWT_ACTIVE_KID (default: the first kid in sort order, i.e. the oldest
+date-named key), and every key in the directory is published and
+accepted. Workers notice added or removed files within
+JWT_KEYS_RELOAD_CHECK_SECONDS. To rotate: add the new key
+(`python scripts/db.py generate-signing-key`), wait for JWKS caches to
+pick it up (JWKS_CACHE_MAX_AGE), switch JWT_ACTIVE_KID, and delete the old
+file once the tokens it signed have expired.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from app.core.config import settings
+from app.core.startup import register_warmup
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = {
+    "EdDSA": (ed25519.Ed25519PrivateKey, OKPAlgorithm),
+    "RS256": (rsa.RSAPrivateKey, RSAAlgorithm)
+}
+
+
+def uses_asymmetric_keys() -> bool:
+    return settings.ALGORITHM in ASYMMETRIC_ALGORITHMS
+
+
+class SigningKeys:
+    """
+    One loaded set of signing keys.
+
+    `jwks_body` is the JWKS document already encoded for the response,
+    and `etag` changes whenever the set of public keys does.
+    """
+
+    def __init__(self, algorithm: str, private_keys: Dict[str, object], active_kid: str, mtime: float = 0.0):
+        self.algorithm = algorithm
+        self.mtime = mtime
+        self.private_keys = private_keys
+        self.public_keys = {kid: key.public_key() for kid, key in private_keys.items()}
+        self.active_kid = active_kid
+
+        jwk_class = ASYMMETRIC_ALGORITHMS[algorithm][1]
+        keys = []
+        for kid, public_key in sorted(self.public_keys.items()):
+            jwk = json.loads(jwk_class.to_jwk(public_key))
+            jwk.update({"kid": kid, "use": "sig", "alg": algorithm})
+            keys.append(jwk)
+        self.jwks_body = json.dumps({"keys": keys}, sort_keys=True).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.jwks_body).hexdigest()[:16]}"'
+
+    @property
+    def active(self) -> Tuple[str, object]:
+        """(kid, private key) to sign new tokens with."""
+        return self.active_kid, self.private_keys[self.active_kid]
+
+    def public_key(self, kid: Optional[str]):
+        return self.public_keys.get(kid) if kid else None
+
+
+def load_signing_keys(directory: str, algorithm: str, active_kid: Optional[str] = None) -> SigningKeys:
+    """
+    Read every *.pem private key in `directory`.
+
+    Raises:
+        ValueError: If there are no keys, a key doesn't match the algorithm,
+            or the active kid isn't among them
+    """
+    key_class = ASYMMETRIC_ALGORITHMS[algorithm][0]
+    mtime = os.path.getmtime(directory)
+    private_keys = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".pem"):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            key = serialization.load_pem_private_key(f.read(), password=None)
+        if not isinstance(key, key_class):
+            raise ValueError(f"Signing key {name} is not a {algorithm} key")
+        private_keys[name[:-len(".pem")]] = key
+
+    if not private_keys:
+        raise ValueError(f"No signing keys (*.pem) found in {directory}")
+    # Never switch to a newly added key by default: JWKS caches may not know it yet
+    active_kid = active_kid or min(private_keys)
+    if active_kid not in private_keys:
+        raise ValueError(f"JWT_ACTIVE_KID {active_kid} has no key in {directory}")
+    return SigningKeys(algorithm, private_keys, active_kid, mtime)
+
+
+def generate_signing_key(directory: str, kid: str, algorithm: str) -> str:
+    """
+    Create a new private key file for rotation.
+
+    Returns:
+        str: Path of the written PEM file
+    """
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ValueError(f"{algorithm} is not an asymmetric algorithm; use EdDSA or RS256")
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kid}.pem")
+    # Written under a temporary name first so running workers never load half a key
+    partial = os.path.join(directory, f".{kid}.pem.partial")
+    fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption()
+            ))
+        # link() fails if the name exists: never overwrite a key that may already be signing tokens
+        os.link(partial, path)
+    finally:
+        os.unlink(partial)
+    return path
+
+
+_keys: Optional[SigningKeys] = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def reload_signing_keys() -> SigningKeys:
+    """
+    Load JWT_KEYS_DIR and make it the current key set.
+    A directory that fails to load raises and leaves the current keys in place.
+    """
+    global _keys
+    keys = load_signing_keys(settings.JWT_KEYS_DIR, settings.ALGORITHM, settings.JWT_ACTIVE_KID or None)
+    with _lock:
+        _keys = keys
+    logger.info(
+        "Loaded %d %s signing keys (%s), signing with %s",
+        len(keys.private_keys), settings.ALGORITHM, ", ".join(sorted(keys.private_keys)), keys.active_kid
+    )
+    return keys
+
+
+def get_signing_keys() -> SigningKeys:
+    """Return the current keys, reloading them if files were added or removed."""
+    global _next_check
+    keys = _keys
+    if keys is None:
+        return reload_signing_keys()
+
+    interval = settings.JWT_KEYS_RELOAD_CHECK_SECONDS
+    now = time.monotonic()
+    if interval > 0 and now >= _next_check:
+        _next_check = now + interval
+        try:
+            if os.path.getmtime(settings.JWT_KEYS_DIR) != keys.mtime:
+                keys = reload_signing_keys()
+        except (OSError, ValueError) as e:
+            logger.error("Keeping signing keys %s; reload failed: %s", ", ".join(sorted(keys.private_keys)), e)
+    return keys
+
+
+@register_warmup("signing_keys")
+def _warm_signing_keys() -> None:
+    if uses_asymmetric_keys():
+        get_signing_keys()
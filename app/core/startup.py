@@ -0,0 +1,166 @@
+# app/core/startup.py
+import importlib
+import inspect
+import logging
+import pkgutil
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fastapi import FastAPI
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+import app.schemas
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Warm-up hooks registered by modules that keep in-process caches
+_warmup_hooks: List[Tuple[str, Callable[[], None]]] = []
+
+
+def register_warmup(name: str):
+    """
+    Register a function to run during application startup.
+
+    Use this for anything that would otherwise be loaded lazily by the
+    first request (catalogs, lookup tables, compiled regexes...).
+
+    Args:
+        name: Label used for the phase in the startup report
+    """
+    def decorator(func: Callable[[], None]) -> Callable[[], None]:
+        _warmup_hooks.append((name, func))
+        return func
+    return decorator
+
+
+class StartupReport:
+    """
+    Timings for each phase of a worker's cold start.
+    Import time is measured by app.main; the remaining phases by the lifespan hook.
+    """
+
+    def __init__(self, import_seconds: float):
+        self.phases: Dict[str, float] = {"import": import_seconds}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    @property
+    def within_budget(self) -> bool:
+        return self.total_seconds <= settings.STARTUP_TIME_BUDGET_SECONDS
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "total_seconds": round(self.total_seconds, 4),
+            "budget_seconds": settings.STARTUP_TIME_BUDGET_SECONDS,
+            "within_budget": self.within_budget
+        }
+
+
+def warm_db_pool(engine: Engine, size: int) -> int:
+    """
+    Open `size` pooled connections up front so the first requests after a
+    deploy don't pay for connection setup.
+
+    All connections are held at the same time before being released,
+    otherwise the pool would hand the same connection back every time.
+
+    Returns:
+        int: Number of connections that were opened
+    """
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()  # Returns the connection to the pool
+    return len(connections)
+
+
+def iter_schema_models():
+    """Yield every Pydantic model defined in the app.schemas package."""
+    for module_info in pkgutil.iter_modules(app.schemas.__path__):
+        module = importlib.import_module(f"{app.schemas.__name__}.{module_info.name}")
+        for _, obj in inspect.getmembers(module, inspect.isclass):
+            if issubclass(obj, BaseModel) and obj.__module__ == module.__name__:
+                yield obj
+
+
+def warm_schemas(application: FastAPI) -> int:
+    """
+    Build the OpenAPI document and run one validation pass over every
+    request/response schema using its documented example.
+
+    Returns:
+        int: Number of schemas warmed
+    """
+    application.openapi()
+
+    warmed = 0
+    for model in iter_schema_models():
+        model.model_json_schema()
+        example = (model.model_config.get("json_schema_extra") or {})
+        example = example.get("example") if isinstance(example, dict) else None
+        if example is not None:
+            try:
+                model.model_validate(example).model_dump(mode="json")
+            except ValidationError:
+                # Some examples are illustrative only; the validators still ran
+                pass
+        warmed += 1
+    return warmed
+
+
+def run_warmups(application: FastAPI, engines: Iterable[Engine], report: StartupReport) -> None:
+    """Run every startup phase, recording how long each one took."""
+    if settings.DB_POOL_WARMUP:
+        started = time.perf_counter()
+        opened = sum(warm_db_pool(engine, settings.DB_POOL_SIZE) for engine in engines)
+        report.record("db_pool", time.perf_counter() - started)
+        logger.debug("Pre-warmed %d database connections", opened)
+
+    started = time.perf_counter()
+    warmed = warm_schemas(application)
+    report.record("schemas", time.perf_counter() - started)
+    logger.debug("Pre-built %d schemas", warmed)
+
+    for name, hook in _warmup_hooks:
+        started = time.perf_counter()
+        hook()
+        report.record(name, time.perf_counter() - started)
+
+
+def check_budget(report: StartupReport) -> None:
+    """
+    Log the startup report and enforce the configured time budget.
+
+    Raises:
+        RuntimeError: If the budget is exceeded and STARTUP_TIME_BUDGET_STRICT is set
+    """
+    summary = report.as_dict()
+    if report.within_budget:
+        logger.info("Startup completed in %.3fs: %s", report.total_seconds, summary["phases"])
+        return
+
+    logger.warning(
+        "Startup took %.3fs, over the %.1fs budget: %s",
+        report.total_seconds,
+        settings.STARTUP_TIME_BUDGET_SECONDS,
+        summary["phases"]
+    )
+    if settings.STARTUP_TIME_BUDGET_STRICT:
+        raise RuntimeError(
+            f"Startup time {report.total_seconds:.3f}s exceeded budget of "
+            f"{settings.STARTUP_TIME_BUDGET_SECONDS}s"
+        )
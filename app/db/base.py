@@ -1,5 +1,10 @@
 # Import all models here for Alembic to discover them
 from app.db.base_class import Base
 from app.models.user import User
-from app.models.credit_card import CreditCard
-from app.models.optimisation import Optimisation
\ No newline at end of file
+from app.models.credit_card import CreditCard, CreditCardArchive
+from app.models.optimisation import Optimisation
+from app.models.refresh_token import RefreshToken
+from app.models.card_transaction import CardTransaction
+from app.models.card_limit_snapshot import CardLimitSnapshot
+from app.models.background_job import BackgroundJob
+from app.models.user_shard import UserShard
@@ -0,0 +1,105 @@
+# app/db/copy.py
+"""
+Helpers for streaming rows into Postgres with COPY.
+
+Rows are produced lazily by an iterator and encoded in COPY text format as
+psycopg2 asks for more data, so memory use doesn't depend on batch size.
+"""
+import io
+import itertools
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+
+def format_copy_value(value: Any) -> str:
+    """Encode one value for COPY ... (FORMAT text)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = (
+            text.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+    return text
+
+
+def format_copy_row(values: Sequence[Any]) -> str:
+    """Encode a row as one tab-separated COPY text line."""
+    return "\t".join(format_copy_value(value) for value in values) + "\n"
+
+
+class RowStream(io.TextIOBase):
+    """
+    Read-only file object over an iterator of rows, for cursor.copy_expert.
+
+    Only as many rows as fit the requested read size are encoded at a time.
+    `rows_read` counts how many rows have been consumed so far.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.rows_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            for row in self._rows:
+                self.rows_read += 1
+                chunks.append(format_copy_row(row))
+            self._buffer = ""
+            return "".join(chunks)
+
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self.rows_read += 1
+            line = format_copy_row(row)
+            chunks.append(line)
+            length += len(line)
+
+        data = "".join(chunks)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Stream rows into `table` with COPY FROM STDIN.
+
+    Args:
+        cursor: psycopg2 cursor
+        table: Target table name
+        columns: Column names, in the order values appear in each row
+        rows: Iterable of row tuples; consumed lazily
+
+    Returns:
+        int: Number of rows copied
+    """
+    stream = RowStream(rows)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)",
+        stream,
+        size=64 * 1024
+    )
+    return stream.rows_read
+
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[Iterator[Any]]:
+    """
+    Split an iterator into consecutive lazy chunks of at most `size` items.
+    Each chunk must be consumed before asking for the next one.
+    """
+    iterator = iter(rows)
+    for first in iterator:
+        yield itertools.chain((first,), itertools.islice(iterator, size - 1))
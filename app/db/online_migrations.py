@@ -0,0 +1,394 @@
+# app/db/online_migrations.py
+"""
+Schema changes that don't block live traffic on big tables.
+
+Plain DDL queues behind every running transaction for its lock, and while
+it waits every new query on the table queues behind it. Each helper here
+therefore runs with a short lock_timeout: if the lock can't be taken
+quickly the statement gives up, and is retried after a backoff instead of
+stalling requests. Indexes are built with CREATE INDEX CONCURRENTLY
+(outside any transaction) and backfills update one primary key range per
+short transaction.
+
+The helpers take an Engine so they can manage their own transactions.
+Inside an Alembic migration, call set_lock_guards(op.get_bind()) first to
+make the migration's own DDL fail fast instead.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres error codes
+LOCK_NOT_AVAILABLE = "55P03"  # lock_timeout
+DEADLOCK_DETECTED = "40P01"
+QUERY_CANCELED = "57014"  # statement_timeout
+
+Progress = Callable[[Dict[str, object]], None]
+
+
+def _timeout_value(seconds: Optional[float]) -> str:
+    """Format seconds for set_config; 0 disables the timeout."""
+    return f"{int(seconds * 1000)}ms" if seconds else "0"
+
+
+def _pgcode(error: BaseException) -> Optional[str]:
+    return getattr(getattr(error, "orig", None), "pgcode", None)
+
+
+def is_lock_timeout(error: BaseException) -> bool:
+    """Whether a statement failed because it couldn't get its locks in time."""
+    return _pgcode(error) in (LOCK_NOT_AVAILABLE, DEADLOCK_DETECTED)
+
+
+def is_statement_timeout(error: BaseException) -> bool:
+    """Whether a statement was cancelled by statement_timeout."""
+    return _pgcode(error) == QUERY_CANCELED
+
+
+def set_lock_guards(
+        conn: Connection,
+        lock_timeout: Optional[float] = None,
+        statement_timeout: Optional[float] = None,
+        local: bool = True
+) -> None:
+    """
+    Set lock_timeout and statement_timeout on a connection.
+
+    Args:
+        conn: Connection to guard
+        lock_timeout: Seconds to wait for a lock (default MIGRATION_LOCK_TIMEOUT_SECONDS)
+        statement_timeout: Seconds a statement may run (default
+            MIGRATION_STATEMENT_TIMEOUT_SECONDS, 0 for no limit)
+        local: Only for the current transaction; use False on autocommit connections
+    """
+    lock_timeout = settings.MIGRATION_LOCK_TIMEOUT_SECONDS if lock_timeout is None else lock_timeout
+    statement_timeout = settings.MIGRATION_STATEMENT_TIMEOUT_SECONDS if statement_timeout is None else statement_timeout
+    conn.execute(
+        text(
+            "SELECT set_config('lock_timeout', :lock_timeout, :local), "
+            "set_config('statement_timeout', :statement_timeout, :local)"
+        ),
+        {
+            "lock_timeout": _timeout_value(lock_timeout),
+            "statement_timeout": _timeout_value(statement_timeout),
+            "local": local
+        }
+    )
+
+
+def retry_on_lock_timeout(
+        operation: Callable[[], object],
+        description: str,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None
+):
+    """
+    Run `operation`, retrying with exponential backoff while it fails on lock timeouts.
+
+    Args:
+        operation: Callable running one complete attempt (its own transaction)
+        description: What is being attempted, for the logs
+        retries: Attempts after the first (default MIGRATION_LOCK_RETRIES)
+        backoff: First pause in seconds, doubled every retry (default MIGRATION_RETRY_BACKOFF_SECONDS)
+
+    Returns:
+        Whatever `operation` returns
+
+    Raises:
+        DBAPIError: The last lock timeout once retries run out, or any other database error
+    """
+    retries = settings.MIGRATION_LOCK_RETRIES if retries is None else retries
+    backoff = settings.MIGRATION_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except DBAPIError as e:
+            if not is_lock_timeout(e) or attempt >= retries:
+                raise
+            # Jitter so several migrators don't line up behind the same transaction
+            delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            logger.warning("%s: lock not available, retry %d/%d in %.1fs", description, attempt, retries, delay)
+            time.sleep(delay)
+
+
+def run_guarded(
+        engine: Engine,
+        statements: Sequence[str],
+        lock_timeout: Optional[float] = None,
+        statement_timeout: Optional[float] = None,
+        retries: Optional[int] = None
+) -> None:
+    """
+    Run DDL statements in one transaction under lock guards, retrying on lock timeouts.
+
+    Meant for changes that only need a brief ACCESS EXCLUSIVE lock, such as
+    adding a nullable column or a NOT VALID constraint.
+
+    Args:
+        engine: Database to change
+        statements: SQL statements, run in order
+        lock_timeout: Seconds to wait for each lock
+        statement_timeout: Seconds each statement may run
+        retries: Attempts after a lock timeout
+    """
+    def attempt():
+        with engine.begin() as conn:
+            set_lock_guards(conn, lock_timeout, statement_timeout)
+            for statement in statements:
+                conn.execute(text(statement))
+
+    retry_on_lock_timeout(attempt, f"Running {len(statements)} statement(s)", retries)
+
+
+def _index_state(conn: Connection, name: str) -> Optional[bool]:
+    """True if the index exists and is valid, False if a failed build left it invalid, None if missing."""
+    return conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+        ),
+        {"name": name}
+    ).scalar()
+
+
+def _watch_index_build(engine: Engine, pid: int, name: str, progress: Progress, interval: float, done: threading.Event):
+    """Report pg_stat_progress_create_index for the building backend until `done` is set."""
+    query = text(
+        "SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total "
+        "FROM pg_stat_progress_create_index WHERE pid = :pid"
+    )
+    try:
+        with engine.connect() as conn:
+            while not done.wait(interval):
+                row = conn.execute(query, {"pid": pid}).first()
+                conn.rollback()
+                if row is None:
+                    continue
+                done_units, total_units = (
+                    (row.blocks_done, row.blocks_total) if row.blocks_total else (row.tuples_done, row.tuples_total)
+                )
+                progress({
+                    "index": name,
+                    "phase": row.phase,
+                    "done": done_units,
+                    "total": total_units,
+                    "percent": round(100.0 * done_units / total_units, 1) if total_units else None
+                })
+    except Exception as e:
+        logger.warning("Stopped reporting progress for index %s: %s", name, e)
+
+
+def create_index_concurrently(
+        engine: Engine,
+        name: str,
+        table: str,
+        columns: Sequence[str],
+        unique: bool = False,
+        where: Optional[str] = None,
+        lock_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        progress: Optional[Progress] = None,
+        progress_interval: float = 5.0
+) -> bool:
+    """
+    Build an index without blocking writes to the table.
+
+    CREATE INDEX CONCURRENTLY can't run inside a transaction, so it gets an
+    autocommit connection. The build itself has no statement timeout; the
+    lock timeout covers the waits for conflicting transactions. A build
+    that fails leaves an INVALID index behind, which is dropped
+    (concurrently) before the next attempt.
+
+    Args:
+        engine: Database to change
+        name: Index name
+        table: Table to index
+        columns: Column names or expressions, as SQL
+        unique: Build a unique index
+        where: Predicate for a partial index, as SQL
+        lock_timeout: Seconds to wait for locks
+        retries: Attempts after a lock timeout
+        progress: Called every `progress_interval` seconds with the build's phase and progress
+
+    Returns:
+        bool: False if a valid index with this name already existed
+    """
+    preparer = engine.dialect.identifier_preparer
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {preparer.quote(name)} "
+        f"ON {preparer.quote(table)} ({', '.join(columns)})"
+        + (f" WHERE {where}" if where else "")
+    )
+
+    def attempt():
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            state = _index_state(conn, name)
+            if state:
+                return False
+            set_lock_guards(conn, lock_timeout, 0, local=False)
+            if state is False:
+                logger.warning("Dropping invalid index %s left by an earlier build", name)
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {preparer.quote(name)}"))
+
+            done = threading.Event()
+            watcher = None
+            if progress:
+                pid = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+                watcher = threading.Thread(
+                    target=_watch_index_build,
+                    args=(engine, pid, name, progress, progress_interval, done),
+                    daemon=True
+                )
+                watcher.start()
+            try:
+                started = time.perf_counter()
+                conn.execute(text(statement))
+                logger.info("Built index %s on %s in %.1fs", name, table, time.perf_counter() - started)
+                return True
+            finally:
+                done.set()
+                if watcher:
+                    watcher.join()
+
+    created = retry_on_lock_timeout(attempt, f"Creating index {name}", retries)
+    if not created:
+        logger.info("Index %s already exists", name)
+    return created
+
+
+def drop_index_concurrently(
+        engine: Engine,
+        name: str,
+        lock_timeout: Optional[float] = None,
+        retries: Optional[int] = None
+) -> None:
+    """
+    Drop an index without blocking reads or writes to its table.
+
+    Args:
+        engine: Database to change
+        name: Index name
+        lock_timeout: Seconds to wait for locks
+        retries: Attempts after a lock timeout
+    """
+    statement = f"DROP INDEX CONCURRENTLY IF EXISTS {engine.dialect.identifier_preparer.quote(name)}"
+
+    def attempt():
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            set_lock_guards(conn, lock_timeout, 0, local=False)
+            conn.execute(text(statement))
+
+    retry_on_lock_timeout(attempt, f"Dropping index {name}", retries)
+
+
+def backfill_column(
+        engine: Engine,
+        table: str,
+        column: str,
+        value: str,
+        where: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+        max_batches: Optional[int] = None,
+        key: str = "id",
+        lock_timeout: Optional[float] = None,
+        statement_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        progress: Optional[Progress] = None
+) -> int:
+    """
+    Set a column on existing rows one primary key range at a time.
+
+    Each batch updates `key` values in [start, start + batch_size) in its
+    own short transaction, so row locks are held briefly and autovacuum
+    can keep up. Batches that hit the statement timeout are retried with
+    half the range. Re-running picks up where a previous run stopped,
+    because by default only rows where the column is still NULL are updated.
+
+    Args:
+        engine: Database to change
+        table: Table to update
+        column: Column to set
+        value: SQL expression for the new value (may refer to other columns)
+        where: Which rows need updating, as SQL (default: `column IS NULL`)
+        batch_size: Key range per batch (default MIGRATION_BACKFILL_BATCH_SIZE)
+        pause: Seconds between batches (default MIGRATION_BACKFILL_PAUSE_SECONDS)
+        max_batches: Stop after this many batches
+        key: Integer primary key column the ranges are taken over
+        lock_timeout: Seconds to wait for row locks
+        statement_timeout: Seconds one batch may run
+        retries: Attempts per batch after a lock timeout
+        progress: Called after every batch with counts, position and an ETA
+
+    Returns:
+        int: Rows updated
+    """
+    preparer = engine.dialect.identifier_preparer
+    table_sql, column_sql, key_sql = preparer.quote(table), preparer.quote(column), preparer.quote(key)
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    pause = settings.MIGRATION_BACKFILL_PAUSE_SECONDS if pause is None else pause
+    statement = text(
+        f"UPDATE {table_sql} SET {column_sql} = {value} "
+        f"WHERE {key_sql} >= :start AND {key_sql} < :stop AND ({where or f'{column_sql} IS NULL'})"
+    )
+
+    with engine.connect() as conn:
+        first, last = conn.execute(text(f"SELECT min({key_sql}), max({key_sql}) FROM {table_sql}")).one()
+    if first is None:
+        return 0
+
+    updated = 0
+    batches = 0
+    position = first
+    started = time.perf_counter()
+    while position <= last and (max_batches is None or batches < max_batches):
+        stop = position + batch_size
+
+        def attempt():
+            with engine.begin() as conn:
+                set_lock_guards(conn, lock_timeout, statement_timeout)
+                return conn.execute(statement, {"start": position, "stop": stop}).rowcount
+
+        try:
+            rows = retry_on_lock_timeout(attempt, f"Backfilling {table}.{column} at {key} {position}", retries)
+        except DBAPIError as e:
+            if not is_statement_timeout(e) or batch_size == 1:
+                raise
+            batch_size = max(1, batch_size // 2)
+            logger.warning("Backfill batch on %s.%s timed out; reducing batch size to %d", table, column, batch_size)
+            continue
+
+        updated += rows
+        batches += 1
+        position = stop
+        if progress:
+            elapsed = time.perf_counter() - started
+            fraction = min(1.0, (position - first) / (last - first + 1))
+            progress({
+                "table": table,
+                "column": column,
+                "batches": batches,
+                "rows": updated,
+                "position": min(position, last + 1),
+                "last": last,
+                "percent": round(100.0 * fraction, 1),
+                "eta_seconds": round(elapsed / fraction - elapsed, 1) if fraction else None
+            })
+        if position <= last and pause:
+            time.sleep(pause)
+
+    logger.info("Backfilled %d rows of %s.%s in %d batches", updated, table, column, batches)
+    return updated
@@ -0,0 +1,297 @@
+# app/db/seed.py
+"""
+Synthetic data for reproducing production-sized query plans locally.
+
+Every user's rows come from a random generator seeded with (seed, user
+number), so the data is identical for the same seed however the load is
+split into chunks or spread over processes. Ids are derived from the user
+number too. Each chunk of users is generated inside a loader process and
+streamed into Postgres with COPY in its own transaction; chunks load in
+parallel.
+"""
+import hashlib
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.core.constants import CreditCardCompany
+from app.db.copy import copy_rows
+
+# Everyone seeded can sign in with this password
+SEED_PASSWORD = "spendify-seed"
+
+# Id space reserved per user, so ids don't depend on how many rows other users got
+MAX_CARDS_PER_USER = 6
+MAX_RANGES_PER_USER = 31
+MAX_TOKENS_PER_USER = 3
+
+DEFAULT_AS_OF = date(2025, 1, 1)
+
+# Rough market share, so the card mix (and index selectivity) looks real
+CARD_WEIGHTS = {
+    CreditCardCompany.TD: 16,
+    CreditCardCompany.RBC: 15,
+    CreditCardCompany.SCOTIA: 12,
+    CreditCardCompany.BMO: 11,
+    CreditCardCompany.CIBC: 11,
+    CreditCardCompany.AMEX: 9,
+    CreditCardCompany.PC_OPTIMUM: 8,
+    CreditCardCompany.CAPITAL_ONE: 7,
+    CreditCardCompany.TANGERINE: 6,
+    CreditCardCompany.KOHO: 5
+}
+CARD_COUNT_WEIGHTS = (5, 30, 30, 18, 10, 5, 2)  # Users with 0..6 cards
+
+USER_COLUMNS = ("id", "email", "hashed_password", "user_name", "salt", "created_at", "updated_at")
+CARD_COLUMNS = (
+    "id", "user_id", "card_name", "credit_limit", "billing_start_date",
+    "billing_end_date", "status", "created_at", "updated_at"
+)
+OPTIMISATION_COLUMNS = ("id", "user_id", "card_name", "value_start", "value_end", "created_at", "updated_at")
+TOKEN_COLUMNS = ("id", "token", "expires_at", "blacklisted_by", "created_at", "updated_at")
+
+SEED_TABLES = ("users", "credit_cards", "optimisations", "blacklisted_tokens")
+
+
+class SeedBases:
+    """First id of each table for this run, so seeding can append to a non-empty database."""
+
+    def __init__(self, users: int, credit_cards: int, optimisations: int, blacklisted_tokens: int):
+        self.users = users
+        self.credit_cards = credit_cards
+        self.optimisations = optimisations
+        self.blacklisted_tokens = blacklisted_tokens
+
+    def as_tuple(self) -> Tuple[int, int, int, int]:
+        return self.users, self.credit_cards, self.optimisations, self.blacklisted_tokens
+
+
+def best_card_ranges(cards: List[Tuple[str, int]]) -> List[Tuple[str, int, int]]:
+    """
+    Split the 1-31 cycle into runs of days on which the same card gives the
+    most days until its statement closes.
+
+    Args:
+        cards: (card_name, billing_end_date) of the user's active cards
+
+    Returns:
+        List of (card_name, value_start, value_end)
+    """
+    if not cards:
+        return []
+    ranges = []
+    for day in range(1, 32):
+        name = max(cards, key=lambda card: (card[1] - day) % 31)[0]
+        if ranges and ranges[-1][0] == name and ranges[-1][2] == day - 1:
+            ranges[-1] = (name, ranges[-1][1], day)
+        else:
+            ranges.append((name, day, day))
+    return ranges
+
+
+def generate_user(seed: int, number: int, bases: SeedBases, as_of: datetime) -> Dict[str, list]:
+    """
+    Build every row for one seeded user.
+
+    Args:
+        seed: Run seed
+        number: 0-based user number within the run
+        bases: First id of each table
+        as_of: Timestamps are spread over the two years before this moment
+
+    Returns:
+        Dict mapping table name to a list of row tuples
+    """
+    rng = random.Random((seed << 32) + number)
+    user_id = bases.users + number
+    created_at = as_of - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+
+    email = f"user{user_id}@seed.spendify.dev"
+    salt = f"{rng.getrandbits(128):032x}"
+    hashed_password = hashlib.sha256((SEED_PASSWORD + salt).encode("utf-8")).hexdigest()
+    rows = {
+        "users": [(user_id, email, hashed_password, f"user{user_id}", salt, created_at, created_at)],
+        "credit_cards": [],
+        "optimisations": [],
+        "blacklisted_tokens": []
+    }
+
+    card_count = rng.choices(range(len(CARD_COUNT_WEIGHTS)), weights=CARD_COUNT_WEIGHTS)[0]
+    names: List[CreditCardCompany] = []
+    while len(names) < card_count:
+        name = rng.choices(list(CARD_WEIGHTS), weights=list(CARD_WEIGHTS.values()))[0]
+        if name not in names:
+            names.append(name)
+
+    active = []
+    for k, name in enumerate(names):
+        end_date = rng.randint(1, 31)
+        start_date = 31 if end_date == 1 else end_date - 1
+        limit = min(50000, max(500, int(rng.lognormvariate(8.6, 0.6) // 500 * 500)))
+        status = rng.random() < 0.9
+        card_created = created_at + timedelta(seconds=rng.randrange(max(1, int((as_of - created_at).total_seconds()))))
+        updated = card_created if status else card_created + (as_of - card_created) * rng.random()
+        rows["credit_cards"].append((
+            bases.credit_cards + number * MAX_CARDS_PER_USER + k,
+            user_id, name.value, limit, start_date, end_date, status, card_created, updated
+        ))
+        if status:
+            active.append((name.value, end_date))
+
+    for k, (name, value_start, value_end) in enumerate(best_card_ranges(active)):
+        rows["optimisations"].append((
+            bases.optimisations + number * MAX_RANGES_PER_USER + k,
+            user_id, name, value_start, value_end, as_of, as_of
+        ))
+
+    for k in range(rng.choices((0, 1, 2, 3), weights=(70, 20, 7, 3))[0]):
+        expires_at = (as_of + timedelta(seconds=rng.randrange(-30 * 86400, 30 * 86400))).replace(tzinfo=None)
+        token = f"seed.{rng.getrandbits(512):0128x}"
+        rows["blacklisted_tokens"].append((
+            bases.blacklisted_tokens + number * MAX_TOKENS_PER_USER + k,
+            token, expires_at, email, as_of, as_of
+        ))
+
+    return rows
+
+
+def _chunk_rows(seed: int, start: int, count: int, bases: SeedBases, as_of: datetime) -> Dict[str, list]:
+    rows = {table: [] for table in SEED_TABLES}
+    for number in range(start, start + count):
+        for table, table_rows in generate_user(seed, number, bases, as_of).items():
+            rows[table].extend(table_rows)
+    return rows
+
+
+def load_chunk(url: str, seed: int, start: int, count: int, bases: Tuple[int, int, int, int], as_of: datetime) -> Dict[str, int]:
+    """
+    Generate users start..start+count and COPY them in one transaction.
+    Runs in a worker process, so it opens its own connection.
+
+    Returns:
+        Dict mapping table name to rows loaded
+    """
+    rows = _chunk_rows(seed, start, count, SeedBases(*bases), as_of)
+    engine = create_engine(url, poolclass=NullPool)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        loaded = {
+            "users": copy_rows(cursor, "users", USER_COLUMNS, rows["users"]),
+            "credit_cards": copy_rows(cursor, "credit_cards", CARD_COLUMNS, rows["credit_cards"]),
+            "optimisations": copy_rows(cursor, "optimisations", OPTIMISATION_COLUMNS, rows["optimisations"]),
+            "blacklisted_tokens": copy_rows(cursor, "blacklisted_tokens", TOKEN_COLUMNS, rows["blacklisted_tokens"])
+        }
+        connection.commit()
+        return loaded
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+        engine.dispose()
+
+
+def _next_ids(engine: Engine) -> SeedBases:
+    with engine.connect() as conn:
+        return SeedBases(*(
+            conn.execute(text(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")).scalar()
+            for table in SEED_TABLES
+        ))
+
+
+def _reserve_ids(directory: Engine, table: str, count: int, floor: int) -> int:
+    """
+    Take a block of `count` consecutive ids, none below `floor`, from a
+    sequence on the directory shard.
+
+    Returns:
+        The first id of the block
+    """
+    with directory.begin() as conn:
+        sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+        # ALTER SEQUENCE locks the sequence, so concurrent nextval() calls wait until we commit
+        conn.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY 1"))
+        first = conn.execute(text("SELECT nextval(CAST(:sequence AS regclass))"), {"sequence": sequence}).scalar()
+        first = max(first, floor)
+        conn.execute(
+            text("SELECT setval(CAST(:sequence AS regclass), :last)"),
+            {"sequence": sequence, "last": first + count - 1}
+        )
+    return first
+
+
+def seed_database(
+        engine: Engine,
+        users: int,
+        seed: int = 0,
+        chunk_size: int = 10000,
+        workers: Optional[int] = None,
+        as_of: Optional[date] = None,
+        progress: Optional[Callable[[Dict[str, int]], None]] = None,
+        directory: Optional[Engine] = None
+) -> Dict[str, int]:
+    """
+    Fill the database with `users` synthetic users and their cards,
+    optimisation ranges and blacklisted tokens.
+
+    Ids continue after the current highest id of each table (or, with
+    `directory`, after the shared user and card sequences), so on an empty
+    database the same seed always produces exactly the same rows.
+    Sequences are moved past the new ids and the tables are analyzed at the end.
+
+    Args:
+        engine: Engine for the target database
+        users: Number of users to create
+        seed: Random seed
+        chunk_size: Users per COPY transaction
+        workers: Parallel loader processes (default: one per CPU)
+        as_of: Reference date for timestamps (default DEFAULT_AS_OF)
+        progress: Called with each chunk's row counts as it finishes
+        directory: Shard 0's engine when users are sharded. User and card ids
+            are then reserved from its shared sequences (user_shards and
+            credit_cards) instead of continuing the target's own ids, so they
+            can't collide with ids already handed out on other shards
+
+    Returns:
+        Dict mapping table name to rows loaded
+    """
+    as_of_time = datetime.combine(as_of or DEFAULT_AS_OF, time(), tzinfo=timezone.utc)
+    bases = _next_ids(engine)
+    if directory is not None and users > 0:
+        bases.users = _reserve_ids(directory, "user_shards", users, bases.users)
+        bases.credit_cards = _reserve_ids(
+            directory, "credit_cards", users * MAX_CARDS_PER_USER, bases.credit_cards
+        )
+    bases = bases.as_tuple()
+    url = engine.url.render_as_string(hide_password=False)
+
+    totals = {table: 0 for table in SEED_TABLES}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(load_chunk, url, seed, start, min(chunk_size, users - start), bases, as_of_time)
+            for start in range(0, users, chunk_size)
+        ]
+        for future in as_completed(futures):
+            loaded = future.result()
+            for table, count in loaded.items():
+                totals[table] += count
+            if progress:
+                progress(loaded)
+
+    with engine.begin() as conn:
+        for table in SEED_TABLES:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST((SELECT COALESCE(MAX(id), 0) FROM {table}), 1))"
+            ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in SEED_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+
+    return totals
@@ -1,22 +1,165 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import threading
+import time
+from typing import Dict
+from fastapi import Depends
+from sqlalchemy import create_engine, event, Insert, Update, Delete
+from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
 
+
+def _create_engine(url: str):
+    """Create an engine with the pool settings every database shares."""
+    return create_engine(
+        url,
+        pool_pre_ping=True,     # Like checking if a phone line is alive before calling
+        pool_size=settings.DB_POOL_SIZE,        # Connections kept ready to use
+        max_overflow=settings.DB_MAX_OVERFLOW   # Extra connections allowed when busy
+    )
+
+
 # Create database engine with important PostgreSQL settings
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,     # Like checking if a phone line is alive before calling
-    pool_size=5,            # Keep 5 database connections ready to use
-    max_overflow=10         # Allow up to 10 extra connections when busy
-)
+engine = _create_engine(settings.DATABASE_URL)
+
+# Databases users are spread across; shard 0 is the primary above
+shard_engines = [engine] + [_create_engine(url) for url in settings.DATABASE_SHARD_URLS]
+
+# Read-only copies of the primary; empty when no replicas are configured
+replica_engines = [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines) if replica_engines else None
+_replica_lock = threading.Lock()
+
+
+def iter_engines():
+    """Yield every engine this process talks to (shards first, primary first of all)."""
+    yield from shard_engines
+    yield from replica_engines
+
+
+def _next_replica():
+    """Pick the next replica engine in round-robin order."""
+    with _replica_lock:
+        return next(_replica_cycle)
+
+
+class RecentWrites:
+    """
+    Remembers which users wrote to the primary in the last few seconds,
+    so their follow-up reads can skip replicas that may still be lagging.
+
+    The "memory" backend is per worker process; use "redis" when running
+    several workers so a write on one worker pins reads on all of them.
+    """
+
+    def __init__(self, window_seconds: float, backend: str = "memory"):
+        self.window_seconds = window_seconds
+        self.backend = backend
+        self._deadlines: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: str) -> None:
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            get_redis().set(f"rw:{key}", 1, px=int(self.window_seconds * 1000))
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._deadlines[key] = now + self.window_seconds
+            # Drop expired entries so the map only holds recent writers
+            if len(self._deadlines) > 1024:
+                self._deadlines = {k: v for k, v in self._deadlines.items() if v > now}
+
+    def is_recent(self, key: str) -> bool:
+        if self.backend == "redis":
+            from app.core.redis import get_redis
+            return bool(get_redis().exists(f"rw:{key}"))
+
+        deadline = self._deadlines.get(key)
+        return deadline is not None and deadline > time.monotonic()
+
+
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS, settings.READ_YOUR_WRITES_BACKEND)
+
+
+class ShardSession(Session):
+    """
+    Session bound to the shard named by session.info["shard"] (0 by default).
+
+    The shard is set once the user is known (see app.db.sharding.bind_to_shard),
+    before the session runs its first statement.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return shard_engines[self.info.get("shard", 0)]
+
+
+class RoutingSession(ShardSession):
+    """
+    Session that sends reads to a replica and everything else to the primary.
+
+    One replica is chosen per session so all reads within a request see the
+    same snapshot. Setting session.info["pin_primary"] = True routes every
+    statement to the primary (used for read-your-writes). Replicas belong to
+    shard 0; sessions on other shards always use that shard's primary.
+    """
+
+    _replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("shard"):
+            return super().get_bind(mapper, clause, **kw)
+        if (
+            not replica_engines
+            or self._flushing
+            or self.info.get("pin_primary")
+            or isinstance(clause, (Insert, Update, Delete))
+        ):
+            return engine
+        if self._replica is None:
+            self._replica = _next_replica()
+        return self._replica
+
 
 # Create session factory - think of it as a template for database conversations
 SessionLocal = sessionmaker(
+    class_=ShardSession,  # Follows the user's shard once it is known
     autocommit=False,    # Changes aren't saved until we explicitly commit
     autoflush=False,     # Changes aren't automatically synced with database
     bind=engine          # Connect this session maker to our database engine
 )
 
+# Session factory for read-only dependencies, routed to replicas when configured
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False
+)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _flag_flush_writes(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _flag_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_committed_writes(session):
+    """Start the read-your-writes window for the user who just committed."""
+    if session.info.pop("wrote", False) and session.info.get("user_key"):
+        recent_writes.mark(session.info["user_key"])
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("wrote", None)
+
+
 def get_db():
     """
     Creates a new database session for each request and closes it afterward.
@@ -27,4 +170,21 @@ def get_db():
     try:
         yield db  # Give the session to FastAPI to use
     finally:
-        db.close()  # Always close the session, even if errors occur
\ No newline at end of file
+        db.close()  # Always close the session, even if errors occur
+
+
+def get_read_db(primary: Session = Depends(get_db)):
+    """
+    Creates a session for read-only work (token checks, lookups, listings).
+    Reads go to a replica unless the caller pins the session to the primary.
+    Without replicas this is the request's primary session itself, so a
+    request never holds two connections to the same database.
+    """
+    if not replica_engines:
+        yield primary
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,467 @@
+# app/db/sharding.py
+"""
+Spreading users across several Postgres databases.
+
+Shard 0 is DATABASE_URL and the others come from DATABASE_SHARD_URLS. Each
+user and everything they own (cards, ledger, tokens...) lives on one shard.
+The user_shards directory on shard 0 maps email and user id to a shard and
+hands out user ids, so ids are unique across shards. Card ids come from
+shard 0's credit_cards sequence for the same reason, which keeps them
+unchanged when a user moves. Users missing from the
+directory (created before sharding was enabled) are on shard 0.
+
+Request sessions start unbound to a shard; get_current_user and the auth
+endpoints call bind_to_shard() once they know who the user is.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, delete, event, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.ledger import ensure_month_partitions
+from app.db.session import SessionLocal, shard_engines
+from app.models.card_limit_snapshot import CardLimitSnapshot
+from app.models.card_transaction import CardTransaction
+from app.models.credit_card import CreditCard, CreditCardArchive
+from app.models.optimisation import Optimisation
+from app.models.refresh_token import RefreshToken
+from app.models.token_blacklist import TokenBlacklist
+from app.models.user import User
+from app.models.user_shard import UserShard
+
+logger = logging.getLogger(__name__)
+
+# Take the next directory id and place the user by it, in one statement
+_REGISTER_USER = text("""
+    INSERT INTO user_shards (id, email, shard)
+    SELECT next_id.id, :email, next_id.id % :shards
+    FROM (SELECT nextval(pg_get_serial_sequence('user_shards', 'id')) AS id) AS next_id
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, shard
+""")
+
+# The same for a batch of emails; emails already registered return no row
+_REGISTER_USERS = text("""
+    INSERT INTO user_shards (id, email, shard)
+    SELECT next_id.id, next_id.email, next_id.id % :shards
+    FROM (
+        SELECT nextval(pg_get_serial_sequence('user_shards', 'id')) AS id, email
+        FROM unnest(CAST(:emails AS text[])) AS new_user(email)
+    ) AS next_id
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email, shard
+""")
+
+_NEXT_CARD_IDS = text(
+    "SELECT nextval(pg_get_serial_sequence('credit_cards', 'id')) FROM generate_series(1, :count)"
+)
+
+_COPY_BATCH_ROWS = 5000
+
+
+def shard_count() -> int:
+    return len(shard_engines)
+
+
+def sharding_enabled() -> bool:
+    return len(shard_engines) > 1
+
+
+def allocate_card_ids(count: int) -> List[int]:
+    """Take `count` card ids from the shared sequence on shard 0."""
+    with shard_engines[0].connect() as directory:
+        ids = directory.execute(_NEXT_CARD_IDS, {"count": count}).scalars().all()
+        directory.commit()
+    return ids
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_shared_card_ids(session, flush_context, instances):
+    # Each shard's own credit_cards sequence would hand out overlapping ids
+    if not sharding_enabled():
+        return
+    new_cards = [obj for obj in session.new if isinstance(obj, CreditCard) and obj.id is None]
+    if new_cards:
+        for card, card_id in zip(new_cards, allocate_card_ids(len(new_cards))):
+            card.id = card_id
+
+
+def bind_to_shard(shard: int, *sessions: Session) -> None:
+    """Route the given sessions to `shard`. Call before they run any statement."""
+    for session in sessions:
+        session.info["shard"] = shard
+
+
+class ShardDirectory:
+    """
+    Cached lookups against the user_shards directory.
+
+    Entries are cached per worker for SHARD_DIRECTORY_CACHE_SECONDS, so a
+    moved user may be routed to their old shard for that long; callers that
+    miss the user there should retry with refresh=True. With a single
+    database every lookup returns 0 without touching the directory.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def shard_for_email(self, email: str, refresh: bool = False) -> int:
+        return self._lookup(f"e:{email}", UserShard.email == email, refresh)
+
+    def shard_for_user(self, user_id: int, refresh: bool = False) -> int:
+        return self._lookup(f"u:{user_id}", UserShard.id == user_id, refresh)
+
+    def register(self, email: str) -> Optional[Tuple[int, int]]:
+        """
+        Reserve a global user id and a shard for a new user.
+
+        Returns:
+            Tuple of (user_id, shard), or None if the email is already registered
+        """
+        db = SessionLocal()
+        try:
+            row = db.execute(_REGISTER_USER, {"email": email, "shards": shard_count()}).first()
+            db.commit()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        self._remember(f"e:{email}", row.shard)
+        self._remember(f"u:{row.id}", row.shard)
+        return row.id, row.shard
+
+    def register_many(self, emails: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        Reserve ids and shards for a batch of new users in one statement.
+
+        Returns:
+            Dict mapping each newly registered email to (user_id, shard);
+            emails that were already registered are left out
+        """
+        db = SessionLocal()
+        try:
+            rows = db.execute(_REGISTER_USERS, {"emails": emails, "shards": shard_count()}).all()
+            db.commit()
+        finally:
+            db.close()
+        for row in rows:
+            self._remember(f"e:{row.email}", row.shard)
+            self._remember(f"u:{row.id}", row.shard)
+        return {row.email: (row.id, row.shard) for row in rows}
+
+    def forget_many(self, entries: List[Tuple[int, str]]) -> None:
+        """Remove (user_id, email) directory entries whose users were never created."""
+        if not entries:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(delete(UserShard).where(UserShard.id.in_([user_id for user_id, _ in entries])))
+            db.commit()
+        finally:
+            db.close()
+        for user_id, email in entries:
+            self.invalidate(email, user_id)
+
+    def forget(self, user_id: int, email: str) -> None:
+        """Remove a directory entry whose user was never created."""
+        db = SessionLocal()
+        try:
+            db.execute(delete(UserShard).where(UserShard.id == user_id))
+            db.commit()
+        finally:
+            db.close()
+        self.invalidate(email, user_id)
+
+    def invalidate(self, email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._cache.pop(f"e:{email}", None)
+            self._cache.pop(f"u:{user_id}", None)
+
+    def _lookup(self, key: str, condition, refresh: bool) -> int:
+        if not sharding_enabled():
+            return 0
+
+        if not refresh:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+
+        db = SessionLocal()
+        try:
+            shard = db.execute(select(UserShard.shard).where(condition)).scalar()
+        finally:
+            db.close()
+
+        shard = shard if shard is not None and shard < shard_count() else 0
+        self._remember(key, shard)
+        return shard
+
+    def _remember(self, key: str, shard: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._cache[key] = (now + self.ttl_seconds, shard)
+            if len(self._cache) > self.max_entries:
+                self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+                if len(self._cache) > self.max_entries:
+                    self._cache.clear()
+
+
+shard_directory = ShardDirectory(settings.SHARD_DIRECTORY_CACHE_SECONDS, settings.SHARD_DIRECTORY_CACHE_SIZE)
+
+
+def _warn_directory_conflicts(directory: Connection, shard: int, batch) -> None:
+    """Log users skipped by sync_directory because the directory maps their id or email elsewhere."""
+    expected = {(row.id, row.email) for row in batch}
+    conflicts = [
+        entry for entry in directory.execute(
+            select(UserShard.id, UserShard.email, UserShard.shard).where(
+                UserShard.id.in_([row.id for row in batch]) | UserShard.email.in_([row.email for row in batch])
+            )
+        )
+        if (entry.id, entry.email) not in expected or entry.shard != shard
+    ]
+    if conflicts:
+        # These users route elsewhere and can't sign in until the clash is resolved
+        logger.warning(
+            "%d users on shard %d clash with shard directory entries: %s",
+            len(conflicts), shard, [(entry.id, entry.email, entry.shard) for entry in conflicts[:20]]
+        )
+
+
+def sync_directory() -> Dict[int, int]:
+    """
+    Add every user on every shard to the directory and move the user and
+    card id sequences past the highest existing ids. Run once before
+    enabling sharding (and after restoring or seeding a shard).
+
+    Returns:
+        Dict mapping shard to the number of users added
+    """
+    added = {}
+    highest = 0
+    highest_card = 0
+    with shard_engines[0].begin() as directory:
+        for shard, shard_engine in enumerate(shard_engines):
+            added[shard] = 0
+            with shard_engine.connect() as source:
+                result = source.execute(
+                    select(User.id, User.email).execution_options(yield_per=_COPY_BATCH_ROWS)
+                )
+                for batch in result.partitions():
+                    inserted = directory.execute(
+                        insert(UserShard)
+                        .values([{"id": row.id, "email": row.email, "shard": shard} for row in batch])
+                        .on_conflict_do_nothing()
+                    )
+                    added[shard] += inserted.rowcount
+                    highest = max(highest, max(row.id for row in batch))
+                    if inserted.rowcount < len(batch):
+                        _warn_directory_conflicts(directory, shard, batch)
+                for model in (CreditCard, CreditCardArchive):
+                    highest_card = max(highest_card, source.execute(select(func.max(model.id))).scalar() or 0)
+
+        directory.execute(
+            text("SELECT setval(pg_get_serial_sequence('user_shards', 'id'), "
+                 "GREATEST(:highest, (SELECT COALESCE(MAX(id), 0) FROM user_shards), 1))"),
+            {"highest": highest}
+        )
+        # Cards created on any shard from now on take their ids from shard 0's sequence
+        directory.execute(
+            text("SELECT setval(pg_get_serial_sequence('credit_cards', 'id'), "
+                 "GREATEST(:highest, (SELECT COALESCE(MAX(id), 0) FROM credit_cards), 1))"),
+            {"highest": highest_card}
+        )
+    return added
+
+
+def plan_rebalance(max_moves: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Work out which users to move so every shard holds about the same number.
+    Users are taken from the fullest shard (newest first) and given to the
+    emptiest until the counts differ by at most one.
+
+    Returns:
+        List of (user_id, from_shard, to_shard)
+    """
+    with shard_engines[0].connect() as directory:
+        counts = {shard: 0 for shard in range(shard_count())}
+        for shard, users in directory.execute(
+                select(UserShard.shard, func.count()).group_by(UserShard.shard)
+        ):
+            counts[shard] = users
+
+        pending: Dict[Tuple[int, int], int] = {}
+        moves = 0
+        while max_moves is None or moves < max_moves:
+            fullest = max(counts, key=counts.get)
+            emptiest = min(counts, key=counts.get)
+            if counts[fullest] - counts[emptiest] <= 1:
+                break
+            counts[fullest] -= 1
+            counts[emptiest] += 1
+            pending[(fullest, emptiest)] = pending.get((fullest, emptiest), 0) + 1
+            moves += 1
+
+        plan = []
+        taken: Dict[int, int] = {}
+        for (source, target), number in pending.items():
+            user_ids = directory.execute(
+                select(UserShard.id)
+                .where(UserShard.shard == source)
+                .order_by(UserShard.id.desc())
+                .offset(taken.get(source, 0))
+                .limit(number)
+            ).scalars().all()
+            taken[source] = taken.get(source, 0) + number
+            plan.extend((user_id, source, target) for user_id in user_ids)
+    return plan
+
+
+def move_user(user_id: int, target: int) -> Dict[str, int]:
+    """
+    Move one user and everything they own to another shard.
+
+    The user's row and card rows are locked on the source for the whole
+    move, which holds back their new cards, card edits, ledger imports and
+    new tokens (those all wait on the locks). The copy commits on the
+    target, the directory is switched, and only then are the source rows
+    deleted. The user and card ids are kept, so links and references
+    clients hold stay valid.
+
+    Returns:
+        Dict mapping table name to rows copied
+
+    Raises:
+        LookupError: If the user doesn't exist on their shard
+        ValueError: If the target shard doesn't exist
+    """
+    if not 0 <= target < shard_count():
+        raise ValueError(f"Shard {target} doesn't exist (there are {shard_count()})")
+    source = shard_directory.shard_for_user(user_id, refresh=True)
+    if source == target:
+        return {}
+
+    user = None
+    with shard_engines[source].connect() as src, shard_engines[target].connect() as dst:
+        src_tx = src.begin()
+        try:
+            user = src.execute(
+                select(User.__table__).where(User.id == user_id).with_for_update()
+            ).mappings().first()
+            if user is None:
+                raise LookupError(f"User {user_id} not found on shard {source}")
+            email = user["email"]
+
+            with dst.begin():
+                copied = _copy_user_rows(src, dst, user)
+
+            try:
+                _point_directory_at(user_id, email, target)
+            except Exception:
+                with dst.begin():
+                    _delete_user_rows(dst, user_id, email)
+                raise
+
+            _delete_user_rows(src, user_id, email)
+            src_tx.commit()
+        except Exception:
+            src_tx.rollback()
+            raise
+        finally:
+            shard_directory.invalidate(user["email"] if user else None, user_id)
+
+    logger.info("Moved user %s from shard %s to shard %s: %s", user_id, source, target, copied)
+    return copied
+
+
+def _copy_user_rows(src: Connection, dst: Connection, user) -> Dict[str, int]:
+    """Copy a user's rows from `src` to `dst` inside the callers' transactions."""
+    user_id, email = user["id"], user["email"]
+    copied = {"users": 0}
+    dst.execute(insert(User.__table__), [dict(user)])
+    copied["users"] = 1
+
+    # Card ids come from the shared sequence, so they are copied as they are
+    cards = src.execute(
+        select(CreditCard.__table__).where(CreditCard.user_id == user_id).order_by(CreditCard.id).with_for_update()
+    ).mappings().all()
+    if cards:
+        dst.execute(insert(CreditCard.__table__), [dict(card) for card in cards])
+    copied["credit_cards"] = len(cards)
+
+    archived = src.execute(
+        select(CreditCardArchive.__table__).where(CreditCardArchive.user_id == user_id)
+    ).mappings().all()
+    if archived:
+        dst.execute(insert(CreditCardArchive.__table__), [dict(card) for card in archived])
+    copied["credit_cards_archive"] = len(archived)
+    card_ids = [card["id"] for card in cards] + [card["id"] for card in archived]
+
+    for model in (Optimisation, RefreshToken, CardLimitSnapshot):
+        rows = src.execute(select(model.__table__).where(model.user_id == user_id)).mappings().all()
+        if rows:
+            dst.execute(insert(model.__table__), [_without_id(row) for row in rows])
+        copied[model.__tablename__] = len(rows)
+
+    blacklisted = src.execute(
+        select(TokenBlacklist.__table__).where(TokenBlacklist.blacklisted_by == email)
+    ).mappings().all()
+    if blacklisted:
+        dst.execute(insert(TokenBlacklist.__table__), [_without_id(row) for row in blacklisted])
+    copied["blacklisted_tokens"] = len(blacklisted)
+
+    copied["card_transactions"] = 0
+    if card_ids:
+        months = src.execute(
+            select(func.date_trunc("month", CardTransaction.posted_on).cast(Date))
+            .where(CardTransaction.card_id.in_(card_ids))
+            .distinct()
+        ).scalars().all()
+        ensure_month_partitions(dst.connection.cursor(), months)
+
+        result = src.execute(
+            select(CardTransaction.__table__)
+            .where(CardTransaction.card_id.in_(card_ids))
+            .execution_options(yield_per=_COPY_BATCH_ROWS)
+        )
+        for batch in result.mappings().partitions():
+            dst.execute(insert(CardTransaction.__table__), [_without_id(row) for row in batch])
+            copied["card_transactions"] += len(batch)
+
+    return copied
+
+
+def _without_id(row) -> Dict:
+    """Copy a row minus its id; the target shard's own sequence assigns a new one."""
+    return {key: value for key, value in row.items() if key != "id"}
+
+
+def _point_directory_at(user_id: int, email: str, shard: int) -> None:
+    with shard_engines[0].begin() as directory:
+        directory.execute(
+            insert(UserShard)
+            .values(id=user_id, email=email, shard=shard)
+            .on_conflict_do_update(
+                index_elements=[UserShard.id],
+                set_={"shard": shard, "updated_at": func.now()}
+            )
+        )
+
+
+def _delete_user_rows(conn: Connection, user_id: int, email: str) -> None:
+    """Delete a user and everything they own, children first."""
+    user_cards = select(CreditCard.id).where(CreditCard.user_id == user_id)
+    conn.execute(delete(CardTransaction).where(CardTransaction.card_id.in_(user_cards)))
+    for model in (CardLimitSnapshot, RefreshToken, Optimisation, CreditCardArchive, CreditCard):
+        conn.execute(delete(model).where(model.user_id == user_id))
+    conn.execute(delete(TokenBlacklist).where(TokenBlacklist.blacklisted_by == email))
+    conn.execute(delete(User).where(User.id == user_id))
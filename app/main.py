@@ -1,71 +1,132 @@
+import time
+
+_import_started = time.perf_counter()  # Measured before any heavy imports
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.startup import StartupReport, run_warmups, check_budget
+from app.core.jobs import job_queue
+from app.core.events import event_broker
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.logging import RequestIdMiddleware, setup_logging
+from app.db.session import iter_engines
 from app.api.v1.api import router as api_v1_router
+from app.api.well_known import router as well_known_router
 import logging
 
 #logging.basicConfig(level=logging.DEBUG)
 #logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version="1.0.0",
-    description="Spendify API",
-    debug=True
-)
-
-'''
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Enhanced logging middleware that properly handles request body"""
-    try:
-        # Log basic request info
-        logger.debug(f"Incoming request: {request.method} {request.url}")
-        logger.debug(f"Request headers: {request.headers}")
-
-        # Create a copy of the request body
-        body_bytes = await request.body()
-        # Log the body content and length
-        logger.debug(f"Request body length: {len(body_bytes)}")
-        logger.debug(f"Request body content: {body_bytes.decode() if body_bytes else 'EMPTY'}")
-
-        # We need to create a new request with the body since we've consumed it
-        async def receive():
-            return {"type": "http.request", "body": body_bytes}
-
-        request._receive = receive
-        response = await call_next(request)
-        return response
-
-    except Exception as e:
-        logger.exception("Error processing request")
-        return JSONResponse(
-            status_code=400,
-            content={
-                "status": "error",
-                "message": "Request processing error",
-                "details": str(e)
-            }
-        )
-''' #CORS Debugging logic
-
-# CORS middleware configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(api_v1_router, prefix=settings.API_V1_STR)
-
-
-@app.get("/")
-async def root():
-    return {
-        "message": "Welcome to Spendify API",
-        "version": "1.0.0",
-        "database_url": settings.DATABASE_URL[:10] + "..."
-    }
\ No newline at end of file
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm everything the first requests would otherwise pay for
+    (pool connections, schemas, caches) before the worker reports ready.
+    """
+    report = StartupReport(import_seconds=_import_duration)
+    report.record("create_app", app.state.build_seconds)
+    run_warmups(app, iter_engines(), report)
+    check_budget(report)
+    app.state.startup_report = report
+    await job_queue.start()
+    await event_broker.start()
+
+    yield
+
+    await event_broker.stop()
+    await job_queue.stop(timeout=settings.SERVER_GRACEFUL_TIMEOUT)
+    for engine in iter_engines():
+        engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """
+    Build and configure the FastAPI application.
+    """
+    build_started = time.perf_counter()
+    setup_logging()
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version="1.0.0",
+        description="Spendify API",
+        debug=True,
+        lifespan=lifespan
+    )
+
+    '''
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        """Enhanced logging middleware that properly handles request body"""
+        try:
+            # Log basic request info
+            logger.debug(f"Incoming request: {request.method} {request.url}")
+            logger.debug(f"Request headers: {request.headers}")
+
+            # Create a copy of the request body
+            body_bytes = await request.body()
+            # Log the body content and length
+            logger.debug(f"Request body length: {len(body_bytes)}")
+            logger.debug(f"Request body content: {body_bytes.decode() if body_bytes else 'EMPTY'}")
+
+            # We need to create a new request with the body since we've consumed it
+            async def receive():
+                return {"type": "http.request", "body": body_bytes}
+
+            request._receive = receive
+            response = await call_next(request)
+            return response
+
+        except Exception as e:
+            logger.exception("Error processing request")
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "status": "error",
+                    "message": "Request processing error",
+                    "details": str(e)
+                }
+            )
+    ''' #CORS Debugging logic
+
+    # Replay responses for retried POSTs carrying an Idempotency-Key
+    app.add_middleware(IdempotencyMiddleware)
+
+    # CORS middleware configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Outside the other middlewares, so a profile covers them too
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+
+    # Tag every log record (including the middlewares' own) with the request id
+    app.add_middleware(RequestIdMiddleware)
+
+    app.include_router(api_v1_router, prefix=settings.API_V1_STR)
+    app.include_router(well_known_router, tags=["Well-known"])
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": "Welcome to Spendify API",
+            "version": "1.0.0",
+            "database_url": settings.DATABASE_URL[:10] + "..."
+        }
+
+    app.state.build_seconds = time.perf_counter() - build_started
+    return app
+
+
+_import_duration = time.perf_counter() - _import_started
+
+app = create_app()
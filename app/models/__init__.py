@@ -1,8 +1,13 @@
 from app.models.base import BaseModel
 from app.models.user import User
-from app.models.credit_card import CreditCard
+from app.models.credit_card import CreditCard, CreditCardArchive
 from app.models.optimisation import Optimisation
 from app.models.token_blacklist import TokenBlacklist
+from app.models.refresh_token import RefreshToken
+from app.models.card_transaction import CardTransaction
+from app.models.card_limit_snapshot import CardLimitSnapshot
+from app.models.background_job import BackgroundJob
+from app.models.user_shard import UserShard
 
 # This file ensures proper model registration order
 # All models should be imported here to be included in migrations
@@ -11,6 +16,12 @@ __all__ = [
     'BaseModel',
     'User',
     'CreditCard',
+    'CreditCardArchive',
     'Optimisation',
-    'blacklisted_tokens'
+    'blacklisted_tokens',
+    'RefreshToken',
+    'CardTransaction',
+    'CardLimitSnapshot',
+    'BackgroundJob',
+    'UserShard'
 ]
\ No newline at end of file
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index, text
+from sqlalchemy.sql import func
+from app.models.base import BaseModel
+
+
+class BackgroundJob(BaseModel):
+    """
+    Durable queue entry for post-commit work (used when JOB_QUEUE_DURABLE is on).
+
+    Rows are written in the same transaction as the change that caused them,
+    so a job exists if and only if that change committed. Workers claim rows
+    with FOR UPDATE SKIP LOCKED and a lease in run_after; a job whose worker
+    dies is picked up again once the lease runs out (at-least-once delivery).
+    """
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Only rows still waiting to run are indexed
+        Index("ix_background_jobs_due", "run_after", postgresql_where=text("status != 'failed'")),
+    )
+
+    name = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(10), nullable=False, default="queued")  # queued, running, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<BackgroundJob {self.name} {self.status} attempts={self.attempts}>"
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, Integer, Index
+from app.models.base import BaseModel
+
+
+class CardLimitSnapshot(BaseModel):
+    """
+    Append-only history of credit limits, one row per card creation or limit change.
+
+    Rows are only ever inserted, so created_at follows the physical row order
+    and a BRIN index on it stays a few pages in size however many rows there
+    are. card_id deliberately has no foreign key: history outlives the card
+    row and appends stay cheap.
+    """
+    __tablename__ = "card_limit_snapshots"
+    __table_args__ = (
+        Index(
+            "ix_card_limit_snapshots_created_at_brin",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32}
+        ),
+    )
+
+    card_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    credit_limit = Column(Integer, nullable=False)
+    event = Column(String(10), nullable=False)  # "created" or "updated"
+
+    @classmethod
+    def for_card(cls, card, event: str) -> "CardLimitSnapshot":
+        """
+        Build a snapshot of a card's current limit.
+        The card must already have an id (flush new cards first).
+        """
+        return cls(
+            card_id=card.id,
+            user_id=card.user_id,
+            credit_limit=card.credit_limit,
+            event=event
+        )
+
+    def __repr__(self):
+        return f"<CardLimitSnapshot card={self.card_id} limit={self.credit_limit}>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.models.base import BaseModel
+
+
+class CardTransaction(BaseModel):
+    """
+    CardTransaction model for storing posted spend on a credit card.
+
+    The table is range-partitioned by posting month (card_transactions_yYYYYmMM),
+    so the partition key is part of the primary key and of the natural key
+    used to deduplicate statement imports.
+    """
+    __tablename__ = "card_transactions"
+    __table_args__ = (
+        UniqueConstraint("card_id", "posted_on", "reference", name="uq_card_transactions_natural_key"),
+        {"postgresql_partition_by": "RANGE (posted_on)"}
+    )
+
+    posted_on = Column(Date, primary_key=True)
+    card_id = Column(Integer, ForeignKey("credit_cards.id"), nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)  # Charges positive, credits negative
+    currency = Column(String(3), nullable=False, default="CAD")
+    description = Column(String(255), nullable=False)
+    reference = Column(String(64), nullable=False)  # Issuer's transaction reference
+
+    card = relationship("CreditCard")
+
+    def __repr__(self):
+        return f"<CardTransaction {self.card_id} {self.posted_on} {self.amount_cents}>"
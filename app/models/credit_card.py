@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, SmallInteger, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, SmallInteger, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 from sqlalchemy.sql import func
@@ -8,6 +8,10 @@ class CreditCard(BaseModel):
     CreditCard model for storing credit card details.
     """
     __tablename__ = "credit_cards"
+    __table_args__ = (
+        # Small partial index the archival job scans for cards to move out
+        Index("ix_credit_cards_inactive_updated_at", "updated_at", postgresql_where=text("status = false")),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     card_name = Column(String(50), nullable=False)
@@ -19,4 +23,24 @@ class CreditCard(BaseModel):
     user = relationship("User", back_populates="credit_cards")
 
     def __repr__(self):
-        return f"<CreditCard {self.card_name}>"
\ No newline at end of file
+        return f"<CreditCard {self.card_name}>"
+
+
+class CreditCardArchive(BaseModel):
+    """
+    Cards that have been inactive for a long time, moved out of credit_cards
+    so the hot table and its indexes only hold cards that are still in use.
+    Rows keep the id they had in credit_cards so they can be restored.
+    """
+    __tablename__ = "credit_cards_archive"
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    card_name = Column(String(50), nullable=False)
+    credit_limit = Column(Integer, nullable=False)
+    billing_start_date = Column(SmallInteger, nullable=False)
+    billing_end_date = Column(SmallInteger, nullable=False)
+    status = Column(Boolean, nullable=False, default=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CreditCardArchive {self.card_name}>"
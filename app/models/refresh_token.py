@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
+from app.models.base import BaseModel
+
+
+class RefreshToken(BaseModel):
+    """
+    Model for long-lived refresh tokens.
+
+    Only a SHA-256 hash of each token is stored. Every refresh rotates the
+    token: the old row is marked revoked and a new one is issued in the same
+    family. Seeing a revoked token again means it was replayed, so the whole
+    family is revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    # All tokens descending from one signin share a family
+    family_id = Column(String(32), nullable=False, index=True)
+
+    # SHA-256 hex digest of the token handed to the client
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    # Set when the token is rotated or its family is revoked
+    revoked_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<RefreshToken family={self.family_id} expires_at={self.expires_at}>"
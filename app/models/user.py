@@ -1,8 +1,22 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, CheckConstraint
 from app.models.base import BaseModel
 import hashlib
 import os
 from sqlalchemy.orm import relationship
+from typing import Optional, Tuple
+
+
+def hash_password(password: str, salt: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Salt and hash a password.
+
+    Shared by User.set_password and bulk provisioning (app.core.provisioning).
+
+    Returns:
+        Tuple of (salt, hashed_password)
+    """
+    salt = salt or os.urandom(16).hex()
+    return salt, hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
 
 
 class User(BaseModel):
@@ -10,6 +24,11 @@ class User(BaseModel):
     User model for storing user details.
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # Emails are normalised before insert, so the unique index on email
+        # serves every lookup (and ON CONFLICT) without a lower() expression index
+        CheckConstraint("email = lower(email)", name="ck_users_email_lowercase"),
+    )
 
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
@@ -30,13 +49,10 @@ class User(BaseModel):
     )
 
     def set_password(self, password: str):
-        self.salt=os.urandom(16).hex()
-        salted_password= (password + self.salt).encode('utf-8')
-        self.hashed_password = hashlib.sha256(salted_password).hexdigest()
+        self.salt, self.hashed_password = hash_password(password)
 
     def verify_password(self, password: str)-> bool:
-        salted_password= (password + self.salt).encode('utf-8')
-        return self.hashed_password == hashlib.sha256(salted_password).hexdigest()
+        return self.hashed_password == hash_password(password, self.salt)[1]
 
     def __repr__(self):
         return f"<User {self.email}>"
\ No newline at end of file
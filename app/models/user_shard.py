@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, SmallInteger
+from app.models.base import BaseModel
+
+
+class UserShard(BaseModel):
+    """
+    Directory of which database shard holds each user.
+
+    Lives on shard 0 only. The row id is the user's global id: new users
+    get their id here first and are then inserted on their shard with it,
+    so user ids stay unique across shards and survive a move.
+    """
+    __tablename__ = "user_shards"
+
+    email = Column(String(255), unique=True, index=True, nullable=False)
+    shard = Column(SmallInteger, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<UserShard {self.id} -> {self.shard}>"
@@ -0,0 +1,52 @@
+from pydantic import BaseModel
+from app.schemas.base import ResponseSchema
+from typing import List
+
+
+class CardProductResponse(BaseModel):
+    """
+    Metadata for one card product in the catalog.
+    Fees are in dollars, reward rate and foreign transaction fee in percent.
+    """
+    card_name: str
+    issuer: str
+    network: str
+    annual_fee: float
+    grace_period_days: int
+    reward_rate: float
+    foreign_transaction_fee: float
+
+
+class CatalogResult(BaseModel):
+    """
+    Every card product, with the catalog version they come from.
+    """
+    version: str
+    products: List[CardProductResponse]
+
+
+class CatalogResponse(ResponseSchema[CatalogResult]):
+    """
+    Wrapper response schema for the card catalog.
+    """
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Card catalog version 2024.1",
+                "data": {
+                    "version": "2024.1",
+                    "products": [
+                        {
+                            "card_name": "RBC Credit Card",
+                            "issuer": "Royal Bank of Canada",
+                            "network": "Visa",
+                            "annual_fee": 0.0,
+                            "grace_period_days": 21,
+                            "reward_rate": 1.0,
+                            "foreign_transaction_fee": 2.5
+                        }
+                    ]
+                }
+            }
+        }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator, model_validator
 from app.schemas.base import BaseSchema, ResponseSchema
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Literal, Union, Annotated
 from app.core.constants import CreditCardCompany
 import re
 from datetime import datetime
@@ -182,6 +182,54 @@ class CreditCardResponse(BaseSchema):
             }
         }
 
+class CreditCardPartialResponse(BaseModel):
+    """
+    Credit card with only the fields the client asked for (see `fields=`).
+    Fields that weren't requested are left out of the response entirely.
+    """
+    id: Optional[int] = None
+    card_name: Optional[str] = None
+    credit_limit: Optional[int] = None
+    billing_start_date: Optional[int] = None
+    billing_end_date: Optional[int] = None
+    status: Optional[bool] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Fields a client may request with `fields=`
+CARD_FIELDS = tuple(CreditCardPartialResponse.model_fields)
+
+
+class CreditCardListResponse(ResponseSchema[List[CreditCardPartialResponse]]):
+    """
+    Response schema for listing credit cards, optionally with a sparse fieldset.
+    """
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Found 1 credit cards",
+                "data": [
+                    {
+                        "id": 1,
+                        "card_name": "BMO Credit Card",
+                        "billing_start_date": 4,
+                        "billing_end_date": 5
+                    }
+                ]
+            }
+        }
+
+
+class CreditCardDetailResponse(ResponseSchema[CreditCardPartialResponse]):
+    """
+    Response schema for a single credit card, optionally with a sparse fieldset.
+    """
+    pass
+
+
 class CreditCardCreateResponse(ResponseSchema[CreditCardResponse]):
     """
     Wrapper response schema for credit card creation.
@@ -316,3 +364,131 @@ class CreditCardEditResponse(ResponseSchema):
             }
         }
 
+
+class CreditCardHistoryEntry(CreditCardResponse):
+    """
+    A card from either the live table or the archive.
+    archived_at is set only for archived cards.
+    """
+    archived: bool = False
+    archived_at: Optional[datetime] = None
+
+
+class CreditCardHistoryResponse(ResponseSchema[List[CreditCardHistoryEntry]]):
+    """
+    Response schema for the full card history (active, deleted and archived).
+    """
+    pass
+
+
+class CardLimitSnapshotResponse(BaseSchema):
+    """
+    One entry in a card's credit-limit history.
+    created_at is when the limit took effect.
+    """
+    card_id: int
+    credit_limit: int
+    event: str
+    created_at: datetime
+
+
+class CardLimitHistoryResponse(ResponseSchema[List[CardLimitSnapshotResponse]]):
+    """
+    Response schema for a user's credit-limit history, oldest first.
+    """
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Found 2 limit changes",
+                "data": [
+                    {
+                        "id": 10,
+                        "card_id": 1,
+                        "credit_limit": 5000,
+                        "event": "created",
+                        "created_at": "2024-12-02T10:00:00"
+                    },
+                    {
+                        "id": 57,
+                        "card_id": 1,
+                        "credit_limit": 6000,
+                        "event": "updated",
+                        "created_at": "2025-03-14T09:30:00"
+                    }
+                ]
+            }
+        }
+
+
+class CreditCardAddOperation(BaseModel):
+    """Batch operation that adds a card."""
+    op: Literal["add"]
+    data: CreditCardCreate
+
+
+class CreditCardEditOperation(BaseModel):
+    """Batch operation that edits one of the user's active cards."""
+    op: Literal["edit"]
+    card_id: int
+    data: CreditCardEdit
+
+
+class CreditCardDeleteOperation(BaseModel):
+    """Batch operation that soft deletes one of the user's active cards."""
+    op: Literal["delete"]
+    card_id: int
+
+
+CreditCardOperation = Annotated[
+    Union[CreditCardAddOperation, CreditCardEditOperation, CreditCardDeleteOperation],
+    Field(discriminator="op")
+]
+
+
+class CreditCardBatchRequest(BaseModel):
+    """
+    Ordered list of card changes applied in one transaction.
+    Either every operation is saved or none are.
+    """
+    operations: List[CreditCardOperation] = Field(..., min_length=1, max_length=100)
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "operations": [
+                    {
+                        "op": "add",
+                        "data": {
+                            "card_name": "BMO Credit Card",
+                            "credit_limit": 5000,
+                            "billing_start_date": 4,
+                            "billing_end_date": 5
+                        }
+                    },
+                    {"op": "edit", "card_id": 3, "data": {"credit_limit": 7500}},
+                    {"op": "delete", "card_id": 7}
+                ]
+            }
+        }
+    }
+
+
+class CreditCardOperationResult(BaseModel):
+    """
+    Outcome of one batch operation, in request order.
+    data holds the card as saved when the batch succeeds.
+    """
+    index: int
+    op: str
+    status: str
+    message: str
+    card_id: Optional[int] = None
+    data: Optional[CreditCardResponse] = None
+
+
+class CreditCardBatchResponse(ResponseSchema[List[CreditCardOperationResult]]):
+    """
+    Response schema for a card batch: one result per operation.
+    """
+    pass
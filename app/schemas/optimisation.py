@@ -0,0 +1,123 @@
+from pydantic import BaseModel, Field, model_validator
+from app.schemas.base import ResponseSchema
+from typing import Optional, List
+from datetime import date
+from app.core.constants import CreditCardCompany
+
+
+class CardVariant(BaseModel):
+    '''
+    One hypothetical change to the user's portfolio.
+    With card_id it replaces that active card's billing dates and limit;
+    without it the card is added alongside the current ones.
+    '''
+    label: Optional[str] = Field(None, max_length=100, description="Client-side name for this variant")
+    card_id: Optional[int] = Field(None, description="Active card this variant changes; omit to add a card")
+    card_name: Optional[CreditCardCompany] = Field(None, description="Card being added (informational)")
+    credit_limit: int = Field(..., ge=500, description="Credit limit of the card (minimum 500)")
+    billing_start_date: int = Field(..., ge=1, le=31, description="Day of month billing cycle starts (1-31)")
+    billing_end_date: int = Field(..., ge=1, le=31, description="Day of month billing cycle ends (1-31)")
+
+    @model_validator(mode='after')
+    def validate_billing_dates(self):
+        """
+        Validates that the billing dates are consecutive days in the cycle,
+        where 1 follows 31.
+        """
+        expected_start = 31 if self.billing_end_date == 1 else self.billing_end_date - 1
+        if self.billing_start_date != expected_start:
+            raise ValueError(
+                f"Invalid billing cycle dates. For a billing cycle ending on the {self.billing_end_date}th, "
+                f"the start date must be the {expected_start}th"
+            )
+        return self
+
+
+class SimulationRequest(BaseModel):
+    '''
+    Candidate variants to score against the user's active cards.
+    Nothing is saved; results are computed on the fly.
+    '''
+    variants: List[CardVariant] = Field(..., min_length=1)
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "variants": [
+                    {
+                        "label": "Add TD closing on the 20th",
+                        "card_name": "TD Credit Card",
+                        "credit_limit": 5000,
+                        "billing_start_date": 19,
+                        "billing_end_date": 20
+                    },
+                    {
+                        "label": "Move card 3 to the 5th",
+                        "card_id": 3,
+                        "credit_limit": 7500,
+                        "billing_start_date": 4,
+                        "billing_end_date": 5
+                    }
+                ]
+            }
+        }
+    }
+
+
+class PortfolioScore(BaseModel):
+    """
+    Interest-free days across the month when paying with the best card each day.
+    """
+    mean_interest_free_days: float
+    min_interest_free_days: int
+    total_credit_limit: int
+
+
+class VariantScore(PortfolioScore):
+    """
+    Score of one variant, with its position in the request and its rank (1 = best).
+    days_as_best_card counts the days on which the variant's card beats every other card.
+    """
+    index: int
+    rank: int
+    label: Optional[str] = None
+    card_id: Optional[int] = None
+    change_in_mean_days: float
+    days_as_best_card: int
+
+
+class SimulationResult(BaseModel):
+    """
+    Current portfolio score and every variant, best first.
+    grace_period_days is the default used for cards missing from the product catalog.
+    """
+    grace_period_days: int
+    current: PortfolioScore
+    variants: List[VariantScore]
+
+
+class SimulationResponse(ResponseSchema[SimulationResult]):
+    """
+    Wrapper response schema for a what-if simulation.
+    """
+    pass
+
+
+class TodayRecommendation(BaseModel):
+    """
+    Card to use today in the user's time zone.
+    card_name is None when no saved range with an active card covers today;
+    best_until is the last day in a row the same card stays the pick.
+    """
+    date: date
+    day: int
+    timezone: str
+    card_name: Optional[str] = None
+    best_until: Optional[date] = None
+
+
+class TodayResponse(ResponseSchema[TodayRecommendation]):
+    """
+    Wrapper response schema for the best card today.
+    """
+    pass
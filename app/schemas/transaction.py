@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from app.schemas.base import ResponseSchema
+from typing import List, Dict, Any
+
+
+class StatementIngestResult(BaseModel):
+    """
+    Outcome of loading one statement batch into the transaction ledger.
+    Only the first few rejected rows are listed in `errors`.
+    """
+    card_id: int
+    format: str
+    received: int
+    inserted: int
+    duplicates: int
+    rejected: int
+    errors: List[Dict[str, Any]] = []
+
+
+class StatementIngestResponse(ResponseSchema[StatementIngestResult]):
+    """
+    Wrapper response schema for statement ingestion.
+    """
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Statement imported: 1,204 new transactions, 12 duplicates skipped.",
+                "data": {
+                    "card_id": 1,
+                    "format": "csv",
+                    "received": 1217,
+                    "inserted": 1204,
+                    "duplicates": 12,
+                    "rejected": 1,
+                    "errors": [{"line": 88, "error": "amount must be a number"}]
+                }
+            }
+        }
@@ -8,6 +8,12 @@ class UserSignupRequest(BaseModel):
     password: str
     user_name: constr(min_length=3, max_length=10,pattern=r"^[a-zA-Z0-9_-]+$")
 
+    @field_validator('email')
+    @classmethod
+    def normalise_email(cls, email: str) -> str:
+        """Store emails in lowercase so lookups hit the unique email index"""
+        return email.lower()
+
     @field_validator('password')
     @classmethod
     def password_validation(cls, password: str)->str:
@@ -43,6 +49,12 @@ class UserSignInRequest(BaseModel):
     email: EmailStr
     password: str
 
+    @field_validator('email')
+    @classmethod
+    def normalise_email(cls, email: str) -> str:
+        """Match the lowercase form emails are stored in"""
+        return email.lower()
+
     model_config = {
         "from_attributes": True,
         "json_schema_extra": {
@@ -61,6 +73,7 @@ class Token(BaseModel):
     access_token: str
     token_type: str = "Bearer"  # token type is always Bearer
     username: str
+    refresh_token: Optional[str] = None  # Exchange at /auth/refresh for a new access token
 
 
 class UserSignInResponse(ResponseSchema[Token]):
@@ -70,6 +83,28 @@ class UserSignInResponse(ResponseSchema[Token]):
     """
     pass
 
+class RefreshTokenRequest(BaseModel):
+    """
+    Schema for exchanging a refresh token for a new access token.
+    """
+    refresh_token: str
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "refresh_token": "3q2-7wEXAMPLEb1Xh4mNqk6n2l0y5mP9nK2xZbQeJvE"
+            }
+        }
+    }
+
+
+class TokenRefreshResponse(ResponseSchema[Token]):
+    """
+    Schema for a successful token refresh.
+    Carries a new access token and the rotated refresh token.
+    """
+    pass
+
 class SignOutResponse(ResponseSchema):
     """
     Response schema for sign out endpoint.
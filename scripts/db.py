@@ -2,10 +2,15 @@ import typer
 from alembic.config import Config
 from alembic import command
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Make the app package importable when run as `python scripts/db.py`
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
 app = typer.Typer()
 
 @app.command()
@@ -15,10 +20,31 @@ def migrate(message: str = None):
     command.revision(alembic_cfg, message=message, autogenerate=True)
 
 @app.command()
-def upgrade():
-    """Apply all migrations"""
+def upgrade(
+        lock_timeout: float = typer.Option(None, help="Seconds a migration may wait for a lock (default MIGRATION_LOCK_TIMEOUT_SECONDS, 0 = wait forever)"),
+        retries: int = typer.Option(None, help="Retries after a lock timeout (default MIGRATION_LOCK_RETRIES)")
+):
+    """Apply all migrations, giving up on (and retrying) locks that aren't free quickly"""
+    import time
+    from app.core.config import settings
+    from app.db.online_migrations import is_lock_timeout
+
+    lock_timeout = settings.MIGRATION_LOCK_TIMEOUT_SECONDS if lock_timeout is None else lock_timeout
+    retries = settings.MIGRATION_LOCK_RETRIES if retries is None else retries
+    # libpq applies PGOPTIONS to every connection Alembic opens
+    os.environ["PGOPTIONS"] = f"{os.environ.get('PGOPTIONS', '')} -c lock_timeout={int(lock_timeout * 1000)}".strip()
+
     alembic_cfg = Config(os.path.join(os.path.dirname(__file__), '..', 'alembic.ini'))
-    command.upgrade(alembic_cfg, "head")
+    for attempt in range(retries + 1):
+        try:
+            command.upgrade(alembic_cfg, "head")
+            return
+        except Exception as e:
+            if not is_lock_timeout(e) or attempt == retries:
+                raise
+            delay = settings.MIGRATION_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+            typer.echo(f"Lock not available, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
 
 @app.command()
 def downgrade():
@@ -32,5 +58,338 @@ def stamp(revision: str = "head"):
     alembic_cfg = Config(os.path.join(os.path.dirname(__file__), '..', 'alembic.ini'))
     command.stamp(alembic_cfg, revision)
 
+def _migration_engines(shard):
+    """Engines to change: one shard, or every shard so they keep the same schema."""
+    from app.db.session import shard_engines
+    return [(shard, shard_engines[shard])] if shard is not None else list(enumerate(shard_engines))
+
+@app.command("create-index")
+def create_index(
+        name: str,
+        table: str,
+        columns: str = typer.Argument(..., help="Comma-separated columns or expressions"),
+        unique: bool = typer.Option(False, help="Build a unique index"),
+        where: str = typer.Option(None, help="Predicate for a partial index"),
+        shard: int = typer.Option(None, help="Only this shard (default: every shard)")
+):
+    """Build an index with CREATE INDEX CONCURRENTLY, without blocking writes"""
+    from app.db.online_migrations import create_index_concurrently
+
+    def progress(state):
+        percent = f" {state['percent']}%" if state["percent"] is not None else ""
+        typer.echo(f"  {state['index']}: {state['phase']}{percent}")
+
+    for number, engine in _migration_engines(shard):
+        created = create_index_concurrently(
+            engine, name, table, [column.strip() for column in columns.split(",")],
+            unique=unique, where=where, progress=progress
+        )
+        typer.echo(f"Shard {number}: index {name} {'created' if created else 'already exists'}")
+
+@app.command("drop-index")
+def drop_index(
+        name: str,
+        shard: int = typer.Option(None, help="Only this shard (default: every shard)")
+):
+    """Drop an index with DROP INDEX CONCURRENTLY, without blocking queries"""
+    from app.db.online_migrations import drop_index_concurrently
+
+    for number, engine in _migration_engines(shard):
+        drop_index_concurrently(engine, name)
+        typer.echo(f"Shard {number}: index {name} dropped")
+
+@app.command()
+def backfill(
+        table: str,
+        column: str,
+        value: str = typer.Argument(..., help="SQL expression for the new value"),
+        where: str = typer.Option(None, help="Rows that need updating (default: column IS NULL)"),
+        batch_size: int = typer.Option(None, help="Primary key range per transaction"),
+        pause: float = typer.Option(None, help="Seconds to pause between batches"),
+        max_batches: int = typer.Option(None, help="Stop after this many batches per shard"),
+        shard: int = typer.Option(None, help="Only this shard (default: every shard)")
+):
+    """Fill a column on existing rows in small, throttled batches"""
+    from app.db.online_migrations import backfill_column
+
+    def progress(state):
+        eta = f", about {state['eta_seconds']:.0f}s left" if state["eta_seconds"] is not None else ""
+        typer.echo(f"  {state['rows']:,} rows, {state['position']:,}/{state['last']:,} ({state['percent']}%){eta}")
+
+    for number, engine in _migration_engines(shard):
+        updated = backfill_column(
+            engine, table, column, value, where=where, batch_size=batch_size,
+            pause=pause, max_batches=max_batches, progress=progress
+        )
+        typer.echo(f"Shard {number}: {updated:,} rows updated")
+
+@app.command()
+def serve(
+        host: str = typer.Option(None, help="Interface to bind (default SERVER_HOST)"),
+        port: int = typer.Option(None, help="Port to bind (default SERVER_PORT)"),
+        workers: int = typer.Option(None, help="Worker processes (default: one per CPU)"),
+        budget: int = typer.Option(None, help="Max Postgres connections for the whole fleet")
+):
+    """
+    Run the API in production with multiple workers.
+
+    Send SIGHUP to the supervisor to replace workers one at a time; each old
+    worker drains its in-flight requests (up to SERVER_GRACEFUL_TIMEOUT) first.
+    """
+    import uvicorn
+    from app.core.config import settings
+    from app.core.runtime import engines_per_server, plan_workers, best_loop, best_http
+
+    plan = plan_workers(
+        connection_budget=budget or settings.DB_CONNECTION_BUDGET,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        workers=workers or settings.SERVER_WORKERS or None,
+        # Shards and replicas each get a pool, and may live on the same server
+        engines_per_server=engines_per_server(
+            [settings.DATABASE_URL, *settings.DATABASE_SHARD_URLS, *settings.DATABASE_REPLICA_URLS]
+        )
+    )
+
+    # Workers are fresh interpreters and read their pool size from the environment
+    os.environ["DB_POOL_SIZE"] = str(plan.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(plan.max_overflow)
+    settings.DB_POOL_SIZE = plan.pool_size
+    settings.DB_MAX_OVERFLOW = plan.max_overflow
+
+    loop, http = best_loop(), best_http()
+    typer.echo(
+        f"Starting {plan.workers} worker(s) with loop={loop} http={http}, "
+        f"pool {plan.pool_size}+{plan.max_overflow} per engine, "
+        f"{plan.engines_per_server} engine(s) on the busiest server "
+        f"({plan.total_connections} connections max there)"
+    )
+
+    uvicorn.run(
+        "app.main:app",
+        app_dir=ROOT_DIR,
+        host=host or settings.SERVER_HOST,
+        port=port or settings.SERVER_PORT,
+        workers=plan.workers,
+        loop=loop,
+        http=http,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT
+    )
+
+@app.command("generate-signing-key")
+def generate_signing_key(
+        kid: str = typer.Argument(None, help="Key id (default: today's date, e.g. 2025-01-31)"),
+        algorithm: str = typer.Option(None, help="EdDSA or RS256 (default ALGORITHM)")
+):
+    """Create a new token signing key in JWT_KEYS_DIR for rotation"""
+    from datetime import date
+    from app.core.config import settings
+    from app.core.signing_keys import generate_signing_key as generate
+
+    path = generate(settings.JWT_KEYS_DIR, kid or date.today().isoformat(), algorithm or settings.ALGORITHM)
+    typer.echo(f"Wrote {path}")
+    typer.echo(
+        f"Running workers publish it in the JWKS within {settings.JWT_KEYS_RELOAD_CHECK_SECONDS:.0f}s. "
+        f"Once JWKS caches have it (JWKS_CACHE_MAX_AGE={settings.JWKS_CACHE_MAX_AGE}s), "
+        f"set JWT_ACTIVE_KID={os.path.basename(path)[:-len('.pem')]} to start signing with it."
+    )
+
+@app.command("profile-token")
+def profile_token(ttl: int = typer.Option(None, help="Seconds the token stays valid (default PROFILING_TOKEN_TTL_SECONDS)")):
+    """Print a signed X-Profile header value that makes the API profile a request"""
+    from app.core.profiling import sign_profile_token
+
+    typer.echo(f"X-Profile: {sign_profile_token(ttl)}")
+
+@app.command("ingest-transactions")
+def ingest_transactions(
+        card_id: int,
+        path: str,
+        format: str = typer.Option(None, help="csv or ndjson (default: from the file extension)"),
+        chunk_size: int = typer.Option(None, help="Rows per COPY transaction"),
+        shard: int = typer.Option(0, help="Shard that holds the card")
+):
+    """Import a CSV/NDJSON statement file for a card into card_transactions"""
+    from app.core.ledger import ingest_statement, detect_format
+    from app.db.session import shard_engines
+
+    fmt = detect_format(path, format)
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        result = ingest_statement(shard_engines[shard], card_id, stream, fmt, chunk_size)
+
+    typer.echo(
+        f"Received {result.received}, inserted {result.inserted}, "
+        f"duplicates {result.duplicates}, rejected {result.rejected}"
+    )
+    for error in result.errors:
+        typer.echo(f"  line {error['line']}: {error['error']}")
+
+@app.command("provision-users")
+def provision_users(
+        path: str,
+        results: str = typer.Option(None, help="Write per-record results as NDJSON to this file (default: stdout)"),
+        batch_size: int = typer.Option(None, help="Users per batch (default PROVISIONING_BATCH_SIZE)")
+):
+    """Create user accounts from an NDJSON file of signup records"""
+    import json
+    import time
+    from app.core.provisioning import ProvisioningSummary, iter_record_lines
+    from app.core.provisioning import provision_users as provision
+
+    started = time.perf_counter()
+    summary = ProvisioningSummary()
+    target = open(results, "w", encoding="utf-8") if results else sys.stdout
+    try:
+        with open(path, encoding="utf-8-sig") as stream:
+            for result in provision(iter_record_lines(stream), batch_size):
+                summary.add(result)
+                target.write(json.dumps(result) + "\n")
+    finally:
+        if results:
+            target.close()
+
+    # Keep stdout to the results when they are written there
+    typer.echo(", ".join(f"{status} {count:,}" for status, count in summary.as_dict().items()), err=not results)
+    typer.echo(f"Done in {time.perf_counter() - started:.1f}s", err=not results)
+
+@app.command("export-cards")
+def export_cards(
+        output: str,
+        format: str = typer.Option("csv", help="csv or ndjson"),
+        user_id: int = typer.Option(None, help="Only this user's cards (default: all cards)"),
+        include_optimisations: bool = typer.Option(False, help="Join cards to their optimisation ranges"),
+        shard: int = typer.Option(0, help="Shard to export from")
+):
+    """Stream credit cards to a CSV/NDJSON file with constant memory"""
+    from app.core.export import EXPORT_FORMATS, stream_card_export
+    from app.db.session import ReadSessionLocal
+
+    if format not in EXPORT_FORMATS:
+        raise typer.BadParameter(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    written = 0
+    with open(output, "wb") as target:
+        session_factory = lambda: ReadSessionLocal(info={"shard": shard})
+        for chunk in stream_card_export(session_factory, format, user_id, include_optimisations):
+            target.write(chunk)
+            written += len(chunk)
+
+    typer.echo(f"Wrote {written:,} bytes to {output}")
+
+@app.command("export-analytics")
+def export_analytics(
+        output_dir: str,
+        format: str = typer.Option("parquet", help="parquet or arrow (Arrow IPC file)"),
+        tables: str = typer.Option("users,credit_cards,optimisations", help="Comma-separated tables"),
+        batch_size: int = typer.Option(None, help="Rows per record batch"),
+        shard: int = typer.Option(0, help="Shard to export from")
+):
+    """Dump tables as Parquet/Arrow files for notebooks, in record batches"""
+    import time
+    from app.core.arrow_export import export_tables
+    from app.db.session import ReadSessionLocal
+
+    started = time.perf_counter()
+    written = export_tables(
+        lambda: ReadSessionLocal(info={"shard": shard}),
+        output_dir,
+        format,
+        [name.strip() for name in tables.split(",") if name.strip()],
+        batch_size
+    )
+    for name, rows in written.items():
+        typer.echo(f"{name}: {rows:,} rows")
+    typer.echo(f"Done in {time.perf_counter() - started:.1f}s")
+
+@app.command("archive-cards")
+def archive_cards(
+        older_than_days: int = typer.Option(None, help="Inactive for at least this many days (default CARD_ARCHIVE_AFTER_DAYS)"),
+        batch_size: int = typer.Option(None, help="Cards moved per transaction"),
+        max_batches: int = typer.Option(None, help="Stop after this many batches")
+):
+    """Move long-inactive cards into credit_cards_archive in small batches"""
+    from app.core.maintenance import archive_inactive_cards
+
+    archived = archive_inactive_cards(older_than_days, batch_size, max_batches)
+    typer.echo(f"Archived {archived} cards")
+
+@app.command()
+def seed(
+        users: int = typer.Option(100000, help="Number of users to create"),
+        seed: int = typer.Option(0, help="Random seed; the same seed gives the same rows"),
+        chunk_size: int = typer.Option(10000, help="Users per COPY transaction"),
+        workers: int = typer.Option(None, help="Parallel loader processes (default: one per CPU)"),
+        as_of: str = typer.Option(None, help="Reference date for timestamps, YYYY-MM-DD (default 2025-01-01)"),
+        shard: int = typer.Option(0, help="Shard to fill (run sync-shard-directory afterwards)")
+):
+    """Fill the database with synthetic users, cards, optimisations and blacklisted tokens"""
+    import time
+    from datetime import date
+    from app.db.seed import seed_database
+    from app.db.session import shard_engines
+    from app.db.sharding import sharding_enabled
+
+    started = time.perf_counter()
+    done = {"users": 0}
+
+    def progress(loaded):
+        done["users"] += loaded["users"]
+        typer.echo(f"  {done['users']:,}/{users:,} users")
+
+    totals = seed_database(
+        shard_engines[shard],
+        users,
+        seed=seed,
+        chunk_size=chunk_size,
+        workers=workers,
+        as_of=date.fromisoformat(as_of) if as_of else None,
+        progress=progress,
+        # Sharded ids must come from the shared sequences, not the shard's own
+        directory=shard_engines[0] if sharding_enabled() else None
+    )
+    for table, rows in totals.items():
+        typer.echo(f"{table}: {rows:,} rows")
+    typer.echo(f"Done in {time.perf_counter() - started:.1f}s")
+
+@app.command("sync-shard-directory")
+def sync_shard_directory():
+    """Add every existing user to the user_shards directory (run before enabling shards)"""
+    from app.db.sharding import sync_directory
+
+    for shard, added in sync_directory().items():
+        typer.echo(f"Shard {shard}: {added} users added to the directory")
+
+@app.command("rebalance-users")
+def rebalance_users(
+        user_id: int = typer.Option(None, help="Move just this user (needs --to-shard)"),
+        to_shard: int = typer.Option(None, help="Target shard for --user-id"),
+        max_moves: int = typer.Option(None, help="Stop after moving this many users"),
+        dry_run: bool = typer.Option(False, help="Only print the planned moves")
+):
+    """
+    Move users between shards until every shard holds about the same number,
+    or move a single user with --user-id and --to-shard.
+    """
+    from app.db.sharding import move_user, plan_rebalance, shard_directory
+
+    if user_id is not None:
+        if to_shard is None:
+            raise typer.BadParameter("--to-shard is required with --user-id")
+        plan = [(user_id, shard_directory.shard_for_user(user_id, refresh=True), to_shard)]
+    else:
+        plan = plan_rebalance(max_moves)
+
+    if not plan:
+        typer.echo("Shards are already balanced")
+        return
+
+    for moving_user, source, target in plan:
+        if dry_run:
+            typer.echo(f"Would move user {moving_user}: shard {source} -> {target}")
+            continue
+        copied = move_user(moving_user, target)
+        typer.echo(f"Moved user {moving_user}: shard {source} -> {target} ({sum(copied.values())} rows)")
+
 if __name__ == "__main__":
     app()
\ No newline at end of file